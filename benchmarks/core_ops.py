@@ -0,0 +1,176 @@
+"""Benchmark of the core NoteTree operations on synthetic trees.
+
+Generates one tree per --notes size (see corpus.py), times each operation
+`--repeat` times and prints best/median per size. Quick operations are run
+in a loop per sample so timer resolution doesn't dominate. Search caches are
+cleared before every run, so the searches are measured cold.
+
+    python benchmarks/core_ops.py --notes 1000 10000 100000 --json out.json
+    python benchmarks/core_ops.py --notes 1000 10000 --baseline out.json
+
+With --baseline, best times are compared to a stored --json result (the
+best is the least disturbed by other load on the machine) and the exit
+status is 1 if any operation got slower than --tolerance allows.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import timeit
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+
+from corpus import (CorpusSpec, add_spec_arguments,  # noqa: E402
+                    spec_from_args, write_corpus)
+from note_tree import NoteTree  # noqa: E402
+from utils import three_way_merge  # noqa: E402
+
+
+def _edited(lines, rnd, edits):
+    """`lines` with `edits` notes reworded, as an external editor might."""
+    out = list(lines)
+    for index in rnd.sample(range(len(out)), min(edits, len(out))):
+        tabs = len(out[index]) - len(out[index].lstrip("\t"))
+        out[index] = "\t" * tabs + f"- edited {index}"
+    return out
+
+
+def _operations(tree, lines, rnd):
+    """(name, callable) for everything timed on `tree`. Nodes are looked up
+    on every call: undo swaps in copies of the branch it restores."""
+    top = tree.root.children
+    # A branch two levels down, the size of one an edit usually snapshots.
+    sizes = [len(n.children) for n in top]
+    branch_path = [sizes.index(max(sizes))]
+    below = top[branch_path[0]].children
+    if below:
+        sizes = [len(n.children) for n in below]
+        branch_path.append(sizes.index(max(sizes)))
+
+    def branch():
+        return tree._resolve_index_path(branch_path)
+
+    def probe():
+        return (branch().children or [branch()])[0]
+
+    local = _edited(lines, rnd, 20)
+    disk = _edited(lines, rnd, 20)
+    journal = [n for n in top if n.text == "Journal"]
+    if journal and journal[0].children:
+        year = journal[0].children[-1]
+        beam_query = f"Journal > {year.text} > {year.children[-1].text}"
+    else:
+        beam_query = f"{branch().text} > {probe().text}"
+
+    def cold(fn):
+        def run():
+            tree._search_cache.clear()
+            return fn()
+
+        return run
+
+    def undo_redo():
+        tree.push_undo(branch())
+        tree.pop_undo()
+
+    return [
+        ("serialize_lines", tree.serialize_lines),
+        ("save", tree.save),
+        ("push_undo+pop_undo", undo_redo),
+        ("three_way_merge", lambda: three_way_merge(lines, local, disk)),
+        ("find_by_query", cold(lambda: tree.find_by_query("project review"))),
+        ("find_by_similarity", cold(lambda: tree.find_by_similarity(probe()))),
+        ("find_by_path_beam", lambda: tree.find_by_path_beam(beam_query)),
+        ("iter_timer_nodes", tree.iter_timer_nodes),
+        # Last: it rebuilds the tree the others were set up against.
+        ("apply_lines", lambda: tree.apply_lines(lines)),
+    ]
+
+
+def run_size(spec: CorpusSpec, repeat: int) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "bench.txt")
+    lines = write_corpus(path, spec)
+    tree = NoteTree(path)
+    results = {}
+    for name, op in _operations(tree, lines, random.Random(spec.seed)):
+        timer = timeit.Timer(op)
+        loops, _ = timer.autorange()  # doubles as the warm-up run
+        samples = [t / loops for t in timer.repeat(repeat, loops)]
+        results[name] = {"best": min(samples), "median": statistics.median(samples)}
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """Print best-time ratios against `baseline`; False if any regressed."""
+    if baseline.get("spec") != results["spec"]:
+        print("warning: the baseline was measured on a different corpus spec")
+    ok = True
+    for size, ops in results["sizes"].items():
+        base_ops = baseline.get("sizes", {}).get(size)
+        if base_ops is None:
+            print(f"{size} notes: not in baseline")
+            continue
+        for name, timing in ops.items():
+            base = base_ops.get(name)
+            if base is None:
+                continue
+            ratio = timing["best"] / base["best"] if base["best"] else 1.0
+            flag = ""
+            if ratio > 1 + tolerance:
+                flag = "  SLOWER"
+                ok = False
+            elif ratio < 1 - tolerance:
+                flag = "  faster"
+            print(f"{size:>8} {name:<20} {ratio:6.2f}x{flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare against a --json result")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="slowdown (as a fraction of the baseline) still accepted",
+    )
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    results = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": args.repeat,
+        "spec": vars(spec_from_args(args, 0)),
+        "sizes": {},
+    }
+    for notes in args.notes:
+        ops = run_size(spec_from_args(args, notes), args.repeat)
+        results["sizes"][str(notes)] = ops
+        for name, timing in ops.items():
+            print(
+                f"{notes:>8} {name:<20} best {timing['best'] * 1e3:9.2f} ms"
+                f"  median {timing['median'] * 1e3:9.2f} ms"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
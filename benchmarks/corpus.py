@@ -0,0 +1,200 @@
+"""Seeded generator of synthetic Forest trees for the benchmarks.
+
+The same `CorpusSpec` (seed included) always yields the same lines, in the
+on-disk format NoteTree.apply_lines reads, so timings taken on different
+machines or commits run against identical trees.
+
+    python benchmarks/corpus.py --notes 100000 > big.txt
+"""
+
+import argparse
+import random
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+
+WORDS = [
+    "meeting",
+    "notes",
+    "project",
+    "idea",
+    "review",
+    "plan",
+    "draft",
+    "budget",
+    "design",
+    "research",
+    "follow",
+    "up",
+    "call",
+    "email",
+    "reading",
+    "list",
+    "garden",
+    "recipe",
+    "travel",
+    "workout",
+    "why?",
+    "todo",
+    "release",
+    "bug",
+    "fix",
+    "chapter",
+    "summary",
+    "question",
+]
+
+TAGS = ["#HL1", "#HL2", "#HL3", "#DONE", "#ARCHIVE", "*important*", "Q ::"]
+
+MONTHS = [
+    "January",
+    "February",
+    "March",
+    "April",
+    "May",
+    "June",
+    "July",
+    "August",
+    "September",
+    "October",
+    "November",
+    "December",
+]
+
+# Fixed reference date, so creation dates and #T- expiries don't depend on
+# when the corpus is generated.
+EPOCH = datetime(2026, 1, 1, 9, 0)
+
+
+@dataclass
+class CorpusSpec:
+    notes: int = 10_000
+    # Mean number of children of a branch; the tree fills breadth-first, so
+    # with max_depth this sets how deep and bushy it gets.
+    fan_out: float = 4.0
+    max_depth: int = 8
+    min_words: int = 2
+    max_words: int = 14
+    # Chance that a note carries a tag (highlight, #DONE, #ARCHIVE, ...).
+    tag_density: float = 0.1
+    # Share of the notes filed as dated entries under Journal > year > month.
+    journal_share: float = 0.2
+    # Share of the notes with a #T- timer.
+    timer_share: float = 0.01
+    # Share of the branches saved collapsed.
+    collapsed_ratio: float = 0.3
+    seed: int = 0
+
+
+def generate_lines(spec: CorpusSpec) -> list[str]:
+    rnd = random.Random(spec.seed)
+    journal_notes = int(spec.notes * spec.journal_share)
+    lines = []
+    _outline(rnd, spec, spec.notes - journal_notes, lines)
+    if journal_notes:
+        _journal(rnd, spec, journal_notes, lines)
+    return lines
+
+
+def write_corpus(path: str, spec: CorpusSpec) -> list[str]:
+    lines = generate_lines(spec)
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return lines
+
+
+def _outline(rnd, spec, count, lines) -> None:
+    """`count` notes shaped by fan_out and max_depth, emitted depth-first."""
+    if count <= 0:
+        return
+    # Fill breadth-first: node i gets children first[i] .. first[i]+counts[i]-1.
+    depths = [0] * min(count, max(1, round(spec.fan_out)))
+    first = []
+    counts = []
+    i = 0
+    while len(depths) < count:
+        if i == len(depths):
+            # Ran out of branches (small fan_out): start a new top-level one.
+            depths.append(0)
+        depth = depths[i]
+        k = 0
+        if depth + 1 < spec.max_depth:
+            k = min(round(rnd.expovariate(1 / spec.fan_out)), count - len(depths))
+        first.append(len(depths))
+        counts.append(k)
+        depths.extend([depth + 1] * k)
+        i += 1
+    first.extend([0] * (len(depths) - len(first)))
+    counts.extend([0] * (len(depths) - len(counts)))
+
+    top = [n for n, depth in enumerate(depths) if depth == 0]
+    stack = top[::-1]
+    while stack:
+        n = stack.pop()
+        is_branch = counts[n] > 0
+        lines.append(_line(rnd, spec, depths[n], _text(rnd, spec), is_branch))
+        stack.extend(range(first[n] + counts[n] - 1, first[n] - 1, -1))
+
+
+def _journal(rnd, spec, count, lines) -> None:
+    """Journal > year > month > "[YYYY-MM-DD HH:MM] ..." entries, about one
+    a day, over at most the five years before EPOCH."""
+    lines.append(_line(rnd, spec, 0, "Journal", True))
+    span = min(count, 5 * 365)
+    entries = sorted(
+        EPOCH - timedelta(days=rnd.randrange(span), minutes=rnd.randrange(16 * 60))
+        for _ in range(count)
+    )
+    year = month = None
+    for when in entries:
+        if when.year != year:
+            year, month = when.year, None
+            lines.append(_line(rnd, spec, 1, str(year), True))
+        if when.month != month:
+            month = when.month
+            lines.append(_line(rnd, spec, 2, MONTHS[month - 1], True))
+        text = f"[{when:%Y-%m-%d %H:%M}] {_text(rnd, spec)}"
+        lines.append(_line(rnd, spec, 3, text, False))
+
+
+def _text(rnd, spec) -> str:
+    words = rnd.choices(WORDS, k=rnd.randint(spec.min_words, spec.max_words))
+    if rnd.random() < spec.tag_density:
+        words.append(rnd.choice(TAGS))
+    if rnd.random() < spec.timer_share:
+        expiry = EPOCH + timedelta(minutes=rnd.randrange(-60 * 24, 60 * 24 * 30))
+        words.append(f"#T-1h@{expiry:%Y-%m-%dT%H:%M:%S}")
+    return " ".join(words)
+
+
+def _line(rnd, spec, depth, text, is_branch) -> str:
+    prefix = "+" if is_branch and rnd.random() < spec.collapsed_ratio else "-"
+    created = EPOCH - timedelta(days=rnd.randrange(0, 3 * 365))
+    return "\t" * depth + f"{prefix} {text} @{{{created:%Y-%m-%d}}}"
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser) -> None:
+    """Expose the CorpusSpec knobs (all but `notes`) as --options."""
+    for name, default in asdict(CorpusSpec()).items():
+        if name == "notes":
+            continue
+        parser.add_argument(
+            "--" + name.replace("_", "-"), type=type(default), default=default
+        )
+
+
+def spec_from_args(args, notes: int) -> CorpusSpec:
+    fields = {k: getattr(args, k) for k in asdict(CorpusSpec()) if k != "notes"}
+    return CorpusSpec(notes=notes, **fields)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, default=CorpusSpec.notes)
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    for line in generate_lines(spec_from_args(args, args.notes)):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Micro-benchmark for NoteTreeWidget line rendering.
+
+Runs the app headless on a generated tree and times building a strip for
+each row with the line cache cleared, i.e. the per-line cost paid whenever
+rows scroll into view or the cache is invalidated.
+
+    python benchmarks/render_line.py [--notes N] [--repeat R]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+
+from forest import ForestApp  # noqa: E402
+
+WORDS = [
+    "meeting",
+    "notes",
+    "project",
+    "idea",
+    "review",
+    "plan",
+    "*important*",
+    "2024-05-01",
+    "2024-05-01 09:30",
+    "[[Journal > 2024]]",
+    "Q ::",
+    "why?",
+    "[x]",
+    "[bold]",
+]
+
+
+def make_tree(path, notes, seed=0):
+    rnd = random.Random(seed)
+    lines = []
+    depth = 0
+    for i in range(notes):
+        depth = max(0, min(depth + rnd.choice([-1, 0, 0, 1]), 5))
+        text = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(2, 14)))
+        if rnd.random() < 0.05:
+            text = "! " + text
+        elif rnd.random() < 0.05:
+            text = "> " + text
+        if rnd.random() < 0.1:
+            text += rnd.choice([" #HL1", " #HL2", " #DONE"])
+        lines.append("\t" * depth + f"- {text} {i}")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+async def run(notes, repeat):
+    path = os.path.join(tempfile.mkdtemp(), "bench.txt")
+    make_tree(path, notes)
+    app = ForestApp(path)
+    async with app.run_test(size=(120, 50)) as pilot:
+        await pilot.pause()
+        widget = app.note_tree_widget
+        width = widget.size.width
+        rows = range(min(len(widget.rows), 2000))
+        # Wrap everything measured exactly, so placeholders don't skew it.
+        widget._materialize_rows(0, len(rows))
+        per_line = []
+        for _ in range(repeat):
+            widget._strip_cache.clear()
+            start = time.perf_counter()
+            for index in rows:
+                widget._build_strip(index, width)
+            per_line.append((time.perf_counter() - start) / len(rows))
+    return len(rows), per_line
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    lines, per_line = asyncio.run(run(args.notes, args.repeat))
+    best = min(per_line) * 1e6
+    median = statistics.median(per_line) * 1e6
+    print(f"render_line: {lines} lines, best {best:.1f} us/line, median {median:.1f} us/line")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Key-press-to-repaint latency of common interactions, run headless.
+
+Drives ForestApp through Textual's pilot on a generated tree (see corpus.py)
+and times each scripted action from the key press to the last frame the
+screen composited before the app went idle again, so the pilot's own idle
+polling isn't counted. Reports p50/p95/p99 per action, plus frames, and how
+many times NoteTreeWidget._build_rows and render_line ran per action.
+
+    python benchmarks/ui_latency.py [--notes N] [--rounds R] [--json out.json]
+
+Presses that repainted nothing have no latency; they are counted under
+"no frame".
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+
+from corpus import (CorpusSpec, add_spec_arguments,  # noqa: E402
+                    spec_from_args, write_corpus)
+from forest import ForestApp  # noqa: E402
+
+
+class _Counted:
+    """Stands in for a widget method and counts the calls."""
+
+    def __init__(self, method):
+        self.method = method
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.method(*args, **kwargs)
+
+
+class Recorder:
+    def __init__(self, app, pilot):
+        self.app = app
+        self.pilot = pilot
+        widget = app.note_tree_widget
+        # Instance attributes shadow the methods, so every self._build_rows()
+        # and self.render_line() inside the widget goes through the counters.
+        self.build_rows = widget._build_rows = _Counted(widget._build_rows)
+        self.render_line = widget.render_line = _Counted(widget.render_line)
+        # Every composited frame ends in App._display; note when it happened.
+        self.frames = 0
+        self.last_frame = 0.0
+        display = app._display
+
+        def timed_display(screen, renderable):
+            display(screen, renderable)
+            if renderable is not None:
+                self.frames += 1
+                self.last_frame = time.perf_counter()
+
+        app._display = timed_display
+        # action -> list of (seconds or None, frames, _build_rows calls,
+        # render_line calls)
+        self.samples: dict[str, list] = {}
+
+    async def press(self, action: str, *keys: str) -> None:
+        """Press `keys` and record the time until the repaint as `action`."""
+        build_rows = self.build_rows.calls
+        render_line = self.render_line.calls
+        frames = self.frames
+        start = time.perf_counter()
+        await self.pilot.press(*keys)  # returns once the app is idle
+        painted = self.frames - frames
+        self.samples.setdefault(action, []).append(
+            (
+                self.last_frame - start if painted else None,
+                painted,
+                self.build_rows.calls - build_rows,
+                self.render_line.calls - render_line,
+            )
+        )
+
+    async def untimed(self, *keys: str) -> None:
+        await self.pilot.press(*keys)
+        await self.pilot.pause()
+
+    async def type_command(self, command: str) -> None:
+        """Open command mode and type `command`, without submitting it."""
+        await self.untimed(":")
+        await self.untimed(*[ch if ch != " " else "space" for ch in command])
+
+    def report(self) -> dict:
+        out = {}
+        for action, samples in self.samples.items():
+            times = sorted(s[0] for s in samples if s[0] is not None)
+            out[action] = {
+                "n": len(samples),
+                "no_frame": len(samples) - len(times),
+                "p50": _percentile(times, 50),
+                "p95": _percentile(times, 95),
+                "p99": _percentile(times, 99),
+                "frames": statistics.mean(s[1] for s in samples),
+                "build_rows": statistics.mean(s[2] for s in samples),
+                "render_line": statistics.mean(s[3] for s in samples),
+            }
+        return out
+
+
+def _percentile(sorted_values, p):
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    rank = (len(sorted_values) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (
+        rank - low
+    )
+
+
+async def script(rec: Recorder, rounds: int) -> None:
+    app = rec.app
+    sidebar = app.info_sidebar
+    for _ in range(rounds):
+        for _ in range(5):
+            await rec.press("cursor_down", "down")
+        for _ in range(5):
+            await rec.press("cursor_up", "up")
+
+        await rec.press("zoom_in", "right")
+        await rec.press("zoom_out", "left")
+
+        await rec.press("add_note", "enter")
+        await rec.untimed("n", "e", "w")
+        await rec.press("submit_edit", "enter")
+        await rec.press("indent", "tab")
+        await rec.press("deindent", "shift+tab")
+        await rec.press("toggle_done", "x")
+        await rec.press("toggle_done", "x")
+        await rec.untimed("delete")
+
+        await rec.type_command("?? project review")
+        await rec.press("search", "enter")
+        if sidebar.is_open:
+            for _ in range(3):
+                await rec.press("search_next", "down")
+            await rec.press("search_cancel", "escape")
+        app.note_tree_widget.focus()
+
+        await rec.press("sidebar_open", "grave_accent")
+        for _ in range(10):
+            if not sidebar.is_open:
+                break
+            await rec.untimed("grave_accent")
+
+        await rec.type_command("sn* .")
+        await rec.press("sticky_open", "enter")
+        if app.screen is not app.screen_stack[0]:
+            await rec.press("sticky_move", "right")
+            await rec.press("sticky_close", "escape")
+        app.note_tree_widget.focus()
+
+
+async def run(spec: CorpusSpec, rounds: int, size) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "bench.txt")
+    write_corpus(path, spec)
+    app = ForestApp(path)
+    async with app.run_test(size=size) as pilot:
+        await pilot.pause()
+        rec = Recorder(app, pilot)
+        await script(rec, rounds)
+        return rec.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--size", default="120x40", help="terminal COLSxROWS")
+    parser.add_argument("--json", help="write the results to this file")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    cols, rows = (int(v) for v in args.size.split("x"))
+
+    spec = spec_from_args(args, args.notes)
+    results = asyncio.run(run(spec, args.rounds, (cols, rows)))
+    print(
+        f"{'action':<14} {'n':>4} {'no frame':>8} {'p50 ms':>8} {'p95 ms':>8}"
+        f" {'p99 ms':>8} {'frames':>6} {'_build_rows':>11} {'render_line':>11}"
+    )
+    for action, r in results.items():
+        ms = [
+            f"{r[p] * 1e3:8.1f}" if r[p] is not None else f"{'-':>8}"
+            for p in ("p50", "p95", "p99")
+        ]
+        print(
+            f"{action:<14} {r['n']:>4} {r['no_frame']:>8} {' '.join(ms)}"
+            f" {r['frames']:6.1f} {r['build_rows']:11.1f} {r['render_line']:11.1f}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"spec": vars(spec), "size": args.size, "actions": results}, f)
+
+
+if __name__ == "__main__":
+    main()
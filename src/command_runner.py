@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import os
+import signal
+from dataclasses import dataclass
+
+# Bytes of a command's (merged stdout/stderr) output kept for its result;
+# the rest is read and dropped so the pipe never fills.
+_OUTPUT_LIMIT = 4096
+_READ_CHUNK = 65536
+# Seconds a command gets to exit after SIGTERM before it is SIGKILLed.
+_KILL_GRACE = 3
+# Seconds to keep waiting for output once the command itself has exited.
+_DRAIN_GRACE = 0.5
+# Seconds a command without a time limit holds its slot before it is left
+# to run in the background.
+_SLOT_HOLD = 0.5
+
+
+@dataclass
+class CommandResult:
+    command: str
+    returncode: int | None = None  # None if it never exited on its own
+    output: str = ""
+    timed_out: bool = False
+    cancelled: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+class CommandRunner:
+    """Runs `!` note commands as asyncio subprocesses, so launching one never
+    blocks the UI. At most `max_concurrent` run at once (the rest wait for a
+    slot); each is killed after `timeout` seconds. With no limit (0) they
+    are fire-and-forget: a command still running after _SLOT_HOLD seconds
+    gives its slot back, so a viewer or player left open doesn't hold up
+    the queue.
+    `on_done(result)` is called on the event loop as each one finishes.
+
+    Commands run in their own session, so the kill (on timeout or
+    cancel_all) takes their whole process group with them. A command counts
+    as finished when its shell exits, even if something it started in the
+    background keeps running."""
+
+    def __init__(self, max_concurrent=4, timeout=0, on_done=None):
+        self.timeout = timeout
+        self.on_done = on_done
+        self._slots = asyncio.Semaphore(max(1, max_concurrent))
+        self._tasks: set[asyncio.Task] = set()
+        self._processes: set = set()
+        # Output readers, kept referenced while they drain pipes that a
+        # finished command's background children still hold (see _execute).
+        self._drains: set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        """Commands running or waiting for a slot."""
+        return len(self._tasks)
+
+    def run(self, command: str) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(self._run(command))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def cancel_all(self) -> int:
+        """Kill every running command and drop the queued ones. Returns how
+        many were affected."""
+        count = len(self._tasks)
+        for proc in list(self._processes):
+            self._kill(proc)
+        for task in list(self._tasks):
+            if not task.done():
+                task.cancel()
+        return count
+
+    async def _run(self, command: str) -> None:
+        result = CommandResult(command)
+        held = False
+
+        def release_slot():
+            nonlocal held
+            if held:
+                held = False
+                self._slots.release()
+
+        try:
+            await self._slots.acquire()
+            held = True
+            try:
+                await self._execute(result, release_slot)
+            finally:
+                release_slot()
+        except asyncio.CancelledError:
+            result.cancelled = True
+            self._report(result)
+            raise
+        except Exception as e:
+            logging.error(f"Could not run command {command!r}: {e}")
+            result.output = str(e)
+        self._report(result)
+
+    async def _execute(self, result: CommandResult, release_slot) -> None:
+        # Output goes through a pipe of our own rather than stdout=PIPE: an
+        # asyncio-managed pipe makes proc.wait() also wait for EOF, which a
+        # launcher (xdg-open, a `cmd &` line) that leaves a child holding
+        # the pipe would postpone until that child exits.
+        read_fd, write_fd = os.pipe()
+        try:
+            proc = await asyncio.create_subprocess_shell(
+                result.command,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=write_fd,
+                stderr=asyncio.subprocess.STDOUT,
+                start_new_session=True,
+            )
+        except BaseException:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+        self._processes.add(proc)
+        logging.info(f"Started command (pid {proc.pid}): {result.command}")
+        loop = asyncio.get_running_loop()
+        stream = asyncio.StreamReader()
+        pipe, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(stream),
+            os.fdopen(read_fd, "rb", buffering=0),
+        )
+        kept = bytearray()
+        reader = loop.create_task(self._collect(stream, kept))
+        self._drains.add(reader)
+        reader.add_done_callback(self._drains.discard)
+        try:
+            if self.timeout:
+                await asyncio.wait_for(proc.wait(), timeout=self.timeout)
+            else:
+                try:
+                    await asyncio.wait_for(asyncio.shield(proc.wait()), _SLOT_HOLD)
+                except asyncio.TimeoutError:
+                    release_slot()
+                    await proc.wait()
+        except asyncio.TimeoutError:
+            result.timed_out = True
+            self._kill(proc)
+            await proc.wait()
+            pipe.close()
+            return
+        except asyncio.CancelledError:
+            pipe.close()
+            raise
+        finally:
+            self._processes.discard(proc)
+        result.returncode = proc.returncode
+        # Take the output that has arrived shortly after the exit; the reader
+        # drains whatever children left running write later, so they never
+        # block on a full pipe.
+        try:
+            await asyncio.wait_for(asyncio.shield(reader), _DRAIN_GRACE)
+        except asyncio.TimeoutError:
+            pass
+        result.output = kept.decode(errors="replace")
+
+    @staticmethod
+    async def _collect(stream, kept: bytearray) -> None:
+        while True:
+            chunk = await stream.read(_READ_CHUNK)
+            if not chunk:
+                break
+            if len(kept) < _OUTPUT_LIMIT:
+                kept += chunk[: _OUTPUT_LIMIT - len(kept)]
+
+    def _kill(self, proc) -> None:
+        """SIGTERM the command's process group, then SIGKILL it if the
+        command is still running after _KILL_GRACE seconds."""
+        if not self._signal(proc, signal.SIGTERM):
+            return
+        asyncio.get_running_loop().call_later(_KILL_GRACE, self._force_kill, proc)
+
+    def _force_kill(self, proc) -> None:
+        if proc.returncode is None:
+            logging.warning(f"Command (pid {proc.pid}) ignored SIGTERM; killing")
+            self._signal(proc, signal.SIGKILL)
+
+    @staticmethod
+    def _signal(proc, sig) -> bool:
+        try:
+            os.killpg(proc.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            return False
+        return True
+
+    def _report(self, result: CommandResult) -> None:
+        if self.on_done is None:
+            return
+        try:
+            self.on_done(result)
+        except Exception as e:
+            logging.error(f"Command result handler failed: {e}")
@@ -13,6 +13,8 @@ DEFAULT_CONFIG = {
     "margin_width": 30,
     "scroll_margin": 5,
     "external_reload_interval": 2,
+    "command_max_concurrent": 4,
+    "command_timeout": 0,
 }
 
 
@@ -81,3 +83,14 @@ class Config:
         # Seconds between polls for external edits to the open tree file.
         # 0 disables the feature.
         return max(0, int(self.get("external_reload_interval", 2)))
+
+    @property
+    def command_max_concurrent(self):
+        # `!` note commands running at once; further ones queue.
+        return max(1, int(self.get("command_max_concurrent", 4)))
+
+    @property
+    def command_timeout(self):
+        # Seconds before a running `!` command is killed. 0 (the default) means
+        # no limit, so viewers and players started with `!` keep running.
+        return max(0, float(self.get("command_timeout", 0)))
@@ -0,0 +1,113 @@
+"""Incremental index of dated notes for the perpetual journal.
+
+Notes whose text carries a bracketed ``[YYYY-MM-DD ...]`` date are filed in
+month-day buckets, so the "±N days" view reads only the buckets in its
+window. Notes whose first word is a four-digit year are filed too, which is
+how journal insertion finds the year branch without walking the Journal.
+
+The index is brought up to date lazily: node revisions come from one global
+clock, so a sync only descends into subtrees whose ``subtree_revision``
+moved past the previous sync, plus nodes it has never seen (undo restores
+deep copies that keep their old revisions). Removed nodes are not noticed
+by the walk; readers check attachment and ``discard`` the stale ones.
+"""
+
+import re
+
+_DATE_RE = re.compile(r"\[(\d{4}-(\d{2}-\d{2})).*?\]")
+_YEAR_RE = re.compile(r"\d{4}")
+
+# Once this many times more nodes are known than the tree holds (deleted and
+# undo-replaced branches pile up), the index is rebuilt from scratch.
+_COMPACT_RATIO = 2
+
+
+class DateIndex:
+    def __init__(self):
+        self.clear()
+
+    def clear(self) -> None:
+        # node -> (full date, year word) it is filed under, either may be None
+        self._known: dict = {}
+        # "MM-DD" -> {node: "YYYY-MM-DD"}
+        self._buckets: dict[str, dict] = {}
+        # "YYYY" -> {node: None}, an insertion-ordered set
+        self._years: dict[str, dict] = {}
+        self._clock = -1
+        # Known nodes right after the last full build; see _COMPACT_RATIO.
+        self._compacted_size = 0
+
+    def sync(self, root) -> None:
+        """File every node of `root`'s tree changed since the last sync."""
+        if root.subtree_revision <= self._clock and root in self._known:
+            return
+        if len(self._known) > _COMPACT_RATIO * self._compacted_size + 64:
+            self.clear()
+        known = self._known
+        clock = self._clock
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            fresh = node not in known
+            if fresh or node.revision > clock:
+                self._file(node)
+                # Its child list may have changed: look for newcomers too.
+                for child in node.children:
+                    if fresh or child.subtree_revision > clock or child not in known:
+                        stack.append(child)
+            else:
+                for child in node.children:
+                    if child.subtree_revision > clock:
+                        stack.append(child)
+        self._clock = root.subtree_revision
+        if clock < 0:
+            self._compacted_size = len(known)
+
+    def entries(self, md_filter):
+        """``(node, full_date)`` for the notes in each month-day bucket whose
+        "MM-DD" key passes `md_filter`. May include detached nodes."""
+        out = []
+        for md, bucket in self._buckets.items():
+            if md_filter(md):
+                out.extend(bucket.items())
+        return out
+
+    def year_nodes(self, year: str) -> list:
+        """Notes whose first word is `year`. May include detached nodes."""
+        return list(self._years.get(year, ()))
+
+    def discard(self, node) -> None:
+        entry = self._known.pop(node, None)
+        if entry is not None:
+            self._unfile(node, entry)
+
+    def _file(self, node) -> None:
+        text = node.text
+        match = _DATE_RE.search(text)
+        full_date = match.group(1) if match else None
+        words = text.split(maxsplit=1)
+        year = words[0] if words and _YEAR_RE.fullmatch(words[0]) else None
+        entry = (full_date, year)
+        old = self._known.get(node)
+        if old == entry:
+            return
+        if old is not None:
+            self._unfile(node, old)
+        self._known[node] = entry
+        if full_date is not None:
+            self._buckets.setdefault(full_date[5:], {})[node] = full_date
+        if year is not None:
+            self._years.setdefault(year, {})[node] = None
+
+    def _unfile(self, node, entry) -> None:
+        full_date, year = entry
+        if full_date is not None:
+            bucket = self._buckets[full_date[5:]]
+            del bucket[node]
+            if not bucket:
+                del self._buckets[full_date[5:]]
+        if year is not None:
+            years = self._years[year]
+            del years[node]
+            if not years:
+                del self._years[year]
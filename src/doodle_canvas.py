@@ -0,0 +1,151 @@
+"""Array-backed doodle canvases.
+
+A canvas keeps one ``bytearray`` per drawable row, indexed by the storage x
+(cells counted from the pane's right edge, so doodles stay anchored when the
+pane is resized). Each byte holds a color index + 1; 0 is an empty cell.
+
+Layering canvases (ancestor doodles under the current one) works on whole
+rows at once: a row is read as one big integer, a mask of its non-empty
+bytes is derived with a few shifts, and ``(below & ~mask) | above`` overlays
+it, so a merge costs a handful of C-level big-int operations per row rather
+than a Python step per cell.
+
+On disk a canvas is one run-length record (see ``to_record``): per non-empty
+row a ``<HH`` header (y, run count) and a ``<HB`` (length, value) pair per run
+of equal cells, so a stroke costs a few bytes however long it is.
+"""
+
+import re
+import struct
+
+EMPTY = 0
+
+_ROW_HEADER = struct.Struct("<HH")
+_RUN = struct.Struct("<HB")
+_RUNS_RE = re.compile(rb"(.)\1*", re.S)
+
+
+def _nonzero_mask(value: int, length: int) -> int:
+    """0xFF in every byte of `value` (`length` bytes) that isn't zero."""
+    m = value | (value >> 4)
+    m |= m >> 2
+    m |= m >> 1
+    # Bit 0 of each byte now ORs that byte's own bits (the shifts only ever
+    # pull higher bits of the same byte into it); spread it over the byte.
+    return (m & int.from_bytes(b"\x01" * length, "little")) * 0xFF
+
+
+def overlay_row(below: bytes, above: bytes) -> bytes:
+    """`above` drawn over `below`: its non-empty cells win. Trailing empty
+    cells are dropped."""
+    if not above:
+        return bytes(below)
+    if not below:
+        return bytes(above).rstrip(b"\0")
+    length = max(len(below), len(above))
+    top = int.from_bytes(above, "little")
+    merged = (int.from_bytes(below, "little") & ~_nonzero_mask(top, length)) | top
+    return merged.to_bytes(length, "little").rstrip(b"\0")
+
+
+class DoodleCanvas:
+    """The cells of one doodle. `version` changes on every edit, so derived
+    data (composites, rendered rows) can be cached against it."""
+
+    __slots__ = ("rows", "version", "saved_version")
+
+    def __init__(self, height: int):
+        self.rows = [bytearray() for _ in range(height)]
+        self.version = 0
+        # `version` as of the last write to the sidecar; -1 if never written.
+        self.saved_version = -1
+
+    @classmethod
+    def from_cells(cls, height: int, cells) -> "DoodleCanvas":
+        """Build from ``(storage_x, y, color_idx)`` triples; cells outside
+        the canvas height are dropped."""
+        canvas = cls(height)
+        for x, y, color_idx in cells:
+            if 0 <= y < height and x >= 0:
+                canvas.set(x, y, color_idx)
+        return canvas
+
+    @classmethod
+    def from_record(cls, height: int, record: bytes) -> "DoodleCanvas":
+        """Decode a `to_record` record; the result counts as saved."""
+        canvas = cls(height)
+        pos = 0
+        end = len(record)
+        while pos < end:
+            y, n_runs = _ROW_HEADER.unpack_from(record, pos)
+            pos += _ROW_HEADER.size
+            runs_end = pos + n_runs * _RUN.size
+            if y < height:
+                row = canvas.rows[y]
+                for length, value in _RUN.iter_unpack(record[pos:runs_end]):
+                    row += bytes((value,)) * length
+                while row and row[-1] == EMPTY:
+                    row.pop()
+            pos = runs_end
+        canvas.saved_version = canvas.version
+        return canvas
+
+    def to_record(self) -> bytes:
+        out = bytearray()
+        for y, row in enumerate(self.rows):
+            if not row:
+                continue
+            runs = [m.span() for m in _RUNS_RE.finditer(row)]
+            out += _ROW_HEADER.pack(y, len(runs))
+            for start, stop in runs:
+                out += _RUN.pack(stop - start, row[start])
+        return bytes(out)
+
+    def set(self, x: int, y: int, color_idx: int) -> bool:
+        """Paint one cell. Returns True if it changed."""
+        row = self.rows[y]
+        value = color_idx + 1
+        if x >= len(row):
+            row.extend(bytes(x + 1 - len(row)))
+        elif row[x] == value:
+            return False
+        row[x] = value
+        self.version += 1
+        return True
+
+    def clear(self, x: int, y: int) -> bool:
+        """Erase one cell. Returns True if it had been painted."""
+        row = self.rows[y]
+        if x >= len(row) or row[x] == EMPTY:
+            return False
+        row[x] = EMPTY
+        # Keep rows trimmed so equal drawings compare equal (see snapshot).
+        while row and row[-1] == EMPTY:
+            row.pop()
+        self.version += 1
+        return True
+
+    def is_empty(self) -> bool:
+        return not any(self.rows)
+
+    def cells(self):
+        """Painted cells as ``(storage_x, y, color_idx)``."""
+        for y, row in enumerate(self.rows):
+            for x, value in enumerate(row):
+                if value:
+                    yield (x, y, value - 1)
+
+    def snapshot(self) -> tuple:
+        """Immutable copy of the cells, for detecting strokes that changed
+        nothing."""
+        return tuple(bytes(row) for row in self.rows)
+
+
+def composite(canvases, height: int) -> list[bytes]:
+    """Rows of `canvases` layered in order (later ones on top)."""
+    rows = [b""] * height
+    for canvas in canvases:
+        for y, row in enumerate(canvas.rows[:height]):
+            if row:
+                rows[y] = overlay_row(rows[y], row)
+    return rows
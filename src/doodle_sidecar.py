@@ -0,0 +1,214 @@
+"""Append-only binary store for doodle canvases.
+
+The file starts with ``MAGIC`` and is a sequence of canvas records (see
+``DoodleCanvas.to_record``) followed by an index block::
+
+    <II> next_id, count
+    <III> doodle_id, offset, length      (count times)
+    <I> index length, INDEX_MAGIC
+
+A save appends only the records of canvases that changed, then a fresh index
+pointing at them and at the untouched records further up, so saving one
+stroke doesn't rewrite every drawing. Records and indexes that nothing points
+at any more are dropped by a full rewrite once they outweigh the live ones.
+Reading takes the last index that parses, so a save cut short leaves the
+previous one in effect.
+"""
+
+import json
+import logging
+import os
+import struct
+
+from doodle_canvas import DoodleCanvas
+
+MAGIC = b"FDS1"
+INDEX_MAGIC = b"FDX1"
+
+_INDEX_HEADER = struct.Struct("<II")
+_INDEX_ENTRY = struct.Struct("<III")
+_FOOTER = struct.Struct("<I4s")
+
+# Stale bytes tolerated on top of the live ones before a save compacts.
+_SLACK = 4096
+
+
+class DoodleSidecar:
+    def __init__(self, path: str, legacy_json_path: str | None = None):
+        self.path = path
+        self.legacy_json_path = legacy_json_path
+        # doodle_id -> (offset, length) of its record in the file
+        self._index: dict[int, tuple[int, int]] = {}
+        self._next_id = 0
+        # End of the last valid index block: where the next save appends.
+        self._end = 0
+
+    def load(self) -> tuple[int, dict[int, bytes]]:
+        """``(next_id, {doodle_id: record})`` from disk. Records are left
+        encoded; callers decode each canvas when it is first shown."""
+        self._index = {}
+        self._next_id = 0
+        self._end = 0
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return self._load_legacy()
+        except OSError as e:
+            logging.warning(f"Failed to load doodles sidecar {self.path}: {e}")
+            return (1, {})
+        parsed = _parse(data)
+        if parsed is None:
+            logging.warning(f"Doodles sidecar {self.path} has no readable index")
+            return (1, {})
+        self._next_id, self._index, self._end = parsed
+        records = {
+            cid: data[offset : offset + length]
+            for cid, (offset, length) in self._index.items()
+        }
+        return (max(self._next_id, 1), records)
+
+    def _load_legacy(self) -> tuple[int, dict[int, bytes]]:
+        """Read the JSON sidecar older versions wrote. Its canvases aren't in
+        the binary file yet, so the next save writes them all."""
+        path = self.legacy_json_path
+        if path is None or not os.path.exists(path):
+            return (1, {})
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            records = {}
+            for k, v in data.get("canvases", {}).items():
+                cells = [(int(x), int(y), int(ci)) for x, y, ci in v.get("cells", [])]
+                height = max((y for _, y, _ in cells), default=-1) + 1
+                records[int(k)] = DoodleCanvas.from_cells(height, cells).to_record()
+            return (int(data.get("next_id", 1)), records)
+        except (json.JSONDecodeError, OSError, ValueError, TypeError) as e:
+            logging.warning(f"Failed to load doodles sidecar {path}: {e}")
+            return (1, {})
+
+    def save(self, next_id: int, canvases: dict) -> None:
+        """Persist `canvases` ({doodle_id: DoodleCanvas or encoded record}) as
+        the complete set of doodles. Encoded records already in the file and
+        canvases whose ``saved_version`` is current aren't written again;
+        ids no longer present are dropped from the index."""
+        index = {}
+        pending = []  # (doodle_id, canvas or None, record)
+        for cid, canvas in canvases.items():
+            if isinstance(canvas, (bytes, bytearray)):
+                if cid in self._index:
+                    index[cid] = self._index[cid]
+                else:
+                    pending.append((cid, None, bytes(canvas)))
+            elif canvas.is_empty():
+                continue
+            elif canvas.saved_version == canvas.version and cid in self._index:
+                index[cid] = self._index[cid]
+            else:
+                pending.append((cid, canvas, canvas.to_record()))
+
+        if not pending and index.keys() == self._index.keys():
+            if next_id == self._next_id or not index:
+                return  # nothing changed, or nothing worth a file
+
+        kept = sum(length for _, length in index.values())
+        stale = self._end - len(MAGIC) - kept
+        try:
+            if stale > kept + sum(len(p[2]) for p in pending) + _SLACK:
+                self._rewrite(next_id, index, pending)
+            else:
+                self._append(next_id, index, pending)
+        except OSError as e:
+            logging.warning(f"Failed to write doodles sidecar {self.path}: {e}")
+            return
+        for _cid, canvas, _record in pending:
+            if canvas is not None:
+                canvas.saved_version = canvas.version
+        self._next_id = next_id
+        self._index = index
+        self._drop_legacy()
+
+    def _append(self, next_id, index, pending) -> None:
+        if self._end == 0:
+            mode, self._end = "wb", len(MAGIC)
+        else:
+            mode = "r+b"
+        with open(self.path, mode) as f:
+            if mode == "wb":
+                f.write(MAGIC)
+            f.seek(self._end)
+            f.write(self._pack(next_id, index, pending, self._end))
+            f.truncate()
+            self._end = f.tell()
+
+    def _rewrite(self, next_id, index, pending) -> None:
+        with open(self.path, "rb") as f:
+            kept = []
+            for cid, (offset, length) in index.items():
+                f.seek(offset)
+                kept.append((cid, None, f.read(length)))
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            index.clear()
+            f.write(self._pack(next_id, index, kept + pending, len(MAGIC)))
+            end = f.tell()
+        os.replace(tmp, self.path)
+        self._end = end
+
+    @staticmethod
+    def _pack(next_id, index, pending, offset) -> bytes:
+        """Records for `pending` placed at `offset`, then the index block;
+        `index` is updated with the new records' positions."""
+        out = bytearray()
+        for cid, _canvas, record in pending:
+            index[cid] = (offset + len(out), len(record))
+            out += record
+        block = bytearray(_INDEX_HEADER.pack(next_id, len(index)))
+        for cid, (pos, length) in index.items():
+            block += _INDEX_ENTRY.pack(cid, pos, length)
+        out += block
+        out += _FOOTER.pack(len(block), INDEX_MAGIC)
+        return bytes(out)
+
+    def _drop_legacy(self) -> None:
+        path = self.legacy_json_path
+        if path is None:
+            return
+        self.legacy_json_path = None
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.warning(f"Failed to remove old doodles sidecar {path}: {e}")
+
+
+def _parse(data: bytes):
+    """``(next_id, index, end)`` from the last intact index block in `data`,
+    or None."""
+    if not data.startswith(MAGIC):
+        return None
+    pos = len(data)
+    while True:
+        pos = data.rfind(INDEX_MAGIC, len(MAGIC), pos)
+        if pos < 0:
+            return None
+        end = pos + len(INDEX_MAGIC)
+        footer = end - _FOOTER.size
+        if footer >= len(MAGIC):
+            block_len, _magic = _FOOTER.unpack_from(data, footer)
+            start = footer - block_len
+            if start >= len(MAGIC) and block_len >= _INDEX_HEADER.size:
+                next_id, count = _INDEX_HEADER.unpack_from(data, start)
+                if block_len == _INDEX_HEADER.size + count * _INDEX_ENTRY.size:
+                    index = {}
+                    for cid, offset, length in _INDEX_ENTRY.iter_unpack(
+                        data[start + _INDEX_HEADER.size : footer]
+                    ):
+                        if offset < len(MAGIC) or offset + length > start:
+                            break
+                        index[cid] = (offset, length)
+                    else:
+                        return (next_id, index, end)
+        # INDEX_MAGIC bytes inside a record, or a torn block: look further up.
@@ -2,7 +2,6 @@ import argparse
 import json
 import logging
 import os
-import re
 import textwrap
 import time
 from dataclasses import dataclass
@@ -17,10 +16,13 @@ from textual.binding import Binding
 from textual.theme import Theme
 from textual.widgets import Footer, Input, Markdown, ProgressBar, Tree
 
+import perf
+from command_runner import CommandRunner
 from config import Config
 from node import Node
 from note_tree import NoteTree
 from note_tree_widget import NoteTreeWidget
+from quick_open import PathIndex, QuickOpenScreen
 from search_state import SearchState
 from sticky_notes import StickyNotesScreen, _parse_flashcard
 from themes import THEMES
@@ -131,10 +133,14 @@ class ForestApp(App):
     }
     """
 
+    # ctrl+p is taken by the quick-open palette below.
+    ENABLE_COMMAND_PALETTE = False
+
     BINDINGS = [
         Binding("backspace", "edit_note()", "Edit note", show=True),
         Binding(":", "command_mode()", "Command mode", show=True),
         Binding("grave_accent", "cycle_side_panel()", "Cycle side panel", show=True),
+        Binding("ctrl+p", "quick_open()", "Quick open", show=True),
     ]
 
     _MIN_TREE_WIDTH = 50
@@ -158,8 +164,16 @@ class ForestApp(App):
         )
         self._node_being_edited = None
         self._search = SearchState()
+        # (key, PathIndex) for the quick-open palette; rebuilt only when the
+        # tree or the done/archive filters change between openings.
+        self._quick_open_index = None
 
         self.timer = Timer(self)
+        self.command_runner = CommandRunner(
+            max_concurrent=self.config.command_max_concurrent,
+            timeout=self.config.command_timeout,
+            on_done=self._on_command_done,
+        )
         self._sticky_note_state = None
 
         self._command_history: list[str] = []
@@ -208,9 +222,9 @@ class ForestApp(App):
 
         self._apply_layout()
 
-        next_id, canvases = self.note_tree.load_doodles_sidecar()
+        next_id, records = self.note_tree.load_doodles_sidecar()
         self._doodle_next_id = next_id
-        self.doodle_pane.load_from_sidecar(canvases)
+        self.doodle_pane.load_from_sidecar(records)
         self.note_tree.register_doodle_payload_provider(
             lambda: (self._doodle_next_id, self.doodle_pane.to_sidecar_payload())
         )
@@ -276,6 +290,7 @@ class ForestApp(App):
             return
         self._reconcile_disk(mtime)
 
+    @perf.traced("_reconcile_disk")
     def _reconcile_disk(self, mtime=None):
         """Pull the current on-disk file into the app, merging with any unsaved
         local edits when the two changed disjoint regions. Also the handler for
@@ -323,7 +338,8 @@ class ForestApp(App):
                 nt.mark_synced(disk_lines, mtime)
                 return
             t_merge = time.perf_counter()
-            merged, ok = three_way_merge(nt.base_lines, local, disk_lines)
+            with perf.span("three_way_merge"):
+                merged, ok = three_way_merge(nt.base_lines, local, disk_lines)
             merge_ms = (time.perf_counter() - t_merge) * 1000.0
             if ok:
                 # Disjoint edits: keep both, then write the merge back so disk and
@@ -460,6 +476,25 @@ class ForestApp(App):
         # The expiring/archived panel is command-mode only.
         self.command_info_panel.display = False
 
+    def action_quick_open(self):
+        tree = self.note_tree
+        key = (tree.revision, tree.hide_done, tree.hide_archive)
+        if self._quick_open_index is None or self._quick_open_index[0] != key:
+            index = PathIndex(
+                tree.root, hide_done=tree.hide_done, hide_archive=tree.hide_archive
+            )
+            self._quick_open_index = (key, index)
+        index = self._quick_open_index[1]
+
+        def on_dismiss(node):
+            if node is not None and self.note_tree_widget._node_is_live(node):
+                self.note_tree_widget.update_location(
+                    context_node=node.parent if node.parent else node,
+                    line_node=node,
+                )
+
+        self.push_screen(QuickOpenScreen(index), callback=on_dismiss)
+
     def action_cycle_side_panel(self):
         logging.info("action_cycle_side_panel called")
         sidebar = self.info_sidebar
@@ -524,7 +559,7 @@ class ForestApp(App):
         j = i + 1 if up else i - 1
         if j < k or j >= len(nodes):
             return
-        nodes[i], nodes[j] = nodes[j], nodes[i]
+        nodes.swap(i, j)
         self.note_tree.has_unsaved_operations = True
         self.status_bar.needs_saving = True
         self._copied_refresh_sidebar()
@@ -639,6 +674,32 @@ class ForestApp(App):
         self.info_sidebar.show_help()
         self._pending_sidebar_focus = True
 
+    def _cmd_perf(self, cmd_str, args_str):
+        action, _, rest = args_str.partition(" ")
+        if action == "off":
+            perf.enable(False)
+            self.notify("Tracing off")
+            return
+        if action == "dump":
+            path = rest.strip() or self.note_tree.filename + ".trace.json"
+            try:
+                count = perf.dump_chrome_trace(path)
+            except OSError as e:
+                self.notify(f"Trace dump failed: {e}", severity="error")
+                return
+            self.notify(f"Wrote {count} spans to {path}")
+            return
+        if action == "reset":
+            perf.reset()
+        elif action:
+            self.notify("Usage: perf [off|reset|dump [path]]")
+            return
+        if not perf.enabled():
+            perf.enable()
+            self.notify("Tracing on")
+        self.info_sidebar.show_perf(perf.summary(), perf.cache_stats())
+        self._pending_sidebar_focus = True
+
     def _cmd_doodle(self, cmd_str, args_str):
         sub = args_str.strip()
         if sub == "clear":
@@ -659,11 +720,7 @@ class ForestApp(App):
             return
         node = self.note_tree_widget.cursor_node
         if node.text.startswith("!"):
-            try:
-                logging.info("Running command")
-                node.run_command()
-            except Exception as e:
-                logging.error(f"Could not run command: {e}")
+            self.run_note_command(node)
             return
         paths = extract_path_references(node.text)
         if not paths:
@@ -709,6 +766,37 @@ class ForestApp(App):
     def _cmd_random(self, cmd_str, args_str):
         self.note_tree_widget.jump_to_random(global_scope=cmd_str == "random*")
 
+    def _cmd_run_cancel(self, cmd_str, args_str):
+        count = self.command_runner.cancel_all()
+        self.notify(f"Cancelled {count} command(s)" if count else "No commands running")
+
+    def run_note_command(self, node) -> None:
+        """Start `node`'s `!` command in the background; the outcome is
+        reported by _on_command_done when it finishes."""
+        command = node.shell_command()
+        if command:
+            logging.info("Running command")
+            self.command_runner.run(command)
+
+    def _on_command_done(self, result) -> None:
+        label = result.command[:50]
+        if result.cancelled:
+            return
+        if result.timed_out:
+            self.notify(
+                f"⏱ Killed after {self.command_runner.timeout:g}s: {label}",
+                severity="warning",
+            )
+            return
+        lines = result.output.strip().splitlines()
+        if not result.ok:
+            detail = f"\n{lines[-1][:80]}" if lines else ""
+            self.notify(
+                f"✗ Exit {result.returncode}: {label}{detail}", severity="error"
+            )
+        elif lines:
+            self.notify(f"✓ {label}\n{lines[0][:80]}")
+
     def _cmd_timer_cancel(self, cmd_str, args_str):
         self.timer.cancel()
 
@@ -721,30 +809,13 @@ class ForestApp(App):
         scope_root = (
             self.note_tree.root if global_scope else self.note_tree.context_node
         )
-        all_nodes = scope_root.get_node_list(
-            only_visible=False,
-            hide_done=True,
-            hide_archive=self.note_tree.hide_archive,
-        )
-        all_nodes = [
-            n
-            for n in all_nodes
-            if n.parent is not None and n is not self.note_tree.context_node
-        ]
+        matched = self.note_tree.find_sticky_matches(scope_root, filter_arg)
 
         if not filter_arg:
-            matched = [n for n in all_nodes if n.highlight_index is not None]
             title = "#HL"
         elif filter_arg in ("#HL1", "#HL2", "#HL3"):
-            hl_idx = int(filter_arg[-1]) - 1
-            matched = [n for n in all_nodes if n.highlight_index == hl_idx]
             title = filter_arg
         else:
-            try:
-                pat = re.compile(filter_arg, re.IGNORECASE)
-            except re.error:
-                pat = re.compile(re.escape(filter_arg), re.IGNORECASE)
-            matched = [n for n in all_nodes if pat.search(n.text)]
             title = f"/{filter_arg}/"
 
         matched = self._filter_flashcard_answers(matched)
@@ -765,16 +836,15 @@ class ForestApp(App):
         if not state:
             self.notify("No sticky note board to recover.")
             return
-        all_tree_ids = {
-            id(n)
-            for n in self.note_tree.root.get_node_list(
-                only_visible=False,
-                hide_done=False,
-                hide_archive=self.note_tree.hide_archive,
-            )
-        }
+        # Keep the board's notes that are still in the tree (and not hidden
+        # as archived) -- checked per note, without listing the tree.
+        nt = self.note_tree
         valid_nodes = [
-            n for n in state["nodes"] if id(n) in all_tree_ids and not n.is_done()
+            n
+            for n in state["nodes"]
+            if nt.is_live(n)
+            and not n.is_done()
+            and not (nt.hide_archive and n.is_archived())
         ]
         valid_nodes = self._filter_flashcard_answers(valid_nodes)
         if not valid_nodes:
@@ -825,8 +895,10 @@ class ForestApp(App):
     # Order matters: more specific prefixes before shorter ones (e.g. "timer cancel" before "timer").
     _COMMAND_REGISTRY = (
         Command(("help",), "_cmd_help"),
+        Command(("perf",), "_cmd_perf", takes_args=True),
         Command(("j+",), "_cmd_journal", takes_args=True),
         Command(("doodle",), "_cmd_doodle", takes_args=True),
+        Command(("run cancel",), "_cmd_run_cancel"),
         Command(("run",), "_cmd_run", takes_args=True),
         Command(("collapse",), "_cmd_collapse"),
         Command(("insert",), "_cmd_insert", takes_args=True),
@@ -860,9 +932,7 @@ class ForestApp(App):
                 new_text = apply_input_substitutions(new_text)
                 node = self._node_being_edited
                 self.note_tree.push_undo(node.parent)
-                node.text = new_text
-                node.post_text_update()
-                self.note_tree.has_unsaved_operations = True
+                self.note_tree.set_node_text(node, new_text)
                 self.note_tree_widget.render()
                 self.note_tree_widget._fix_cursor_position(node)
                 # Editing may add/remove/change a #T- timer.
@@ -1,21 +1,95 @@
+import bisect
+import itertools
 import logging
 import re
-import subprocess
 from collections import defaultdict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 
 from pytimeparse import parse
 
 logger = logging.getLogger(__name__)
 
+# Shared, monotonically increasing revision clock. Every mutation stamps the
+# changed node (and the subtree_revision of all its ancestors) with a fresh
+# value, so caches can validate against `root.subtree_revision` (the tree
+# revision) or any scope node's subtree_revision without tracking edits.
+_revision_clock = itertools.count(1)
+
+# Effective (inherited) flags are cached per node and valid while the node's
+# stamp equals this epoch. Anything that can change them for a whole branch --
+# a #DONE / #ARCHIVE / timer tag appearing or going, or a branch moving under
+# another parent -- bumps it; nodes then refresh lazily, each from its
+# already-refreshed parent, so a full pass is O(N) rather than O(N * depth).
+_flag_epoch = 0
+
+_FLAG_DONE = 1
+_FLAG_ARCHIVED = 2
+_FLAG_DETACHED = 4
+
+# Substrings whose presence in a note's text affects effective flags / expiry.
+_FLAG_TOKENS = ("#DONE", "#ARCHIVE", "#T-")
+
+
+def _invalidate_effective_flags() -> None:
+    global _flag_epoch
+    _flag_epoch += 1
+
+
+def _closes_branch(text: str) -> bool:
+    """Whether a note's own tags make it and its branch done or archived."""
+    return "#DONE" in text or "#ARCHIVE" in text
+
+
+# Shared empty fields of leaf aggregates.
+_NO_VALUES: dict = {}
+_NO_CHILDREN: tuple = ()
+
+
+@dataclass(slots=True)
+class SubtreeAggregates:
+    """Whole-subtree figures for one node, itself included. `values` maps each
+    $variable to [sum, min, max, count] over the subtree, keyed in the order a
+    depth-first walk first meets them."""
+
+    size: int
+    unarchived_size: int  # 0 if this node is #ARCHIVE; skips archived branches
+    newest_creation: datetime
+    # Leaves with a "?" and no #DONE / #ARCHIVE on the way down from this
+    # node (its ancestors' tags are the caller's concern).
+    open_questions: int
+    # #ARCHIVE notes strictly below this node whose parent isn't #ARCHIVE.
+    archived_roots: int
+    values: dict  # shared and empty for nodes without values; don't mutate
+    # Running totals of the children's size / unarchived_size, for indexing
+    # into the subtree by position (see nth_descendant).
+    child_ends: list
+    child_unarchived_ends: list
+
 
 class Node:
+
     def __init__(self, parent, text, depth=0, is_collapsed=False):
         self.parent = parent
-        self.text = text
+        # revision: bumped when this node's own text, collapse state or child
+        # list changes. subtree_revision: bumped when anything at or below it
+        # changes. See mark_changed().
+        self.revision = next(_revision_clock)
+        self.subtree_revision = self.revision
+        self._text = text
+        # Caches, reset in copies (see __getstate__): (subtree_revision,
+        # SubtreeAggregates) from the last subtree_aggregates() call, and the
+        # effective flags / inherited expiry (see _flag_epoch).
+        self._aggregates = None
+        self._flags_epoch = -1
+        self._flags = 0
+        self._effective_expiry = None
+        # Set on the top node of a branch removed from its tree (see
+        # mark_detached); inherited like the tag flags.
+        self._detached = False
         self.children = []
         self.depth = depth
-        self.is_collapsed = is_collapsed
+        self._is_collapsed = is_collapsed
         self.creation_time = datetime.now()
 
         self.doodle_id: int | None = None
@@ -43,18 +117,171 @@ class Node:
         self.value_dict: dict = {}
         self.extract_values()
 
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @text.setter
+    def text(self, value: str) -> None:
+        if value != self._text:
+            old = self._text
+            self._text = value
+            if any(t in old or t in value for t in _FLAG_TOKENS):
+                _invalidate_effective_flags()
+            self._stamp_revision()
+
+    @property
+    def is_collapsed(self) -> bool:
+        return self._is_collapsed
+
+    @is_collapsed.setter
+    def is_collapsed(self, value: bool) -> None:
+        if value != self._is_collapsed:
+            self._is_collapsed = value
+            self._stamp_revision()
+
+    def mark_changed(self) -> None:
+        """Stamp a fresh revision on this node and propagate it up the
+        ancestor chain's subtree_revision. Called by every method that edits
+        a child list; code that edits `children` directly must call it on the
+        parent itself. Since such an edit may have moved a branch, cached
+        effective flags are invalidated too."""
+        _invalidate_effective_flags()
+        self._stamp_revision()
+
+    def _stamp_revision(self) -> None:
+        rev = next(_revision_clock)
+        self.revision = rev
+        node = self
+        while node is not None:
+            node.subtree_revision = rev
+            node = node.parent
+
     def extract_values(self) -> None:
+        old_values = self.value_dict
         self.value_dict = {}
-        if "$" not in self.text:
-            return
-        for key, value in re.findall(
-            r"\$([a-zA-Z_]+)\s?=\s?([\-\+]?[\d.]+)", self.text
-        ):
-            try:
-                value = float(value)
-            except ValueError:
-                continue
-            self.value_dict[key.lower()] = value
+        if "$" in self.text:
+            for key, value in re.findall(
+                r"\$([a-zA-Z_]+)\s?=\s?([\-\+]?[\d.]+)", self.text
+            ):
+                try:
+                    value = float(value)
+                except ValueError:
+                    continue
+                self.value_dict[key.lower()] = value
+        # Runs after the text setter already stamped a revision; re-stamp if
+        # the values moved so aggregates computed in between aren't trusted.
+        if old_values != self.value_dict:
+            self.mark_changed()
+
+    def __getstate__(self):
+        # Undo snapshots deepcopy nodes; the caches are rebuilt on demand, so
+        # don't copy them.
+        state = self.__dict__.copy()
+        state["_aggregates"] = None
+        state["_flags_epoch"] = -1
+        state["_flags"] = 0
+        state["_effective_expiry"] = None
+        return state
+
+    def subtree_aggregates(self) -> SubtreeAggregates:
+        """Aggregates over this node's subtree, cached against
+        subtree_revision. After an edit only the ancestor chain recomputes,
+        each from its children's cached results."""
+        cached = self._aggregates
+        if cached is not None and cached[0] == self.subtree_revision:
+            return cached[1]
+        return self._compute_aggregates()
+
+    def _compute_aggregates(self) -> SubtreeAggregates:
+        if not self.children:
+            # Leaves are most of the tree: skip the merge bookkeeping.
+            values = self.value_dict
+            text = self._text
+            aggregates = SubtreeAggregates(
+                1,
+                0 if "#ARCHIVE" in text else 1,
+                self.creation_time,
+                int("?" in text and not _closes_branch(text)),
+                0,
+                {k: [v, v, v, 1] for k, v in values.items()} if values else _NO_VALUES,
+                _NO_CHILDREN,
+                _NO_CHILDREN,
+            )
+            self._aggregates = (self.subtree_revision, aggregates)
+            return aggregates
+
+        text = self._text
+        archived = "#ARCHIVE" in text
+        size = 1
+        unarchived_size = 1
+        newest = self.creation_time
+        open_questions = 0
+        archived_roots = 0
+        values = {k: [v, v, v, 1] for k, v in self.value_dict.items()}
+        child_ends = []
+        child_unarchived_ends = []
+        for child in self.children:
+            agg = child.subtree_aggregates()
+            size += agg.size
+            unarchived_size += agg.unarchived_size
+            child_ends.append(size - 1)
+            child_unarchived_ends.append(unarchived_size - 1)
+            if agg.newest_creation > newest:
+                newest = agg.newest_creation
+            open_questions += agg.open_questions
+            archived_roots += agg.archived_roots
+            if not archived and "#ARCHIVE" in child._text:
+                archived_roots += 1
+            for k, (total, low, high, count) in agg.values.items():
+                stats = values.get(k)
+                if stats is None:
+                    values[k] = [total, low, high, count]
+                else:
+                    stats[0] += total
+                    stats[1] = min(stats[1], low)
+                    stats[2] = max(stats[2], high)
+                    stats[3] += count
+        if archived:
+            unarchived_size = 0
+        if _closes_branch(text):
+            open_questions = 0
+
+        aggregates = SubtreeAggregates(
+            size,
+            unarchived_size,
+            newest,
+            open_questions,
+            archived_roots,
+            values,
+            child_ends,
+            child_unarchived_ends,
+        )
+        self._aggregates = (self.subtree_revision, aggregates)
+        return aggregates
+
+    def descendant_count(self, hide_archive=False) -> int:
+        """Number of notes below this one (-1 for an #ARCHIVE note when
+        hide_archive is set, matching get_node_list)."""
+        agg = self.subtree_aggregates()
+        return (agg.unarchived_size if hide_archive else agg.size) - 1
+
+    def nth_descendant(self, n, hide_archive=False):
+        """The node at index `n` of get_node_list(hide_archive=...) (0 is this
+        node), found by descending through cached subtree sizes instead of
+        building the list."""
+        node = self
+        while n:
+            n -= 1
+            agg = node.subtree_aggregates()
+            ends = agg.child_unarchived_ends if hide_archive else agg.child_ends
+            i = bisect.bisect_right(ends, n)
+            if i == len(ends):
+                raise IndexError("descendant index out of range")
+            if i:
+                n -= ends[i - 1]
+            node = node.children[i]
+        return node
 
     def ensure_path(self, text_list):
         if not text_list:
@@ -159,42 +386,74 @@ class Node:
             path_str = "…" + path_str[-(width - 1) :]
         return path_str
 
+    def _refresh_effective_flags(self) -> None:
+        """Recompute the cached flags / expiry of this node and any stale
+        ancestors, top-down, each from its parent's cached values."""
+        stale = []
+        node = self
+        while node is not None and node._flags_epoch != _flag_epoch:
+            stale.append(node)
+            node = node.parent
+        if node is not None:
+            flags, expiry = node._flags, node._effective_expiry
+        else:
+            flags, expiry = 0, None
+        for node in reversed(stale):
+            text = node.text
+            if "#DONE" in text:
+                flags |= _FLAG_DONE
+            if "#ARCHIVE" in text:
+                flags |= _FLAG_ARCHIVED
+            if node._detached:
+                flags |= _FLAG_DETACHED
+            if node.expiry_datetime:
+                expiry = node.expiry_datetime
+            node._flags = flags
+            node._effective_expiry = expiry
+            node._flags_epoch = _flag_epoch
+
     def is_done(self, consider_parent=True):
-        done = False
-        if "#DONE" in self.text:
-            done = True
-        if (
-            not done
-            and consider_parent
-            and self.parent
-            and self.parent.is_done(consider_parent=True)
-        ):
-            done = True
-
-        return done
+        if not consider_parent:
+            return "#DONE" in self.text
+        if self._flags_epoch != _flag_epoch:
+            self._refresh_effective_flags()
+        return bool(self._flags & _FLAG_DONE)
 
     def is_archived(self, consider_parent=True):
-        if "#ARCHIVE" in self.text:
-            return True
-        if (
-            consider_parent
-            and self.parent
-            and self.parent.is_archived(consider_parent=True)
-        ):
-            return True
-        return False
+        if not consider_parent:
+            return "#ARCHIVE" in self.text
+        if self._flags_epoch != _flag_epoch:
+            self._refresh_effective_flags()
+        return bool(self._flags & _FLAG_ARCHIVED)
+
+    def mark_detached(self) -> None:
+        """Record that this node's branch was removed from its tree (deleted,
+        replaced by undo, or dropped with a reloaded tree), so is_detached()
+        answers from the flag cache instead of searching child lists."""
+        self._detached = True
+        _invalidate_effective_flags()
+
+    def is_detached(self) -> bool:
+        """Whether this node is in a removed branch (see mark_detached)."""
+        if self._flags_epoch != _flag_epoch:
+            self._refresh_effective_flags()
+        return bool(self._flags & _FLAG_DETACHED)
 
     def is_highlighted(self):
         return self.highlight_index is not None
 
     def get_expiry(self):
-        if self.expiry_datetime:
-            return self.expiry_datetime
-        if self.parent is None:
-            return None
-        return self.parent.get_expiry()
+        if self._flags_epoch != _flag_epoch:
+            self._refresh_effective_flags()
+        return self._effective_expiry
 
     def extract_expiry(self):
+        old_expiry = self.expiry_datetime
+        self._parse_expiry()
+        if self.expiry_datetime != old_expiry:
+            _invalidate_effective_flags()
+
+    def _parse_expiry(self):
         # Token forms (see reset_expiry / expiry_status):
         #   #T-<duration>@<expiry-iso>  -- current form; keeps duration for reset
         #   #T-<duration>               -- relative; computed + migrated in place
@@ -249,6 +508,7 @@ class Node:
         if duration_seconds is None:
             return False
         self.expiry_datetime = datetime.now() + timedelta(seconds=duration_seconds)
+        _invalidate_effective_flags()
         marker = "*" if self.expiry_recurring else ""
         new_token = self.expiry_datetime.strftime(
             f"#T-{marker}{self.expiry_duration}@%Y-%m-%dT%H:%M:%S"
@@ -331,11 +591,12 @@ class Node:
         self.text = " ".join(words)
 
     def get_days_old(self, recurse=False):
-        days = (datetime.now() - self.creation_time).days
         if self.is_collapsed or recurse:
-            return min([days] + [c.get_days_old(recurse=True) for c in self.children])
-        else:
-            return days
+            # Whole days are monotonic in time, so the youngest note's age is
+            # the minimum over the branch.
+            newest = self.subtree_aggregates().newest_creation
+            return (datetime.now() - newest).days
+        return (datetime.now() - self.creation_time).days
 
     def get_text(self):
         text = self.text
@@ -349,28 +610,29 @@ class Node:
         #     text = text + " [•••]"
 
         hashtags = self.get_hashtags()
+        # Each entry is [sum, min, max, count]; see subtree_aggregates().
         if "sum" in hashtags:
-            if branch_values := self.get_branch_values():
+            if branch_values := self.subtree_aggregates().values:
                 values_str = "|".join(
-                    [f"Σ{k}={sum(v)}" for k, v in branch_values.items()]
+                    [f"Σ{k}={v[0]}" for k, v in branch_values.items()]
                 )
                 text += f" ({values_str})"
         if "max" in hashtags:
-            if branch_values := self.get_branch_values():
+            if branch_values := self.subtree_aggregates().values:
                 values_str = "|".join(
-                    [f"max({k})={max(v)}" for k, v in branch_values.items()]
+                    [f"max({k})={v[2]}" for k, v in branch_values.items()]
                 )
                 text += f" ({values_str})"
         if "min" in hashtags:
-            if branch_values := self.get_branch_values():
+            if branch_values := self.subtree_aggregates().values:
                 values_str = "|".join(
-                    [f"min({k})={min(v)}" for k, v in branch_values.items()]
+                    [f"min({k})={v[1]}" for k, v in branch_values.items()]
                 )
                 text += f" ({values_str})"
         if "avg" in hashtags:
-            if branch_values := self.get_branch_values():
+            if branch_values := self.subtree_aggregates().values:
                 values_str = "|".join(
-                    [f"avg({k})={sum(v)/len(v)}" for k, v in branch_values.items()]
+                    [f"avg({k})={v[0]/v[3]}" for k, v in branch_values.items()]
                 )
                 text += f" ({values_str})"
 
@@ -391,6 +653,8 @@ class Node:
                 return
             ancestor = ancestor.parent
         node.parent.children.remove(node)
+        node.parent.mark_changed()
+        node._detached = False
 
         if as_sibling and self.parent is not None:
             new_parent = self.parent
@@ -398,10 +662,12 @@ class Node:
             new_parent.children.insert(insert_index, node)
             node.parent = new_parent
             new_parent.update_child_depth()
+            new_parent.mark_changed()
         else:
             node.parent = self
             self.children.insert(0, node)
             self.update_child_depth()
+            self.mark_changed()
 
     def add_child(self, text, top=False, index=None):
         child = Node(self, text, self.depth + 1)
@@ -411,6 +677,7 @@ class Node:
             self.children.insert(index, child)
         else:
             self.children.append(child)
+        self.mark_changed()
         return child
 
     def add_directly_below(self, is_context):
@@ -437,6 +704,8 @@ class Node:
         if not self.parent:
             return
         self.parent.children.remove(self)
+        self.parent.mark_changed()
+        self.mark_detached()
 
     def delete_single(self):
         if not self.parent:
@@ -456,6 +725,8 @@ class Node:
             # pass to parent
             self.parent.adopt_children_from_node(self)
             self.parent.children.remove(self)
+        self.parent.mark_changed()
+        self.mark_detached()
 
     def update_child_depth(self):
         for c in self.children:
@@ -471,6 +742,8 @@ class Node:
             c.parent = self
         node.children = []
         self.update_child_depth()
+        node.mark_changed()
+        self.mark_changed()
 
     def move_shallower(self):
         # move up a level in the hierarchy
@@ -483,8 +756,10 @@ class Node:
         self.depth -= 1
         self.update_child_depth()
         parent.children.remove(self)
+        parent.mark_changed()
         self.parent = grandparent
         grandparent.children.insert(grandparent.children.index(parent) + 1, self)
+        grandparent.mark_changed()
 
     def move_deeper(self, done_are_hidden=False):
         parent = self.parent
@@ -501,11 +776,13 @@ class Node:
         prev_sibling = siblings[sibling_index - 1]
 
         parent.children.remove(self)
+        parent.mark_changed()
 
         self.depth += 1
         self.update_child_depth()
         self.parent = prev_sibling
         prev_sibling.children.append(self)
+        prev_sibling.mark_changed()
 
     def show(self):
         indentation = "\t" * self.depth
@@ -537,11 +814,13 @@ class Node:
         self.extract_expiry()  # check if the expiry has changed
         self.extract_values()
 
-    def run_command(self):
+    def shell_command(self):
+        """The shell command of a `!` note (run by ForestApp.run_note_command),
+        or None if this isn't one."""
         # first check if there is a command -- indicated by .. !
         if not self.text.startswith("!"):
             logger.info(f"Invalid command: '{self.text}'")
-            return
+            return None
 
         # Drop Forest control tokens (timer / done / highlight) so they are not
         # passed to the shell -- relevant when a command note also carries #T-.
@@ -552,25 +831,23 @@ class Node:
             and w != "#DONE"
             and w not in self.HIGHLIGHT_HASHTAGS
         ]
-        command = " ".join(words).strip() + " > /dev/null 2>&1 &"
-
-        # cmdStr=WEB_BROWSER+" https://www.youtube.com/results?search_query="+youtubeStr.replace(' ','+')+" > /dev/null 2>&1 &"
-        subprocess.call(command, shell=True)
-        logger.info("Ran command")
+        return " ".join(words).strip() or None
 
     def get_branch_values(self) -> defaultdict:
         """
-        Recursively collect all of the values defined in notes ($variable=value)
+        Collect all of the values defined in notes ($variable=value) in this
+        branch, as {variable: [values]} in tree order. Branches whose
+        subtree_aggregates() hold no values aren't descended into.
         """
-
         all_values = defaultdict(list)
-        for k, v in self.value_dict.items():
-            all_values[k].append(v)
-
-        for n in self.children:
-            for k, v in n.get_branch_values().items():
-                all_values[k].extend(v)
-
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if not node.subtree_aggregates().values:
+                continue
+            for k, v in node.value_dict.items():
+                all_values[k].append(v)
+            stack.extend(reversed(node.children))
         return all_values
 
 
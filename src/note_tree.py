@@ -1,15 +1,21 @@
 import copy
-import json
+import itertools
 import logging
 import os
 import random
 import re
 import textwrap
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
 
+from date_index import DateIndex
+from doodle_sidecar import DoodleSidecar
 from node import Node, lca_distance
+from perf import traced, watch_cache
 from subtrees import SUBTREES
-from utils import (add_subtree, convert_to_nested_list, normalize_indentation,
+from text_scan import TextBuffer, compile_scan_pattern
+from utils import (ExpiryQueue, LRUCache, OrderedSet, ShiftIndex, SlotMap,
+                   add_subtree, convert_to_nested_list, normalize_indentation,
                    trigram_similarity)
 
 # Matches inline metadata suffix like " @{2026-03-05,b7,x}" at end of line
@@ -17,6 +23,36 @@ METADATA_RE = re.compile(r"\s+@\{([^}]+)\}$")
 
 # import pyclip
 
+# Beyond this many logged visible-list changes a full rebuild is cheaper than
+# having a stale consumer replay them.
+_MAX_VISIBLE_CHANGES = 512
+
+# Shifts logged in the visible-position index before it is dropped (and
+# rebuilt on the next lookup).
+_MAX_POSITION_SHIFTS = 256
+
+
+@dataclass(frozen=True)
+class VisibleChange:
+    """One splice of `visible_node_list`: the nodes at [start, start +
+    len(old_nodes)) were replaced by `new_nodes`. Consumers (the tree widget)
+    replay these in order to patch their own row model."""
+
+    start: int
+    old_nodes: list
+    new_nodes: list
+    next_node: object  # the node right after the span (None at the end)
+
+
+@dataclass(frozen=True)
+class BranchStats:
+    """Figures about one branch (its root included) for the command-mode
+    info line."""
+
+    newest_creation: datetime
+    open_questions: int  # "?" leaves not #DONE / #ARCHIVE, even by inheritance
+    archived_branches: int  # #ARCHIVE notes whose parent isn't #ARCHIVE
+
 
 class NoteTree:
     def __init__(self, filename, undo_depth=50):
@@ -31,9 +67,13 @@ class NoteTree:
         self._redo_stack = []
         self._undo_depth = undo_depth
 
-        self.doodles_sidecar_path = self.filename + ".doodles.json"
-        # App registers a callable returning (next_id: int, canvases: dict[int, dict])
-        # to have its doodle state persisted alongside save().
+        self.doodles_sidecar = DoodleSidecar(
+            self.filename + ".doodles",
+            legacy_json_path=self.filename + ".doodles.json",
+        )
+        # App registers a callable returning (next_id: int, canvases: dict[int,
+        # DoodleCanvas | bytes]) to have its doodle state persisted alongside
+        # save(); still-encoded records stand for canvases never opened.
         self._doodle_payload_provider = None
 
         # Snapshot of the file's on-disk content at the last point Forest and
@@ -43,6 +83,50 @@ class NoteTree:
         self._base_lines: list[str] = []
         self._disk_mtime: float = 0.0
 
+        # Regex-scan memo (see scan_regex): joined text buffers and match lists,
+        # keyed by the tree revision so edits invalidate them implicitly.
+        self._scan_buffers = LRUCache(maxsize=4)
+        self._scan_results = LRUCache(maxsize=32)
+        watch_cache("scan_results", self._scan_results)
+        # Ranked result lists of find_by_query / find_by_similarity /
+        # find_sticky_matches, keyed on query, scope, options and the scope's
+        # revision stamp (see _scope_stamp).
+        self._search_cache = LRUCache(maxsize=64)
+        watch_cache("search", self._search_cache)
+        # BranchStats per (node, _scope_stamp), for the command-mode info line.
+        self._branch_stats = LRUCache(maxsize=16)
+        watch_cache("branch_stats", self._branch_stats)
+
+        # Visible list of the context (see update_visible_node_list). Local
+        # mutations splice it and log a VisibleChange instead of rebuilding;
+        # a full rebuild takes a fresh visible_epoch and clears the log.
+        # _visible_state_at records the (revision, context, filters) the list
+        # was last brought up to date with, so unlogged edits are detected.
+        self.visible_node_list = []
+        self.visible_changes: list[VisibleChange] = []
+        self._visible_epochs = itertools.count(1)
+        self.visible_epoch = 0
+        self._visible_state_at = None
+        # Lists of recently left contexts, keyed on (context, filters), with
+        # their epoch, change log and position index, so returning to one
+        # (zoom out, history back, search preview) readopts it as it was.
+        # Validated against the context's _scope_stamp.
+        self._visible_lists = LRUCache(maxsize=8)
+        watch_cache("visible_lists", self._visible_lists)
+        # id(node) -> index in visible_node_list (a ShiftIndex kept in step
+        # with splices), built on first lookup; see visible_position.
+        self._visible_positions = None
+
+        # Nodes owning a #T- timer (see _register_subtree), so expiry checks
+        # and the sidebar's Expiring section never walk the whole tree.
+        self.timers = ExpiryQueue()
+        # Dated notes and year branches, synced lazily by revision (see
+        # DateIndex) for the journal view and journal insertion.
+        self.date_index = DateIndex()
+        # doodle_id -> the node that last took it (see set_doodle_id), so the
+        # sidecar's orphan sweep never walks the tree.
+        self.doodle_owners: dict[int, Node] = {}
+
         lines = self.read_disk_lines()
         self.apply_lines(lines)
         self._base_lines = lines
@@ -67,6 +151,12 @@ class NoteTree:
     def base_lines(self) -> list[str]:
         return self._base_lines
 
+    @property
+    def revision(self) -> int:
+        """Changes whenever any node in the tree changes (see Node.mark_changed)."""
+        return self.root.subtree_revision
+
+    @traced("apply_lines")
     def apply_lines(self, lines):
         """(Re)build the whole tree and all file-derived state from `lines`.
 
@@ -74,15 +164,21 @@ class NoteTree:
         root, bookmarks, copied_nodes, context node, doodle ids and timer
         pre-marking. Does NOT touch session toggles (hide_done/hide_archive) or
         the undo stacks — those are the caller's concern."""
+        old_root = getattr(self, "root", None)
+        if old_root is not None:
+            old_root.mark_detached()
         self.root = Node(parent=None, text=self.filename)
         # journal is a cached node pointer; a reload changes node identities, so
         # drop it (ensure_journal_existence re-discovers it on next use).
         self.journal = None
-        self.bookmarks: dict[int, Node] = {}
-        self.copied_nodes: list[Node] = []
+        # slot -> node, with O(1) node -> slot (see get_bookmark_slot)
+        self.bookmarks = SlotMap()
+        # Copied (quick-link) notes in stack order, with O(1) membership.
+        self.copied_nodes = OrderedSet()
         copied_by_index: dict[int, Node] = {}
         bookmark_only_nodes: list[Node] = []
         context_node = None
+        self.doodle_owners = {}
 
         cur_node = self.root
         prev_depth = -1
@@ -133,21 +229,22 @@ class NoteTree:
             if creation_time is None:
                 creation_time = _now
 
-            # Build tree structure
+            # Build tree structure. Nodes are attached directly rather than via
+            # add_child: the whole tree is fresh, so there are no cached
+            # revisions to invalidate and the per-insert ancestor walk of
+            # mark_changed() would only slow the load down.
             if depth > prev_depth:
-                child = cur_node.add_child(text)
-                cur_node = child
+                parent = cur_node
             elif depth == prev_depth:
-                sibling = cur_node.parent.add_child(text)
-                cur_node = sibling
-            elif depth < prev_depth:
+                parent = cur_node.parent
+            else:
                 nb_steps = prev_depth - depth
                 for _ in range(nb_steps):
                     cur_node = cur_node.parent
-                node = cur_node.parent.add_child(text)
-                cur_node = node
+                parent = cur_node.parent
+            cur_node = Node(parent, text, parent.depth + 1, is_collapsed=is_collapsed)
+            parent.children.append(cur_node)
 
-            cur_node.is_collapsed = is_collapsed
             cur_node.creation_time = creation_time
             if bookmark_slot is not None:
                 self.bookmarks[bookmark_slot] = cur_node
@@ -162,24 +259,26 @@ class NoteTree:
 
             prev_depth = depth
 
-        self.copied_nodes = [node for _, node in sorted(copied_by_index.items())]
+        self.copied_nodes = OrderedSet(
+            node for _, node in sorted(copied_by_index.items())
+        )
         # Bookmarks without a matching c# entry (legacy format): append so the
         # invariant "every bookmarked node is in copied_nodes" holds.
         for node in bookmark_only_nodes:
-            if node not in self.copied_nodes:
-                self.copied_nodes.append(node)
+            self.copied_nodes.append(node)
         # Pin bookmarked entries to the start (= bottom of sidebar), sorted by slot.
-        slot_of = {id(n): s for s, n in self.bookmarks.items()}
-        bookmarked = [n for n in self.copied_nodes if id(n) in slot_of]
-        bookmarked.sort(key=lambda n: slot_of[id(n)], reverse=True)
-        others = [n for n in self.copied_nodes if id(n) not in slot_of]
-        self.copied_nodes = bookmarked + others
+        self._sort_copied_by_bookmarks()
 
         node_list = self.index_nodes()
 
         if len(self.root.children) == 0:
             add_subtree(self.root, SUBTREES["WELCOME"])
             self.root.children[0].is_collapsed = True
+        # The parse attaches children without mark_changed, so they carry
+        # newer revisions than the root's subtree_revision. Stamp the root
+        # past them all, so revision-driven syncs (the date index) see the
+        # whole load as one revision and later syncs only visit edits.
+        self.root.mark_changed()
 
         self.has_unsaved_operations = False
         self.context_node = context_node or self.root
@@ -187,9 +286,12 @@ class NoteTree:
 
         # Nodes already expired at load are pre-marked so opening the file
         # doesn't fire a burst of stale notifications.
+        self.timers.clear()
+        self._register_subtree(self.root)
         _now = datetime.now()
-        for n in self.iter_timer_nodes():
+        for n in self.timers.keys():
             n.expiry_notified = _now > n.expiry_datetime
+        self.date_index.clear()
 
     def apply_external(self, new_lines, recover: bool):
         """Replace the in-memory tree with a reparse of `new_lines` (a reload or
@@ -225,6 +327,7 @@ class NoteTree:
         """Serialize the whole tree to the on-disk line format (the inverse of
         apply_lines). Shared by save() and the external-change reconciler."""
         node_list = self.root.get_node_list(only_visible=False, hide_done=False)
+        copied_pos = {node: i for i, node in enumerate(self.copied_nodes)}
         lines = []
         for node in node_list:
             if node == self.root:
@@ -234,15 +337,13 @@ class NoteTree:
 
             meta_parts = [node.creation_time.strftime("%Y-%m-%d")]
 
-            for slot, bm_node in self.bookmarks.items():
-                if bm_node == node:
-                    meta_parts.append(f"b{slot}")
-                    break
+            slot = self.bookmarks.slot_of(node)
+            if slot is not None:
+                meta_parts.append(f"b{slot}")
 
-            for i, copied_node in enumerate(self.copied_nodes):
-                if copied_node == node:
-                    meta_parts.append(f"c{i}")
-                    break
+            copied_index = copied_pos.get(node)
+            if copied_index is not None:
+                meta_parts.append(f"c{copied_index}")
 
             if node == self.context_node:
                 meta_parts.append("x")
@@ -255,6 +356,7 @@ class NoteTree:
             lines.append(line)
         return lines
 
+    @traced("save")
     def save(self):
         lines = self.serialize_lines()
 
@@ -269,36 +371,29 @@ class NoteTree:
         self._disk_mtime = self._current_mtime()
         self._save_doodles_sidecar()
 
-    def load_doodles_sidecar(self) -> tuple[int, dict[int, dict]]:
-        path = self.doodles_sidecar_path
-        if not os.path.exists(path):
-            return (1, {})
-        try:
-            with open(path, "r") as f:
-                data = json.load(f)
-            raw_canvases = data.get("canvases", {})
-            canvases: dict[int, dict] = {}
-            for k, v in raw_canvases.items():
-                canvases[int(k)] = {
-                    "cells": [tuple(t) for t in v.get("cells", [])],
-                }
-            next_id = int(data.get("next_id", 1))
-            # Bump next_id past any d# actually present in the tree.
-            max_d = 0
-            for node in self.root.get_node_list(
-                only_visible=False, hide_done=False, hide_archive=False
-            ):
-                if node.doodle_id is not None and node.doodle_id > max_d:
-                    max_d = node.doodle_id
-            next_id = max(next_id, max_d + 1)
-            return (next_id, canvases)
-        except (json.JSONDecodeError, OSError, ValueError) as e:
-            logging.warning(f"Failed to load doodles sidecar {path}: {e}")
-            return (1, {})
+    def load_doodles_sidecar(self) -> tuple[int, dict[int, bytes]]:
+        """``(next_id, {doodle_id: encoded canvas})``; see DoodleSidecar."""
+        next_id, records = self.doodles_sidecar.load()
+        # Bump next_id past any d# actually present in the tree.
+        return (max(next_id, max(self.doodle_owners, default=0) + 1), records)
 
     def register_doodle_payload_provider(self, provider):
         self._doodle_payload_provider = provider
 
+    def set_doodle_id(self, node, doodle_id: int | None) -> None:
+        """Give `node` a doodle (or take it away, with None)."""
+        old = node.doodle_id
+        if old is not None and self.doodle_owners.get(old) is node:
+            del self.doodle_owners[old]
+        node.doodle_id = doodle_id
+        if doodle_id is not None:
+            self.doodle_owners[doodle_id] = node
+
+    def doodle_is_live(self, doodle_id: int) -> bool:
+        """True if an attached node still carries `doodle_id`."""
+        node = self.doodle_owners.get(doodle_id)
+        return node is not None and node.doodle_id == doodle_id and self.is_live(node)
+
     def _save_doodles_sidecar(self):
         if self._doodle_payload_provider is None:
             return
@@ -309,83 +404,375 @@ class NoteTree:
             return
 
         # Orphan sweep: only keep canvases whose id is owned by a live node.
-        live_ids = {
-            n.doodle_id
-            for n in self.root.get_node_list(
-                only_visible=False, hide_done=False, hide_archive=False
-            )
-            if n.doodle_id is not None
-        }
-        canvases = {cid: c for cid, c in canvases.items() if cid in live_ids}
-
-        if not canvases and not os.path.exists(self.doodles_sidecar_path):
-            return  # nothing to persist, nothing to clean
-
-        payload = {
-            "version": 1,
-            "next_id": next_id,
-            "canvases": {
-                str(cid): {
-                    "cells": [list(t) for t in c.get("cells", [])],
-                }
-                for cid, c in canvases.items()
-            },
-        }
-        path = self.doodles_sidecar_path
-        tmp = path + ".tmp"
-        try:
-            with open(tmp, "w") as f:
-                json.dump(payload, f)
-            os.replace(tmp, path)
-        except OSError as e:
-            logging.warning(f"Failed to write doodles sidecar {path}: {e}")
+        canvases = {cid: c for cid, c in canvases.items() if self.doodle_is_live(cid)}
+        self.doodles_sidecar.save(next_id, canvases)
 
     def update_visible_node_list(self):
+        self._stash_visible_list()
+        ctx = self.context_node
+        self._visible_state_at = self._visible_state()
+        entry = self._visible_lists.pop((ctx, self.hide_done, self.hide_archive))
+        if entry is not None and entry[0] == self._scope_stamp(ctx):
+            (
+                _stamp,
+                self.visible_node_list,
+                self.visible_epoch,
+                self.visible_changes,
+                self._visible_positions,
+            ) = entry
+            return
+        self.visible_epoch = next(self._visible_epochs)
+        self.visible_changes = []
+        self._visible_positions = None
+        self.visible_node_list = self._build_visible_list(ctx)
+
+    def _build_visible_list(self, ctx) -> list:
         # Context node's children are always visible (the tree renders them
-        # regardless of collapse state), so treat it as expanded here.
-        was_collapsed = self.context_node.is_collapsed
-        self.context_node.is_collapsed = False
-        self.visible_node_list = self.context_node.get_node_list(
+        # regardless of collapse state), so treat it as expanded here. Built
+        # without toggling ctx.is_collapsed, which would bump the tree revision.
+        if self._is_hidden(ctx):
+            return []
+        visible = [ctx]
+        for child in ctx.children:
+            visible.extend(self._visible_subtree(child))
+        return visible
+
+    def prebuild_visible_list(self, ctx):
+        """Build `ctx`'s visible list (under the current filters) ahead of a
+        visit and file it like a stashed one. Returns (epoch, list), or None
+        if a valid one is already filed or `ctx` is the current context."""
+        if ctx is self.context_node:
+            return None
+        key = (ctx, self.hide_done, self.hide_archive)
+        stamp = self._scope_stamp(ctx)
+        entry = self._visible_lists.get(key)
+        if entry is not None and entry[0] == stamp:
+            return None
+        visible = self._build_visible_list(ctx)
+        epoch = next(self._visible_epochs)
+        self._visible_lists.put(key, (stamp, visible, epoch, [], None))
+        return epoch, visible
+
+    def _stash_visible_list(self) -> None:
+        """Keep the outgoing list for a later return to its context, if it is
+        up to date with the tree (and its change log short enough to be worth
+        replaying). The context and filters may already have moved on; the
+        list is filed under the ones it was built for."""
+        state = self._visible_state_at
+        if state is None or state[0] != self.revision:
+            return
+        if len(self.visible_changes) > _MAX_VISIBLE_CHANGES:
+            return
+        _revision, ctx, hide_done, hide_archive = state
+        self._visible_lists.put(
+            (ctx, hide_done, hide_archive),
+            (
+                self._scope_stamp(ctx),
+                self.visible_node_list,
+                self.visible_epoch,
+                self.visible_changes,
+                self._visible_positions,
+            ),
+        )
+
+    # ---------------------------------------------- visible-list patching
+    #
+    # Structural edits are bracketed by _begin_visible_change (before the
+    # mutation) and _end_visible_change (after). Each affected region is a
+    # contiguous run of one parent's children; afterwards the run is re-listed
+    # between its two untouched neighbouring siblings and spliced into
+    # visible_node_list, so the cost follows the size of the edit, not of the
+    # context. Anything the brackets can't vouch for falls back to
+    # update_visible_node_list.
+
+    def _visible_state(self):
+        return (self.revision, self.context_node, self.hide_done, self.hide_archive)
+
+    def visible_list_is_current(self) -> bool:
+        """False if the tree, context or filters changed since the visible list
+        was last rebuilt or patched (e.g. an edit made outside NoteTree)."""
+        return self._visible_state_at == self._visible_state()
+
+    def _is_hidden(self, node) -> bool:
+        return (self.hide_done and node.is_done()) or (
+            self.hide_archive and "#ARCHIVE" in node.text
+        )
+
+    def _visible_subtree(self, node) -> list:
+        return node.get_node_list(
             only_visible=True,
             hide_done=self.hide_done,
             hide_archive=self.hide_archive,
         )
-        self.context_node.is_collapsed = was_collapsed
 
-    def iter_timer_nodes(self) -> list[Node]:
-        """Return every node that owns a #T- expiry (whole tree, ignoring
-        hide/done/archive filters). Lightweight iterative stack walk that only
-        ever visits attached nodes, so detached/deleted nodes can never appear
-        (no liveness guard needed). Cheap enough to call on every expiry tick
-        and from the sidebar's Expiring section."""
-        out = []
-        stack = [self.root]
+    def visible_position(self, node):
+        """Index of `node` in visible_node_list, or None if it isn't listed."""
+        positions = self._visible_positions
+        if positions is None:
+            positions = ShiftIndex()
+            for i, n in enumerate(self.visible_node_list):
+                positions[id(n)] = i
+            self._visible_positions = positions
+        return positions.get(id(node))
+
+    def _subtree_span_end(self, start, depth) -> int:
+        """Index just past the visible nodes from `start` deeper than `depth`."""
+        visible = self.visible_node_list
+        end = start
+        while end < len(visible) and visible[end].depth > depth:
+            end += 1
+        return end
+
+    def _capture_run(self, parent, lo, hi):
+        """Old span of parent.children[lo:hi] in the visible list, with the
+        nearest shown sibling on each side as anchors. None if the parent's
+        children aren't shown at all (the run can't affect the list)."""
+        ctx = self.context_node
+        if parent is None:
+            return None
+        if parent is ctx:
+            parent_pos = 0
+        else:
+            parent_pos = self.visible_position(parent)
+            if parent_pos is None or parent.is_collapsed:
+                return None
+        children = parent.children
+        prev = next(
+            (c for c in reversed(children[:lo]) if not self._is_hidden(c)), None
+        )
+        nxt = next((c for c in children[hi:] if not self._is_hidden(c)), None)
+        first = next((c for c in children[lo:hi] if not self._is_hidden(c)), None)
+
+        if first is not None:
+            start = self.visible_position(first)
+        elif nxt is not None:
+            start = self.visible_position(nxt)
+        elif prev is not None:
+            prev_pos = self.visible_position(prev)
+            start = self._subtree_span_end(prev_pos + 1, prev.depth)
+        else:
+            start = parent_pos + 1
+        if start is None:
+            return None
+        if nxt is not None:
+            end = self.visible_position(nxt)
+        else:
+            end = self._subtree_span_end(start, parent.depth)
+        return {"parent": parent, "prev": prev, "next": nxt, "start": start, "end": end}
+
+    def _begin_visible_change(self, *runs):
+        """Capture the regions `runs` ((parent, lo, hi) child slices) occupy
+        before a mutation. Returns a token for _end_visible_change; None means
+        a full rebuild will be needed."""
+        if not self.visible_list_is_current() or not self.visible_node_list:
+            return None
+        # Runs under one parent merge into one slice: the anchors of one must
+        # not lie in the other.
+        by_parent = {}
+        for parent, lo, hi in runs:
+            if parent in by_parent:
+                plo, phi = by_parent[parent]
+                lo, hi = min(lo, plo), max(hi, phi)
+            by_parent[parent] = (lo, hi)
+        regions = []
+        for parent, (lo, hi) in by_parent.items():
+            if parent is not self.context_node and self._is_ancestor_of_context(
+                parent
+            ):
+                return None
+            region = self._capture_run(parent, lo, hi)
+            if region is not None:
+                regions.append(region)
+        # A region nested inside another is re-listed by the outer one. An
+        # empty (insert-only) region sorts before a region starting at the
+        # same spot, which is where its nodes land.
+        regions.sort(key=lambda r: (r["start"], r["end"]))
+        kept = []
+        for region in regions:
+            while kept and region["start"] < kept[-1]["end"]:
+                last = kept[-1]
+                if region["start"] == last["start"]:
+                    kept.pop()  # sorted, so region contains last
+                elif region["end"] <= last["end"]:
+                    break  # last contains region
+                else:
+                    return None
+            else:
+                kept.append(region)
+        return kept
+
+    def _is_ancestor_of_context(self, node) -> bool:
+        cur = self.context_node.parent
+        while cur is not None:
+            if cur is node:
+                return True
+            cur = cur.parent
+        return False
+
+    def _end_visible_change(self, token):
+        """Splice the regions captured by _begin_visible_change, now that the
+        mutation is done, logging one VisibleChange per region."""
+        if token is None or len(self.visible_changes) > _MAX_VISIBLE_CHANGES:
+            self.update_visible_node_list()
+            return
+        relisted = []
+        for region in token:
+            parent, prev, nxt = region["parent"], region["prev"], region["next"]
+            children = parent.children
+            if (prev is not None and prev.parent is not parent) or (
+                nxt is not None and nxt.parent is not parent
+            ):
+                self.update_visible_node_list()
+                return
+            i = children.index(prev) + 1 if prev is not None else 0
+            new_nodes = []
+            while i < len(children) and children[i] is not nxt:
+                new_nodes.extend(self._visible_subtree(children[i]))
+                i += 1
+            relisted.append(new_nodes)
+
+        # Consumers key rows by node, so a node that moved between regions
+        # (a paste) must leave its old span before it's listed in the new one.
+        order = list(range(len(token)))
+        if len(token) > 1:
+
+            def moves_out(k):
+                listed = {
+                    id(n) for j, nodes in enumerate(relisted) if j != k for n in nodes
+                }
+                old_nodes = self.visible_node_list[token[k]["start"] : token[k]["end"]]
+                return any(id(n) in listed for n in old_nodes)
+
+            order.sort(key=lambda k: not moves_out(k))
+        applied = []  # (token index, length delta)
+        for k in order:
+            region, new_nodes = token[k], relisted[k]
+            # Shift by the splices already made in regions listed before it.
+            offset = sum(delta for j, delta in applied if j < k)
+            start, end = region["start"] + offset, region["end"] + offset
+            self._splice_visible(start, end, new_nodes)
+            applied.append((k, len(new_nodes) - (end - start)))
+        self._visible_state_at = self._visible_state()
+
+    def _splice_visible(self, start, end, new_nodes):
+        visible = self.visible_node_list
+        old_nodes = visible[start:end]
+        next_node = visible[end] if end < len(visible) else None
+        visible[start:end] = new_nodes
+        positions = self._visible_positions
+        if positions is not None:
+            if positions.log_length >= _MAX_POSITION_SHIFTS:
+                self._visible_positions = None
+            else:
+                for n in old_nodes:
+                    positions.pop(id(n))
+                positions.shift(end, len(new_nodes) - len(old_nodes))
+                for i, n in enumerate(new_nodes, start):
+                    positions[id(n)] = i
+        self.visible_changes.append(
+            VisibleChange(start, old_nodes, new_nodes, next_node)
+        )
+
+    def _begin_node_change(self, node):
+        """Like _begin_visible_change for an edit to `node` alone (its text or
+        tags), which only matters to the list if it hides or reveals it."""
+        if not self.visible_list_is_current():
+            return None
+        return (node, self.visible_position(node))
+
+    def _end_node_change(self, token):
+        if token is None:
+            self.update_visible_node_list()
+            return
+        node, pos = token
+        if pos is None:
+            if not self._is_hidden(node) and (
+                node.parent is self.context_node
+                or self.visible_position(node.parent) is not None
+            ):
+                # Possibly revealed: re-list it within its parent.
+                self.update_visible_node_list()
+                return
+        elif self._is_hidden(node):
+            end = self._subtree_span_end(pos + 1, node.depth)
+            self._splice_visible(pos, end, [])
+        else:
+            # Still listed: a same-node splice tells consumers to re-wrap it.
+            self._splice_visible(pos, pos + 1, [node])
+        self._visible_state_at = self._visible_state()
+
+    def _sibling_run(self, node):
+        """The one-child run (parent, lo, hi) holding `node`."""
+        i = node.parent.children.index(node)
+        return (node.parent, i, i + 1)
+
+    def _register_subtree(self, subtree_root) -> None:
+        """(Re)register every #T- owner in `subtree_root` with `timers`, and
+        every doodle with `doodle_owners` — for subtrees that (re)enter the
+        tree: load, paste, undo/redo."""
+        stack = [subtree_root]
+        owners = self.doodle_owners
         while stack:
             node = stack.pop()
             if node.expiry_datetime is not None:
-                out.append(node)
+                self._update_timer(node)
+            if node.doodle_id is not None:
+                owners[node.doodle_id] = node
             stack.extend(node.children)
+
+    def _update_timer(self, node) -> None:
+        """Bring `node`'s registration in line with its own #T- expiry after
+        an edit. A timer moved into the future may fire again."""
+        if self.timers.update(node, node.expiry_datetime):
+            if node.expiry_datetime is not None and (
+                node.expiry_datetime >= datetime.now()
+            ):
+                node.expiry_notified = False
+
+    def is_live(self, node) -> bool:
+        """True if `node` still hangs off the current root. Deletes, undo/redo
+        and reloads detach nodes without unregistering them from the timer
+        and date registries (those are pruned lazily, whenever read) or
+        removing them from saved boards. Answered from the nodes' cached
+        flags (see Node.mark_detached), so it doesn't walk the tree."""
+        return not node.is_detached()
+
+    def iter_timer_nodes(self) -> list[Node]:
+        """Return every attached node that owns a #T- expiry, soonest first
+        (whole tree, ignoring hide/done/archive filters). Read from the timer
+        registry; detached nodes found on the way are unregistered."""
+        out = []
+        for node in self.timers.keys():
+            if self.is_live(node):
+                out.append(node)
+            else:
+                self.timers.discard(node)
         return out
 
-    def check_expirations(self, timer_nodes):
-        """Check the given timer nodes since the last call. Returns the notes
-        that crossed expiry (for one-shot notifications/commands). Recurring
-        timers re-arm themselves in place as a side effect."""
+    def next_timer_expiry(self):
+        """When the next registered timer runs out (None if none is pending),
+        i.e. when check_expirations next has anything to do."""
+        return self.timers.next_expiry()
+
+    def check_expirations(self):
+        """Check the timers that ran out since the last call. Returns the
+        notes that crossed expiry (for one-shot notifications/commands).
+        Recurring timers re-arm themselves in place as a side effect."""
         now = datetime.now()
         newly_expired = []
-        for node in timer_nodes:
-            if now > node.expiry_datetime:
-                if not node.expiry_notified:
-                    newly_expired.append(node)
-                    node.expiry_notified = True
-                # Recurring timers re-arm themselves for the next cycle. This
-                # runs even for already-notified (lapsed-while-closed) nodes so
-                # they get a future target, but without re-firing (no backfill).
-                if node.expiry_recurring and node.reset_expiry():
-                    node.expiry_notified = False
-                    self.has_unsaved_operations = True
-            else:
-                node.expiry_notified = False
+        for node in self.timers.pop_due(now):
+            if not self.is_live(node):
+                self.timers.discard(node)
+                continue
+            if not node.expiry_notified:
+                newly_expired.append(node)
+                node.expiry_notified = True
+            # Recurring timers re-arm themselves for the next cycle. This runs
+            # even for already-notified (lapsed-while-closed) nodes so they get
+            # a future target, but without re-firing (no backfill).
+            if node.expiry_recurring and node.reset_expiry():
+                self._update_timer(node)
+                self.has_unsaved_operations = True
         return newly_expired
 
     # --- Undo/Redo ---
@@ -426,6 +813,7 @@ class NoteTree:
             "context_path": self._get_index_path(self.context_node),
         }
 
+    @traced("push_undo")
     def push_undo(self, subtree_root):
         """Save a snapshot before a mutation. Clears the redo stack."""
         self._undo_stack.append(self._make_snapshot(subtree_root))
@@ -441,6 +829,8 @@ class NoteTree:
         reverse = self._make_snapshot(current_node)
 
         restored = snapshot["subtree"]
+        current_node.mark_detached()
+        restored._detached = False
         if not path:
             # Restoring root
             self.root = restored
@@ -452,6 +842,11 @@ class NoteTree:
             parent.children[child_idx] = restored
             restored.depth = parent.depth + 1
             restored.update_child_depth()
+        # The restored copy carries the revisions it was snapshotted with; give
+        # it (and its new ancestors) a fresh one so no cache mistakes it for
+        # the state it replaced.
+        restored.mark_changed()
+        self._register_subtree(restored)
 
         # Restore context node via its saved index path
         self.context_node = self._resolve_index_path(snapshot["context_path"])
@@ -481,11 +876,49 @@ class NoteTree:
 
     def toggle_collapse(self, node: None):
         if node.children:
+            token = None
+            if node.parent is not None:
+                token = self._begin_visible_change(self._sibling_run(node))
             node.toggle_collapse()
-            self.update_visible_node_list()
+            self._end_visible_change(token)
             # self.has_unsaved_operations = True
 
+    def set_node_text(self, node, text):
+        """Replace a note's text (an edit from the input box)."""
+        token = self._begin_node_change(node)
+        node.text = text
+        node.post_text_update()
+        self._update_timer(node)
+        self.has_unsaved_operations = True
+        self._end_node_change(token)
+
+    def cycle_highlight(self, node):
+        token = self._begin_node_change(node)
+        node.cycle_highlight()
+        self._end_node_change(token)
+
+    def toggle_done(self, node):
+        token = self._begin_node_change(node)
+        node.toggle_done()
+        self.has_unsaved_operations = True
+        self._end_node_change(token)
+
+    def renew_expiry(self, node):
+        token = self._begin_node_change(node)
+        node.reset_expiry()
+        self._update_timer(node)
+        self.has_unsaved_operations = True
+        self._end_node_change(token)
+
     def ensure_journal_existence(self):
+        journal = self.journal
+        if (
+            journal is not None
+            and journal.parent is self.root
+            and journal.text == "Journal"
+            and journal in self.root.children
+        ):
+            return
         if not "Journal" in [c.text for c in self.root.children]:
             node = self.root.add_child("Journal")
             self.journal = node
@@ -512,6 +945,16 @@ class NoteTree:
     def contextual_add_new_note(self, focus_node):
         is_context = focus_node == self.context_node
         mode = ""
+        if (
+            is_context
+            or not focus_node.parent
+            or (focus_node.children and not focus_node.is_collapsed)
+        ):
+            # Lands as the first child of focus_node.
+            token = self._begin_visible_change((focus_node, 0, 0))
+        else:
+            # Lands after focus_node (adopting its children, if expanded).
+            token = self._begin_visible_change(self._sibling_run(focus_node))
         if (
             focus_node.children and not focus_node.is_collapsed
         ) or not focus_node.parent:
@@ -528,7 +971,7 @@ class NoteTree:
             new_node.text = random.choice("🌿🍃🍀🍁🍂🌲🌳🌴☘🌱")
             # .index is only consumed by adopt_children_from_node during
             # delete_single; we refresh there before the merge, so skip here.
-            self.update_visible_node_list()
+            self._end_visible_change(token)
             self.has_unsaved_operations = True
 
             return new_node
@@ -540,16 +983,24 @@ class NoteTree:
 
         if direction == "up" and vi > 0:
             target = visible[vi - 1]
+            token = self._begin_visible_change(
+                (node.parent, siblings.index(target), siblings.index(node) + 1)
+            )
             siblings.remove(node)
             siblings.insert(siblings.index(target), node)
+            node.parent.mark_changed()
             self.has_unsaved_operations = True
+            self._end_visible_change(token)
         elif direction == "down" and vi < len(visible) - 1:
             target = visible[vi + 1]
+            token = self._begin_visible_change(
+                (node.parent, siblings.index(node), siblings.index(target) + 1)
+            )
             siblings.remove(node)
             siblings.insert(siblings.index(target) + 1, node)
+            node.parent.mark_changed()
             self.has_unsaved_operations = True
-
-        self.update_visible_node_list()
+            self._end_visible_change(token)
 
     def deindent(self, focus_node, count=1):
         for _ in range(count):
@@ -557,30 +1008,85 @@ class NoteTree:
             # we can only deindent if the focus node is not a direct child of the context node, otherwise,
             #   deindenting will make it move outside of the current context window
             if focus_node.parent != self.context_node:
+                # The node lands right after its old parent, so the run is
+                # that parent within the grandparent.
+                token = self._begin_visible_change(
+                    self._sibling_run(focus_node.parent)
+                )
                 focus_node.move_shallower()
-                self.index_nodes()
                 self.has_unsaved_operations = True
-
-        self.update_visible_node_list()
+                self._end_visible_change(token)
 
     def indent(self, focus_node, count=1):
         for _ in range(count):
+            parent = focus_node.parent
+            if parent is None:
+                break
+            # Joins the preceding (shown) sibling: both make up the run.
+            i = parent.children.index(focus_node)
+            lo = i
+            while lo > 0:
+                lo -= 1
+                if not (self.hide_done and parent.children[lo].is_done()):
+                    break
+            token = self._begin_visible_change((parent, lo, i + 1))
             focus_node.move_deeper(done_are_hidden=self.hide_done)
-            self.index_nodes()
+            self._end_visible_change(token)
         self.has_unsaved_operations = True
-        self.update_visible_node_list()
 
     def delete_focus_node(self, focus_node):
         # TODO: what if we accidentally delete the context node?
+        parent = focus_node.parent
+        if parent is None:
+            return
+        i = parent.children.index(focus_node)
         if focus_node.is_collapsed:
+            token = self._begin_visible_change((parent, i, i + 1))
             focus_node.delete_branch()
         else:
+            # delete_single passes the children to the preceding sibling (or
+            # the parent), so that sibling is part of the run.
+            token = self._begin_visible_change((parent, max(0, i - 1), i + 1))
             # delete_single calls adopt_children_from_node, which sorts by
-            # .index — refresh indices first so the merge order is correct.
-            self.index_nodes()
+            # .index — number the nodes it merges (siblings, with the deleted
+            # node's children in its place) so the merge order is correct.
+            self._index_for_merge(focus_node)
             focus_node.delete_single()
         self.has_unsaved_operations = True
-        self.update_visible_node_list()
+        self._end_visible_change(token)
+
+    @staticmethod
+    def _index_for_merge(node):
+        """Give the nodes delete_single may merge — node's siblings, its
+        preceding sibling's children and its own children — ascending .index
+        values in document order, which is all adopt_children_from_node
+        compares. Local, unlike a full index_nodes()."""
+        siblings = node.parent.children
+        pos = siblings.index(node)
+        prev = siblings[pos - 1] if pos > 0 else None
+        i = 0
+        for sibling in siblings:
+            sibling.index = i
+            i += 1
+            if sibling is node or sibling is prev:
+                for child in sibling.children:
+                    child.index = i
+                    i += 1
+
+    def paste_node(self, source, destination, as_sibling):
+        """Move `source` under `destination` (or right after it)."""
+        runs = []
+        if source.parent is not None:
+            runs.append(self._sibling_run(source))
+        if destination is self.context_node or destination.parent is None:
+            runs.append((destination, 0, 0))
+        else:
+            runs.append(self._sibling_run(destination))
+        token = self._begin_visible_change(*runs)
+        destination.paste_node_here(source, as_sibling=as_sibling)
+        self._register_subtree(source)
+        self.has_unsaved_operations = True
+        self._end_visible_change(token)
 
     def add_journal_entry(self, entry):
         self.ensure_journal_existence()
@@ -600,20 +1106,7 @@ class NoteTree:
         year = str(now.year)
         month = now.strftime("%B")
 
-        # scan all descendants of journal (bottom-up) to find year node at any depth
-        def collect_descendants(node):
-            result = []
-            for child in node.children:
-                result.append(child)
-                result.extend(collect_descendants(child))
-            return result
-
-        year_node = None
-        for node in reversed(collect_descendants(self.journal)):
-            if node.text.split()[0] == year:
-                year_node = node
-                break
-
+        year_node = self._find_year_node(year)
         if year_node is None:
             year_node = self.journal.add_child(year)
 
@@ -626,9 +1119,9 @@ class NoteTree:
         date_str = now.strftime("%Y-%m-%d %H:%M")
         entry = f"[{date_str}] {entry}"
         new_node = month_node.add_child(entry)
-
-        self.index_nodes()
-        self.update_visible_node_list()
+        self._update_timer(new_node)
+        # No visible-list rebuild here: the caller moves the context to the
+        # month, and a stale list is rebuilt on the next render anyway.
 
         self.has_unsaved_operations = True
 
@@ -650,27 +1143,29 @@ class NoteTree:
             return None
         return focus_node.parent if not focus_node.children else focus_node
 
+    @property
+    def links_version(self) -> tuple:
+        """Changes whenever a bookmark or the copied list changes, for caches
+        of anything drawn from them."""
+        return (self.bookmarks.version, self.copied_nodes.version)
+
     def get_bookmark_slot(self, node: Node) -> int | None:
-        for slot, n in self.bookmarks.items():
-            if n is node:
-                return slot
-        return None
+        return self.bookmarks.slot_of(node)
 
     def _sort_copied_by_bookmarks(self) -> None:
         # Bookmarked nodes are pinned to the start of copied_nodes (= bottom of
         # sidebar, which renders reversed). Relative order within each group is
         # preserved.
-        bookmarked = [
-            n for n in self.copied_nodes if self.get_bookmark_slot(n) is not None
-        ]
-        bookmarked.sort(key=lambda n: self.get_bookmark_slot(n), reverse=True)
-        others = [n for n in self.copied_nodes if self.get_bookmark_slot(n) is None]
-        self.copied_nodes[:] = bookmarked + others
+        slot_of = self.bookmarks.slot_of
+        bookmarked = [n for n in self.copied_nodes if slot_of(n) is not None]
+        bookmarked.sort(key=slot_of, reverse=True)
+        others = [n for n in self.copied_nodes if slot_of(n) is None]
+        self.copied_nodes.reorder(bookmarked + others)
 
     def bookmark_split_index(self) -> int:
         """Index in copied_nodes where the non-bookmarked tail begins."""
         for i, n in enumerate(self.copied_nodes):
-            if self.get_bookmark_slot(n) is None:
+            if not self.bookmarks.holds(n):
                 return i
         return len(self.copied_nodes)
 
@@ -695,18 +1190,14 @@ class NoteTree:
             del self.bookmarks[prior]
         # Steal the requested slot; remove displaced holder from copied list entirely.
         if current is not None:
-            try:
-                self.copied_nodes.remove(current)
-            except ValueError:
-                pass
+            self.copied_nodes.discard(current)
         self.bookmarks[slot] = node
-        if node not in self.copied_nodes:
-            self.copied_nodes.append(node)
+        self.copied_nodes.append(node)
         self._sort_copied_by_bookmarks()
         self.has_unsaved_operations = True
 
     def determine_if_bookmarked(self, node: None):
-        return node in self.bookmarks.values()
+        return self.bookmarks.holds(node)
 
     def _rank_nodes_by_similarity(
         self,
@@ -765,45 +1256,131 @@ class NoteTree:
         scored.sort(key=lambda t: -t[1])
         return scored
 
+    def _text_buffer(self) -> TextBuffer:
+        """Joined text of get_node_list() (respecting hide_done/hide_archive),
+        rebuilt only when the tree revision or the filters change."""
+        key = (self.revision, self.hide_done, self.hide_archive)
+        buf = self._scan_buffers.get(key)
+        if buf is None:
+            buf = TextBuffer(self.get_node_list())
+            self._scan_buffers.put(key, buf)
+        return buf
+
+    def scan_regex(self, regex, flags: int = 0) -> list:
+        """First match of `regex` (string or compiled) in every node of
+        get_node_list(), as ``[(node, match)]`` in tree order. One C-level scan
+        over the joined buffer, memoised per (pattern, tree revision). The
+        returned list is shared; callers must not mutate it."""
+        pattern = compile_scan_pattern(regex, flags)
+        key = (
+            pattern.pattern,
+            pattern.flags,
+            self.revision,
+            self.hide_done,
+            self.hide_archive,
+        )
+        matches = self._scan_results.get(key)
+        if matches is None:
+            matches = self._text_buffer().search(pattern)
+            self._scan_results.put(key, matches)
+        return matches
+
     def get_entries_matching_regex(
         self, regex_str: str, group_index=0
     ) -> list[Node, str]:
-        node_list = self.get_node_list()
-
-        matching_nodes = []
-
-        for n in node_list:
-            text = n.text
-            match = re.search(regex_str, text)
-            if match:
-                matching_nodes.append((n, match.group(group_index)))
-
+        matching_nodes = [
+            (n, match.group(group_index)) for n, match in self.scan_regex(regex_str)
+        ]
         matching_nodes = sorted(matching_nodes, key=lambda el: el[1])
         return matching_nodes
 
-    def get_journal_entries_in_day_radius(self, before: int, after: int) -> list:
-        from datetime import date, timedelta
+    def _attached_dated_nodes(self, nodes) -> list:
+        """`nodes` from the date index that still hang off the tree; the
+        detached ones are dropped from the index."""
+        out = []
+        for node in nodes:
+            if self.is_live(node):
+                out.append(node)
+            else:
+                self.date_index.discard(node)
+        return out
+
+    def _find_year_node(self, year: str):
+        """The last note (in tree order) below the journal whose first word is
+        `year`, or None."""
+        self.date_index.sync(self.root)
+        candidates = []
+        for node in self._attached_dated_nodes(self.date_index.year_nodes(year)):
+            ancestor = node.parent
+            while ancestor is not None and ancestor is not self.journal:
+                ancestor = ancestor.parent
+            if ancestor is not None:
+                candidates.append(node)
+        if not candidates:
+            return None
+        return max(candidates, key=self._get_index_path)
 
+    def get_journal_entries_in_day_radius(self, before: int, after: int) -> list:
+        """Notes dated ``[YYYY-MM-DD ...]`` (any year) within `before` days
+        before and `after` days after today's month-day, as ``[(node,
+        full_date)]`` sorted by month-day, then year, then tree order.
+        Honours hide_done/hide_archive like get_node_list."""
         today = date.today()
         start_md = (today - timedelta(days=before)).strftime("%m-%d")
         end_md = (today + timedelta(days=after)).strftime("%m-%d")
-        broad_re = re.compile(r"\[(\d{4}-(\d{2}-\d{2})).*?\]")
+        if start_md <= end_md:
+            in_range = lambda md: start_md <= md <= end_md
+        else:  # year wrap-around (e.g. Dec 28 + 7 days = Jan 4)
+            in_range = lambda md: md >= start_md or md <= end_md
+
+        self.date_index.sync(self.root)
+        dated = dict(self.date_index.entries(in_range))
         matching = []
-        for n in self.get_node_list():
-            m = broad_re.search(n.text)
-            if not m:
+        for n in self._attached_dated_nodes(dated):
+            if self.hide_done and n.is_done():
                 continue
-            full_date, md = m.group(1), m.group(2)
-            if start_md <= end_md:
-                in_range = start_md <= md <= end_md
-            else:  # year wrap-around (e.g. Dec 28 + 7 days = Jan 4)
-                in_range = md >= start_md or md <= end_md
-            if in_range:
-                matching.append((n, full_date))
+            if self.hide_archive and n.is_archived():
+                continue
+            matching.append((n, dated[n], self._get_index_path(n)))
         # Sort by MM-DD first, then by year within the same day
-        matching.sort(key=lambda x: (x[1][5:], x[1][:4]))
-        return matching
+        matching.sort(key=lambda x: (x[1][5:], x[1][:4], x[2]))
+        return [(n, full_date) for n, full_date, _ in matching]
+
+    def branch_stats(self, node) -> BranchStats:
+        """BranchStats of `node`'s branch, read off its subtree aggregates
+        (so only the chain above an edit recomputes) and memoised per scope
+        stamp, which also covers the tags `node` inherits."""
+        key = (node, self._scope_stamp(node))
+        stats = self._branch_stats.get(key)
+        if stats is None:
+            agg = node.subtree_aggregates()
+            questions = agg.open_questions
+            if node.is_done() or node.is_archived():
+                questions = 0
+            archived = agg.archived_roots
+            if (
+                node.parent is not None
+                and "#ARCHIVE" in node.text
+                and "#ARCHIVE" not in node.parent.text
+            ):
+                archived += 1
+            stats = BranchStats(agg.newest_creation, questions, archived)
+            self._branch_stats.put(key, stats)
+        return stats
+
+    def _scope_stamp(self, scope_node) -> tuple:
+        """Revision stamp for a query scoped to `scope_node`: its subtree
+        revision plus the own revision of each ancestor (whose #DONE tag and
+        text reach into the scope via inheritance and path matching). Edits
+        outside the scope leave the stamp, and so cached results, intact."""
+        stamp = [scope_node.subtree_revision]
+        cur = scope_node.parent
+        while cur is not None:
+            stamp.append(cur.revision)
+            cur = cur.parent
+        return tuple(stamp)
 
+    @traced("find_by_query")
     def find_by_query(self, query, global_scope=True, match_path=False, threshold=0.05):
         """User-initiated search (:? and :?? commands, and :run path resolution).
 
@@ -818,6 +1395,21 @@ class NoteTree:
         a [[path]] reference), the full ancestor path of each node is scored
         instead of just node.text.
         """
+        scope = self.root if global_scope else self.context_node
+        cache_key = (
+            "query",
+            query,
+            scope,
+            self._scope_stamp(scope),
+            match_path,
+            threshold,
+            self.hide_done,
+            self.hide_archive,
+        )
+        cached = self._search_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
         try:
             pattern = re.compile(query, re.IGNORECASE)
         except re.error:
@@ -847,8 +1439,11 @@ class NoteTree:
             threshold=threshold,
             regex_prefilter=pattern,
         )
-        return [node for node, _score in ranked]
+        results = [node for node, _score in ranked]
+        self._search_cache.put(cache_key, results)
+        return list(results)
 
+    @traced("find_by_path_beam")
     def find_by_path_beam(self, query, beam_width=3, score_floor=0.15):
         """Resolve a `[[path > to > somewhere]]` link via beam search.
 
@@ -887,6 +1482,7 @@ class NoteTree:
 
         return [node for node, _score in frontier]
 
+    @traced("find_by_similarity")
     def find_by_similarity(self, target_node, n=10):
         """Discovery of notes similar to a given note (empty :? command).
 
@@ -903,23 +1499,29 @@ class NoteTree:
         sorted by similarity descending.  lca_distance and is_in_context are
         metadata for display (dimming out-of-context results, etc.).
         """
-        all_nodes = self.root.get_node_list(
-            only_visible=False, hide_archive=self.hide_archive
-        )
-        nodes = [
-            nd
-            for nd in all_nodes
-            if nd is not target_node
-            and nd is not self.root
-            and len(nd.text.strip()) >= 3
-        ]
-
-        ranked = self._rank_nodes_by_similarity(
-            target_node.text,
-            nodes,
-            coverage_weight=0.1,
-            threshold=0.0,
-        )[:n]
+        # The ranking only depends on the tree; the context-relative metadata
+        # below is cheap and computed fresh.
+        cache_key = ("similar", target_node, self.revision, n, self.hide_archive)
+        ranked = self._search_cache.get(cache_key)
+        if ranked is None:
+            all_nodes = self.root.get_node_list(
+                only_visible=False, hide_archive=self.hide_archive
+            )
+            nodes = [
+                nd
+                for nd in all_nodes
+                if nd is not target_node
+                and nd is not self.root
+                and len(nd.text.strip()) >= 3
+            ]
+
+            ranked = self._rank_nodes_by_similarity(
+                target_node.text,
+                nodes,
+                coverage_weight=0.1,
+                threshold=0.0,
+            )[:n]
+            self._search_cache.put(cache_key, ranked)
 
         results = []
         for node, sim in ranked:
@@ -930,6 +1532,49 @@ class NoteTree:
             results.append((node, sim, dist, in_context))
         return results
 
+    def find_sticky_matches(self, scope_root, filter_arg: str) -> list:
+        """Notes for a sticky board (:sn / :sn*): non-done notes under
+        `scope_root` (excluding the root and context node) that are
+        highlighted, carry the given #HL tag, or match `filter_arg` as a
+        case-insensitive regex. Cached like the other searches."""
+        cache_key = (
+            "sticky",
+            filter_arg,
+            scope_root,
+            self._scope_stamp(scope_root),
+            self.context_node,
+            self.hide_archive,
+        )
+        cached = self._search_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
+        all_nodes = scope_root.get_node_list(
+            only_visible=False,
+            hide_done=True,
+            hide_archive=self.hide_archive,
+        )
+        all_nodes = [
+            n
+            for n in all_nodes
+            if n.parent is not None and n is not self.context_node
+        ]
+
+        if not filter_arg:
+            matched = [n for n in all_nodes if n.highlight_index is not None]
+        elif filter_arg in ("#HL1", "#HL2", "#HL3"):
+            hl_idx = int(filter_arg[-1]) - 1
+            matched = [n for n in all_nodes if n.highlight_index == hl_idx]
+        else:
+            try:
+                pat = re.compile(filter_arg, re.IGNORECASE)
+            except re.error:
+                pat = re.compile(re.escape(filter_arg), re.IGNORECASE)
+            matched = [n for n in all_nodes if pat.search(n.text)]
+
+        self._search_cache.put(cache_key, matched)
+        return list(matched)
+
     @staticmethod
     def _iter_ancestors(node):
         """Yield node and all its ancestors."""
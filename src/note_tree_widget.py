@@ -2,7 +2,9 @@ import math
 import random
 import re
 import textwrap
+import time
 from dataclasses import dataclass
+from datetime import date, datetime
 
 from rich.segment import Segment
 from rich.style import Style
@@ -16,9 +18,11 @@ from textual.strip import Strip
 from clipboard import copy_to_clipboard
 from context_history import ContextHistory
 from note_tree import NoteTree
+from perf import traced, watch_cache
 from subtrees import SUBTREES
 from themes import TEXT_COLOR_REGEX_LIST
-from utils import (add_subtree, extract_path_references, node_subtree_as_text,
+from utils import (LRUCache, ShiftIndex, add_subtree,
+                   extract_path_references, node_subtree_as_text,
                    play_sound_effect)
 
 logging = None
@@ -30,6 +34,14 @@ GUIDE_DEPTH = 4
 # Cells reserved on the left of the text: age column (4) + arrow + space (2).
 _TEXT_LEFT_PAD = 4 + 2
 
+# Characters textwrap expands or replaces; text free of them that fits the
+# width wraps to itself (minus trailing whitespace).
+_WRAP_SPECIAL_CHARS = "\t\n\x0b\x0c\r"
+
+
+def _fits_one_line(text: str, available: int) -> bool:
+    return len(text) <= available and not any(c in text for c in _WRAP_SPECIAL_CHARS)
+
 
 def _truncate_link_segment(text: str, max_chars: int = 30, max_words: int = 5) -> str:
     text = text.strip()
@@ -45,6 +57,47 @@ def _truncate_link_segment(text: str, max_chars: int = 30, max_words: int = 5) -
     return truncated
 
 
+_PLAIN = Style()
+_BOLD = Style(bold=True)
+_DIM = Style(dim=True)
+
+
+def _compile_text_styles(entries):
+    """Fold TEXT_COLOR_REGEX_LIST into one alternation of named groups, plus a
+    final `?` alternative for question marks. One finditer then yields every
+    styled span; where several patterns could match at the same spot, the
+    earlier entry wins."""
+    alternatives = []
+    styles = {}
+    for i, (pattern, formatting) in enumerate(entries):
+        try:
+            re.compile(pattern)
+        except re.error:
+            continue  # reported by NoteTreeWidget.__init__
+        alternatives.append(f"(?P<s{i}>{pattern})")
+        styles[f"s{i}"] = Style.parse(formatting)
+    alternatives.append(r"(?P<q>\?)")
+    return re.compile("|".join(alternatives)), styles
+
+
+_TEXT_STYLE_RE, _TEXT_STYLES = _compile_text_styles(TEXT_COLOR_REGEX_LIST)
+
+
+def _text_style_spans(body: str, q_style):
+    """(start, end, style) spans of TEXT_COLOR_REGEX_LIST matches in `body`,
+    plus `?` characters in `q_style` (skipped when None)."""
+    spans = []
+    for m in _TEXT_STYLE_RE.finditer(body):
+        # lastgroup is the outermost group that closed last: our named one.
+        name = m.lastgroup
+        if name == "q":
+            if q_style is not None:
+                spans.append((m.start(), m.end(), q_style))
+        elif m.end() > m.start():
+            spans.append((m.start(), m.end(), _TEXT_STYLES[name]))
+    return spans
+
+
 @dataclass
 class VisualRow:
     """One screen row. Wrapping is resolved here (one row per wrap segment),
@@ -56,6 +109,10 @@ class VisualRow:
     seg_count: int  # total wrap segments for this node
     text: str  # the wrapped text slice for this row
     is_spacer: bool = False  # blank spacer row inserted between top-level children
+    # Widget width the node was wrapped at. Rows wrapped at another width
+    # (before a resize), or 0 for placeholders of a long note not wrapped
+    # yet, only estimate seg_count until _materialize_rows redoes them.
+    wrap_width: int = 0
 
 
 class NoteTreeWidget(ScrollView):
@@ -100,16 +157,42 @@ class NoteTreeWidget(ScrollView):
         super().__init__(id=id)
         self.note_tree = note_tree
 
-        # Flat render model (source of truth), rebuilt by _build_rows().
+        # Flat render model (source of truth), rebuilt by _build_rows() or
+        # patched by _patch_rows() from the note tree's visible-list changes.
         self.rows: list[VisualRow] = []
-        self.node_first_row: dict[int, int] = {}  # id(node) -> first row index
+        self.node_first_row = ShiftIndex()  # id(node) -> first row index
         self.cursor_row = 0
+        # What the rows were built from: (context, filters, width), the note
+        # tree's visible_epoch, and how many of its visible_changes are in.
+        self._built_key = None
+        self._built_epoch = None
+        self._changes_applied = 0
+        # Row models of recently left contexts, keyed like _built_key:
+        # (epoch, changes applied, rows, node_first_row). Restored when the
+        # note tree readopts that epoch's visible list; see _restore_rows.
+        self._row_models = LRUCache(self._ROW_MODEL_CACHE_SIZE)
+        watch_cache("row_models", self._row_models)
+        self._prebuild_timer = None
+        # The single pending timer wake-up (see _schedule_expiry_wakeup) and
+        # its time.monotonic() deadline.
+        self._expiry_wakeup = None
+        self._expiry_wakeup_due = 0.0
+        self._strip_base = None  # widget's rich_style, resolved per paint
+        # render() only schedules a rebuild (see flush_render); these count
+        # the requests and the rebuilds they were coalesced into.
+        self._render_pending = False
+        self.render_requests = 0
+        self.renders_performed = 0
+        self._strip_day = None  # date ordinal at paint time; ages the gutter
 
         # Browser-style back/forward history of context changes (in-memory only).
         self.context_history = ContextHistory()
 
         self.age_gradient = Gradient((0, "red"), (1, "black"))
-        self._line_cache: dict = {}
+        # Rendered strips keyed by what they show (see _strip_key), so they
+        # survive rebuilds, scrolling and cursor moves.
+        self._strip_cache = LRUCache(self._STRIP_CACHE_SIZE)
+        watch_cache("strips", self._strip_cache)
         # id(node) -> (text, available_width, wrapped_parts); see _build_rows.
         self._wrap_cache: dict[int, tuple[str, int, list[str]]] = {}
 
@@ -119,12 +202,18 @@ class NoteTreeWidget(ScrollView):
 
         global logging
         logging = self.app.logging
+        for pattern, _formatting in TEXT_COLOR_REGEX_LIST:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                logging.error(f"Invalid regex pattern '{pattern}': {e}")
 
     # ------------------------------------------------------------- cursor api
 
     @property
     def cursor_node(self):
         """The logical Node under the cursor (or None)."""
+        self._ensure_rendered()
         if 0 <= self.cursor_row < len(self.rows):
             return self.rows[self.cursor_row].node
         return None
@@ -136,16 +225,14 @@ class NoteTreeWidget(ScrollView):
         return not row.is_spacer and row.seg_index == 0
 
     def _set_cursor(self, index: int) -> None:
+        self._ensure_rendered()
         if not self._is_navigable(index):
             return
         old = self.cursor_row
         self.cursor_row = index
-        # is_cursor is part of the line cache key: invalidate the two rows.
-        self._line_cache = {
-            k: v for k, v in self._line_cache.items() if k[0] not in (old, index)
-        }
         self._update_progress()
         self._scroll_cursor_into_margin()
+        self._schedule_prebuild()
         self.refresh()
 
     def _ensure_cursor_valid(self) -> None:
@@ -164,6 +251,7 @@ class NoteTreeWidget(ScrollView):
 
     def move_cursor_to_line(self, line: int) -> None:
         """Move the cursor to the first navigable row at or after `line`."""
+        self._ensure_rendered()
         n = len(self.rows)
         if n == 0:
             self.cursor_row = 0
@@ -180,16 +268,83 @@ class NoteTreeWidget(ScrollView):
     def _fix_cursor_position(self, target_node) -> None:
         if not target_node:
             return
+        self._ensure_rendered()
         idx = self.node_first_row.get(id(target_node))
         if idx is not None:
             self._set_cursor(idx)
 
     # ------------------------------------------------------------- build rows
 
+    # Shifts logged in node_first_row before it is rebuilt from scratch.
+    _ROW_INDEX_MAX_SHIFTS = 256
+
+    # Rows wrapped exactly on either side of the viewport, in screen heights.
+    _EXACT_MARGIN_SCREENS = 1
+
+    # Cached strips: a few screens' worth for several recently viewed contexts.
+    _STRIP_CACHE_SIZE = 4096
+
+    # Row models kept for recently left contexts (cf. NoteTree._visible_lists).
+    _ROW_MODEL_CACHE_SIZE = 8
+
+    # Idle seconds before pre-building the zoom-in / zoom-out targets, and
+    # the largest context (in notes) worth pre-building.
+    _PREBUILD_DELAY = 0.5
+    _PREBUILD_MAX_NOTES = 2000
+
+    # Seconds between readout repaints while timers exist, and the margin a
+    # wake-up leaves after an expiry.
+    _READOUT_INTERVAL = 30
+    _EXPIRY_SLACK = 0.05
+
+    def _node_rows(
+        self, node, width, wrap_cache, exact=False, context_depth=None
+    ) -> list[VisualRow]:
+        """Rows for one visible node (its wrap segments), reusing and updating
+        `wrap_cache`. Depth is relative to the current context unless
+        `context_depth` says otherwise.
+
+        Wrapping is lazy: a note that fits on one line is exact for free, but
+        a longer one that isn't cached at this width gets placeholder rows
+        (a length-based estimate) unless `exact`. _materialize_rows wraps
+        those once they come near the viewport."""
+        if context_depth is None:
+            context_depth = self.note_tree.context_node.depth
+        depth = max(0, node.depth - context_depth - 1)
+        available = max(1, width - (GUIDE_DEPTH * depth + _TEXT_LEFT_PAD))
+        text = node.get_text()
+        cached = wrap_cache.get(id(node))
+        if cached is not None and cached[0] == text and cached[1] == available:
+            parts = cached[2]
+        elif _fits_one_line(text, available):
+            parts = [text.rstrip()]
+        elif exact:
+            parts = textwrap.wrap(text, width=available) or [""]
+        else:
+            estimate = -(-len(text) // available)
+            return [VisualRow(node, depth, i, estimate, "") for i in range(estimate)]
+        wrap_cache[id(node)] = (text, available, parts)
+        seg_count = len(parts)
+        return [
+            VisualRow(node, depth, i, seg_count, part, wrap_width=width)
+            for i, part in enumerate(parts)
+        ]
+
+    @traced("_build_rows")
     def _build_rows(self) -> None:
-        self.rows = []
-        self.node_first_row = {}
-        ctx = self.note_tree.context_node
+        if self._built_key is not None:
+            self._row_models.put(
+                self._built_key,
+                (
+                    self._built_epoch,
+                    self._changes_applied,
+                    self.rows,
+                    self.node_first_row,
+                ),
+            )
+        if self._restore_rows():
+            return
+        nt = self.note_tree
         width = self.size.width or self.app.size.width
 
         # Re-wrapping every visible node with textwrap dominates a full rebuild
@@ -199,38 +354,252 @@ class NoteTreeWidget(ScrollView):
         # it stays bounded regardless of tree size or edit churn.
         old_wrap_cache = self._wrap_cache
         new_wrap_cache: dict[int, tuple[str, int, list[str]]] = {}
+        self.rows, self.node_first_row = self._rows_for(
+            nt.visible_node_list,
+            width,
+            nt.context_node.depth,
+            old_wrap_cache,
+            new_wrap_cache,
+        )
+        self._wrap_cache = new_wrap_cache
+        self._built_key = self._build_key()
+        self._built_epoch = nt.visible_epoch
+        self._changes_applied = len(nt.visible_changes)
+
+    def _schedule_prebuild(self) -> None:
+        if self._prebuild_timer is not None:
+            self._prebuild_timer.stop()
+        self._prebuild_timer = self.set_timer(
+            self._PREBUILD_DELAY, self._prebuild_neighbours
+        )
 
-        seen_top_level = False
-        for node in self.note_tree.visible_node_list[1:]:  # [0] is the context node
-            depth = max(0, node.depth - ctx.depth - 1)
+    def _prebuild_neighbours(self) -> None:
+        """While idle, build the row models for the parent context and the
+        node under the cursor, so zooming out or in is a cache hit."""
+        self._prebuild_timer = None
+        if self._render_pending:
+            return
+        nt = self.note_tree
+        width = self.size.width or self.app.size.width
+        for ctx in (nt.context_node.parent, self.cursor_node):
+            if ctx is None or not ctx.children:
+                continue
+            if ctx.descendant_count() > self._PREBUILD_MAX_NOTES:
+                continue
+            built = nt.prebuild_visible_list(ctx)
+            if built is None:
+                continue
+            epoch, visible = built
+            rows, index = self._rows_for(visible, width, ctx.depth, {}, {})
+            self._row_models.put(
+                (ctx, nt.hide_done, nt.hide_archive), (epoch, 0, rows, index)
+            )
 
-            if depth == 0:
+    def _rows_for(self, visible, width, context_depth, old_wrap_cache, new_wrap_cache):
+        """Rows and first-row index for a visible list ([0] is its context),
+        wrapping through `old_wrap_cache` and copying the entries used into
+        `new_wrap_cache`."""
+        rows = []
+        index = ShiftIndex()
+        seen_top_level = False
+        for node in visible[1:]:
+            node_rows = self._node_rows(
+                node, width, old_wrap_cache, context_depth=context_depth
+            )
+            cached = old_wrap_cache.get(id(node))
+            if cached is not None:
+                new_wrap_cache[id(node)] = cached
+            if node_rows[0].depth == 0:
                 if seen_top_level:
                     # blank spacer between top-level children (matches old layout)
-                    self.rows.append(VisualRow(node, 0, 0, 1, "", is_spacer=True))
+                    rows.append(VisualRow(node, 0, 0, 1, "", is_spacer=True))
                 seen_top_level = True
+            index[id(node)] = len(rows)
+            rows.extend(node_rows)
+        return rows, index
+
+    def _restore_rows(self) -> bool:
+        """Reinstate the saved row model for the current context if the note
+        tree readopted the visible list it was built from, then replay the
+        changes logged since."""
+        nt = self.note_tree
+        key = self._build_key()
+        entry = self._row_models.pop(key)
+        if entry is None:
+            return False
+        epoch, applied, rows, index = entry
+        if epoch != nt.visible_epoch or applied > len(nt.visible_changes):
+            return False
+        self.rows, self.node_first_row = rows, index
+        self._built_key = key
+        self._built_epoch = epoch
+        self._changes_applied = applied
+        return self._sync_rows()
+
+    def _build_key(self):
+        # Width isn't part of the key: after a resize, rows keep their old
+        # wrap until _materialize_rows reaches them.
+        nt = self.note_tree
+        return (nt.context_node, nt.hide_done, nt.hide_archive)
 
-            available = max(1, width - (GUIDE_DEPTH * depth + _TEXT_LEFT_PAD))
-            text = node.get_text()
-            cached = old_wrap_cache.get(id(node))
-            if cached is not None and cached[0] == text and cached[1] == available:
-                parts = cached[2]
-            else:
-                parts = textwrap.wrap(text, width=available) or [""]
-            new_wrap_cache[id(node)] = (text, available, parts)
-
-            seg_count = len(parts)
-            self.node_first_row[id(node)] = len(self.rows)
-            for i, part in enumerate(parts):
-                self.rows.append(VisualRow(node, depth, i, seg_count, part))
-
-        self._wrap_cache = new_wrap_cache
+    def _sync_rows(self) -> bool:
+        """Bring the rows up to date by replaying the note tree's logged
+        visible-list changes. False if they can't be (the list was rebuilt,
+        or the context or filters changed): the caller rebuilds."""
+        nt = self.note_tree
+        if not nt.visible_list_is_current():
+            nt.update_visible_node_list()
+        if self._built_epoch != nt.visible_epoch or self._built_key != self._build_key():
+            return False
+        changes = nt.visible_changes
+        for change in changes[self._changes_applied :]:
+            self._patch_rows(change)
+        self._changes_applied = len(changes)
+        if self.node_first_row.log_length > self._ROW_INDEX_MAX_SHIFTS:
+            self._reindex_rows()
+        return True
 
+    def _reindex_rows(self) -> None:
+        index = ShiftIndex()
+        for i, row in enumerate(self.rows):
+            if row.seg_index == 0 and not row.is_spacer:
+                index[id(row.node)] = i
+        self.node_first_row = index
+
+    def _block_start(self, node) -> int:
+        """First row of `node`'s block: its spacer row, if it has one."""
+        row = self.node_first_row[id(node)]
+        if row > 0 and self.rows[row - 1].is_spacer and self.rows[row - 1].node is node:
+            row -= 1
+        return row
+
+    def _patch_rows(self, change) -> None:
+        """Replace the rows of change.old_nodes (at visible-list position
+        change.start) with rows for change.new_nodes."""
+        width = self.size.width or self.app.size.width
+        top_depth = self.note_tree.context_node.depth + 1
+        old_nodes, new_nodes = change.old_nodes, change.new_nodes
+        following = change.next_node
+
+        if old_nodes:
+            row_start = self._block_start(old_nodes[0])
+            last_first = self.node_first_row[id(old_nodes[-1])]
+            row_end = last_first + self.rows[last_first].seg_count
+        elif following is not None:
+            row_start = row_end = self._block_start(following)
+        else:
+            row_start = row_end = len(self.rows)
+
+        new_rows = []
+        firsts = []
+        for pos, node in enumerate(new_nodes, change.start):
+            node_rows = self._node_rows(node, width, self._wrap_cache)
+            if pos > 1 and node.depth == top_depth:
+                new_rows.append(VisualRow(node, 0, 0, 1, "", is_spacer=True))
+            firsts.append((node, row_start + len(new_rows)))
+            new_rows.extend(node_rows)
+
+        kept = {id(n) for n in new_nodes}
+        for node in old_nodes:
+            self.node_first_row.pop(id(node))
+            if id(node) not in kept:
+                self._wrap_cache.pop(id(node), None)
+        self.rows[row_start:row_end] = new_rows
+        self.node_first_row.shift(row_end, len(new_rows) - (row_end - row_start))
+        for node, row in firsts:
+            self.node_first_row[id(node)] = row
+
+        # A top-level node after the span gains or loses its spacer when it
+        # stops or starts being the first row.
+        if following is not None and following.depth == top_depth:
+            at = self.node_first_row[id(following)]
+            had_spacer = at > 0 and self.rows[at - 1].is_spacer
+            needs_spacer = at > 0
+            if needs_spacer and not had_spacer:
+                self.rows.insert(at, VisualRow(following, 0, 0, 1, "", is_spacer=True))
+                self.node_first_row.shift(at, 1)
+            elif had_spacer and at == 1:
+                del self.rows[0]
+                self.node_first_row.shift(at, -1)
+
+    def _materialize_rows(self, lo: int, hi: int) -> None:
+        """Wrap exactly the rows in [lo, hi) that are placeholders or were
+        wrapped at another width. A note's true line count may differ from
+        the estimate, so later rows shift: the cursor stays on its note, and a
+        note straddling the top of the viewport moves the scroll offset with
+        it so the rows below don't jump."""
+        rows = self.rows
+        width = self.size.width or self.app.size.width
+        top = int(self.scroll_offset.y)
+        cursor_node = self.cursor_node
+        scroll_shift = 0
+        changed = False
+        i = max(0, lo)
+        while i < min(hi, len(rows)):
+            row = rows[i]
+            if row.wrap_width == width or row.is_spacer:
+                i += 1
+                continue
+            first = i - row.seg_index
+            new_rows = self._node_rows(row.node, width, self._wrap_cache, exact=True)
+            rows[first : first + row.seg_count] = new_rows
+            delta = len(new_rows) - row.seg_count
+            self.node_first_row.shift(first + row.seg_count, delta)
+            if first < top:
+                scroll_shift += delta
+            hi += delta
+            i = first + len(new_rows)
+            changed = True
+        if not changed:
+            return
+        if cursor_node is not None:
+            self.cursor_row = self.node_first_row.get(id(cursor_node), self.cursor_row)
+        self.virtual_size = Size(self.size.width, len(rows))
+        if scroll_shift:
+            self.scroll_to(y=top + scroll_shift, animate=False, force=True, immediate=True)
+
+    def render_lines(self, crop):
+        self._ensure_rendered()
+        # Wrap any placeholder rows about to be painted (plus a margin, so
+        # scrolling into them rarely shifts what's on screen).
+        top = int(self.scroll_offset.y)
+        margin = self.size.height * self._EXACT_MARGIN_SCREENS
+        self._materialize_rows(top - margin, top + self.size.height + margin)
+        # Resolving the CSS style walks the DOM; do it once per paint rather
+        # than once per line.
+        self._strip_base = self.rich_style
+        self._strip_day = date.today().toordinal()
+        return super().render_lines(crop)
+
+    @traced("render")
     def render(self) -> None:
-        """Rebuild the flat render model from the note tree.
+        """Request that the flat render model be brought up to date with the
+        note tree. Requests coalesce until the next frame paints (or, if
+        nothing paints, until the refresh after it), so a burst of them --
+        resizes while dragging, several renders in one handler -- costs one
+        rebuild. Anything that reads the rows first (the cursor API,
+        navigation) flushes the pending render itself.
 
         (Overrides ScrollView.render, which is unused because we paint via the
         Line API in render_line.)"""
+        self.render_requests += 1
+        if not self._render_pending:
+            self._render_pending = True
+            self.refresh()
+            self.call_after_refresh(self.flush_render)
+
+    def _ensure_rendered(self) -> None:
+        if self._render_pending:
+            self.flush_render()
+
+    @traced("flush_render")
+    def flush_render(self) -> None:
+        """Perform a pending render now: patch the rows from the tree's logged
+        visible-list changes when possible, otherwise rebuild them."""
+        if not self._render_pending:
+            return
+        self._render_pending = False
+        self.renders_performed += 1
         tvars = self.app.get_theme_variable_defaults()
         if "age-color-0" in tvars:
             self.age_gradient = Gradient(
@@ -239,11 +608,12 @@ class NoteTreeWidget(ScrollView):
                 (1, tvars["age-color-2"]),
             )
 
-        self.note_tree.update_visible_node_list()
-        self._build_rows()
+        if not self._sync_rows():
+            self._build_rows()
         self.virtual_size = Size(self.size.width, len(self.rows))
-        self._line_cache.clear()
         self._ensure_cursor_valid()
+        self._schedule_prebuild()
+        self._schedule_expiry_wakeup()
 
         self.app.status_bar.context_node = self.note_tree.context_node
         doodle = getattr(self.app, "doodle_pane", None)
@@ -255,29 +625,19 @@ class NoteTreeWidget(ScrollView):
 
     def _restyle_node(self, node) -> bool:
         """Repaint after a styling-only change (highlight / done / copy /
-        bookmark) without rebuilding the whole row list.
-
-        Such changes don't restructure the tree, so the flat row list is
-        unchanged except for `node`'s own text (a hashtag toggle can shift its
-        wrap). We re-wrap just this node in place; if its line count changed we
-        return False so the caller falls back to a full render(). The line cache
-        is cleared wholesale (it only holds ~viewport entries) so dependent
-        rows repaint too — done-dimming of descendants, or a bookmark glyph
-        displaced by LRU replacement on another visible node."""
-        idx = self.node_first_row.get(id(node))
-        if idx is None or idx >= len(self.rows) or self.rows[idx].node is not node:
+        bookmark) without the rest of render().
+
+        Text changes made through NoteTree log a same-node visible change, so
+        syncing re-wraps just `node` (or drops it, if a #DONE now hides it).
+        Returns False if the rows can't be patched, so the caller falls back to
+        a full render(). Dependent rows (done-dimming of descendants, a
+        bookmark glyph displaced onto another visible node) repaint because
+        their strip keys change too."""
+        self._ensure_rendered()
+        if not self._sync_rows():
             return False
-        row0 = self.rows[idx]
-        width = self.size.width or self.app.size.width
-        available = max(1, width - (GUIDE_DEPTH * row0.depth + _TEXT_LEFT_PAD))
-        text = node.get_text()
-        parts = textwrap.wrap(text, width=available) or [""]
-        if len(parts) != row0.seg_count:
-            return False
-        for i, part in enumerate(parts):
-            self.rows[idx + i] = VisualRow(node, row0.depth, i, len(parts), part)
-        self._wrap_cache[id(node)] = (text, available, parts)
-        self._line_cache.clear()
+        self.virtual_size = Size(self.size.width, len(self.rows))
+        self._ensure_cursor_valid()
         self.app.status_bar.needs_saving = self.note_tree.has_unsaved_operations
         self.refresh()
         return True
@@ -308,17 +668,9 @@ class NoteTreeWidget(ScrollView):
             self.context_history.record(self.note_tree.context_node, self.cursor_node)
 
     def _node_is_live(self, node) -> bool:
-        """True if `node` is still attached to the current tree. Verifies child
-        linkage at each step, since delete removes a node from its parent's
-        children without clearing its `parent` pointer, and undo/redo replaces
-        nodes with deep-copies whose ancestor chain no longer reaches the root."""
-        if node is None:
-            return False
-        while node.parent is not None:
-            if node not in node.parent.children:
-                return False
-            node = node.parent
-        return node is self.note_tree.root
+        """True if `node` is still attached to the current tree (see
+        NoteTree.is_live); False for None."""
+        return node is not None and self.note_tree.is_live(node)
 
     def action_history_back(self):
         self._apply_history(self.context_history.back)
@@ -339,16 +691,17 @@ class NoteTreeWidget(ScrollView):
 
     # ------------------------------------------------------------- rendering
 
-    def _label_markup(self, row: VisualRow, is_cursor: bool) -> str:
-        """Build the console-markup string for a row's label (arrow + text)."""
+    def _label_text(self, row: VisualRow, is_cursor: bool) -> Text:
+        """Build a row's label (arrow + text) as styled spans. The note text is
+        never parsed as markup, so brackets in it render literally."""
+        label = Text(no_wrap=True, end="")
         if row.is_spacer:
-            return ""
+            return label
         node = row.node
         tvars = self.app.get_theme_variable_defaults()
         is_first = row.seg_index == 0
         is_last = row.seg_index == row.seg_count - 1
 
-        arrow_str = ""
         if is_first:
             if node.is_collapsed:
                 arrow_char = "⟫"
@@ -357,77 +710,74 @@ class NoteTreeWidget(ScrollView):
             else:
                 arrow_char = "›"
             tag = tvars.get("cursor-arrow" if is_cursor else "default-arrow") or "white"
+            arrow_style = Style.parse(tag)
             if node.is_collapsed:
-                arrow_str = f"[bold {tag}]{arrow_char}[/bold {tag}]"
-            else:
-                arrow_str = f"[{tag}]{arrow_char}[/{tag}]"
+                arrow_style += _BOLD
+            label.append(arrow_char, arrow_style)
             body = " " + row.text  # aligns text one cell past the arrow
         else:
             body = "  " + row.text  # continuation lines align under the text
 
+        body_style = _BOLD if node.depth == self.note_tree.context_node.depth + 1 else None
+        spans = ()
         # An expired note reads as expired even if also done/highlighted, so it
         # takes precedence over both.
         is_expired_owner = node.expiry_datetime is not None and node.is_expired()
         if is_expired_owner:
             red = tvars.get("HL3") or "red"
-            body = f"[dim {red}]{body}[/dim {red}]"
+            body_style = Style.combine([body_style or _PLAIN, Style.parse(f"dim {red}")])
         elif node.is_done():
             tag = tvars.get("dim-text") or "dim"
-            body = f"[{tag}]{body}[/{tag}]"
+            body_style = Style.combine([body_style or _PLAIN, Style.parse(tag)])
         else:
-            for pattern, formatting in TEXT_COLOR_REGEX_LIST:
-                try:
-                    body = re.sub(pattern, f"[{formatting}]\\g<0>[/{formatting}]", body)
-                except re.error as e:
-                    logging.error(f"Invalid regex pattern '{pattern}': {e}")
-            # Question marks stand out: leaf-node questions (open/unanswered)
-            # more than questions on branch nodes.
-            if "?" in body and not node.children:
-                q_var = "HL1"  # "HL3" if  else "HL1"
-                q_color = tvars.get(q_var) or ("red" if not node.children else "green")
-                body = re.sub(r"\?", f"[{q_color}]?[/{q_color}]", body)
             if node.is_highlighted():
                 hashtag = node.get_highlight_hashtag()
                 hl_fallback = {"HL1": "green", "HL2": "yellow", "HL3": "red"}
                 hl = tvars.get(hashtag) or hl_fallback.get(hashtag)
                 if hl:
-                    body = f"[{hl}]{body}[/{hl}]"
+                    body_style = Style.combine([body_style or _PLAIN, Style.parse(hl)])
+            # Question marks stand out: leaf-node questions (open/unanswered)
+            # more than questions on branch nodes.
+            q_style = None
+            if not node.children:
+                q_style = Style.parse(tvars.get("HL1") or "red")
+            spans = _text_style_spans(body, q_style)
 
-        if node.depth == self.note_tree.context_node.depth + 1:
-            body = f"[bold]{body}[/bold]"
+        body_text = Text(body, style=body_style or "")
+        for start, end, style in spans:
+            body_text.stylize(style, start, end)
+        label.append_text(body_text)
 
         if node.is_collapsed and node.children and is_last:
-            descendants = (
-                len(
-                    node.get_node_list(
-                        only_visible=False,
-                        hide_done=False,
-                        hide_archive=self.note_tree.hide_archive,
-                    )
-                )
-                - 1
-            )
+            descendants = node.descendant_count(hide_archive=self.note_tree.hide_archive)
             if descendants > 0:
                 dot_count = min(4, max(1, int(2 * math.log10(descendants + 1))))
-                if node.is_done():
-                    body += f" [dim]{'•' * dot_count}[/dim]"
-                else:
-                    body += f" {'•' * dot_count}"
+                label.append(" ")
+                label.append("•" * dot_count, _DIM if node.is_done() else None)
 
         # Inline time-left / expired readout on the owner note's last segment.
         if node.expiry_datetime is not None and is_last:
             status = node.expiry_status()
             if status is not None:
-                expired, label = status
+                expired, readout = status
                 loop = " ↺" if node.expiry_recurring else ""
+                label.append(" ")
                 if expired:
                     red = tvars.get("HL3") or "red"
-                    body += f" [dim {red}]⌛{label} ago{loop}[/dim {red}]"
+                    label.append(f"⌛{readout} ago{loop}", Style.parse(f"dim {red}"))
                 else:
                     amber = tvars.get("HL2") or "yellow"
-                    body += f" [{amber}]⏳{label}{loop}[/{amber}]"
+                    label.append(f"⏳{readout}{loop}", Style.parse(amber))
+
+        return label
 
-        return arrow_str + body
+    def _gutter_glyph_state(self, node) -> int:
+        """Which slot glyph the gutter shows: 2 bookmark, 1 copied, 0 other."""
+        if self.note_tree.determine_if_bookmarked(node):
+            return 2
+        if node in self.note_tree.copied_nodes:
+            return 1
+        return 0
 
     def _gutter_segments(self, row: VisualRow) -> list[Segment]:
         # [age bar ▎] + [2-cell glyph slot]. The glyph is bookmark > copied >
@@ -443,9 +793,10 @@ class NoteTreeWidget(ScrollView):
 
         glyph, glyph_style = "   ", age_style
         if row.text.strip():
-            if self.note_tree.determine_if_bookmarked(node):
+            glyph_state = self._gutter_glyph_state(node)
+            if glyph_state == 2:
                 glyph = "💠 "
-            elif node in self.note_tree.copied_nodes:
+            elif glyph_state == 1:
                 glyph = "🔹 "
             elif node.expiry_datetime is not None:
                 glyph = "T  "
@@ -464,22 +815,48 @@ class NoteTreeWidget(ScrollView):
         line_text = Text(no_wrap=True, end="")
         line_text.append(" " * (GUIDE_DEPTH * (row.depth + 0)))
 
-        try:
-            label = Text.from_markup(self._label_markup(row, is_cursor))
-        except Exception as e:
-            logging.error(f"Text.from_markup failed: {e}")
-            label = Text("ERROR")
-
-        line_text.append(label)
+        line_text.append_text(self._label_text(row, is_cursor))
 
         # Base style carries the theme background so blank cells (indent, right
         # pad) match the surface; the age column and colored text keep their own
         # colors because apply_style layers the base *underneath* segment styles.
-        base = self.rich_style
+        base = self._strip_base or self.rich_style
         segments = self._gutter_segments(row) + list(line_text.render(self.app.console))
         strip = Strip(segments).apply_style(base)
         return strip.adjust_cell_length(max(self.virtual_size.width, width), base)
 
+    def _strip_key(self, row: VisualRow, is_cursor: bool, width: int) -> tuple:
+        """Everything a row's strip depends on. A collapsed node also shows
+        its descendants (dot count, recursive age), so it is keyed on its
+        subtree revision; done and expiry state are inherited or time-based,
+        so they go in explicitly."""
+        node = row.node
+        note_tree = self.note_tree
+        revision = node.subtree_revision if node.is_collapsed else node.revision
+        expiry = None
+        if node.expiry_datetime is not None and not row.is_spacer:
+            expiry = node.expiry_status()
+        return (
+            node,
+            revision,
+            row.text,
+            row.seg_index,
+            row.seg_count,
+            row.depth,
+            row.is_spacer,
+            node.depth - note_tree.context_node.depth,
+            node.is_done(),
+            expiry,
+            self._gutter_glyph_state(node),
+            note_tree.hide_archive,
+            is_cursor,
+            width,
+            self.app.theme,
+            self._strip_base,
+            self._strip_day,
+        )
+
+    @traced("render_line")
     def render_line(self, y: int) -> Strip:
         width = self.size.width
         scroll_x, scroll_y = self.scroll_offset
@@ -488,12 +865,12 @@ class NoteTreeWidget(ScrollView):
         if index < 0 or index >= len(self.rows):
             return Strip.blank(width, self.rich_style)
 
-        cache_key = (index, width, index == self.cursor_row)
-        if cache_key in self._line_cache:
-            strip = self._line_cache[cache_key]
-        else:
+        strip_width = max(self.virtual_size.width, width)
+        key = self._strip_key(self.rows[index], index == self.cursor_row, strip_width)
+        strip = self._strip_cache.get(key)
+        if strip is None:
             strip = self._build_strip(index, width)
-            self._line_cache[cache_key] = strip
+            self._strip_cache.put(key, strip)
 
         return strip.crop(scroll_x, scroll_x + width)
 
@@ -505,7 +882,7 @@ class NoteTreeWidget(ScrollView):
             return
         # Only node.text changes, so snapshot node (not its parent subtree).
         self.note_tree.push_undo(node)
-        node.cycle_highlight()
+        self.note_tree.cycle_highlight(node)
         if not self._restyle_node(node):
             self.render()
             self._fix_cursor_position(node)
@@ -516,8 +893,7 @@ class NoteTreeWidget(ScrollView):
             return
         # Only node.text changes, so snapshot node (not its parent subtree).
         self.note_tree.push_undo(node)
-        node.toggle_done()
-        self.note_tree.has_unsaved_operations = True
+        self.note_tree.toggle_done(node)
         if not self._restyle_node(node):
             self.render()
             self._fix_cursor_position(node)
@@ -530,8 +906,7 @@ class NoteTreeWidget(ScrollView):
             return
         # Only node.text changes, so snapshot node (not its parent subtree).
         self.note_tree.push_undo(node)
-        node.reset_expiry()
-        self.note_tree.has_unsaved_operations = True
+        self.note_tree.renew_expiry(node)
         self.app.status_bar.show_renew_hint = False
         if not self._restyle_node(node):
             self.render()
@@ -659,9 +1034,7 @@ class NoteTreeWidget(ScrollView):
         self.note_tree.push_undo(destination)
         if as_sibling:
             self.note_tree.push_undo(destination.parent)
-        destination.paste_node_here(source, as_sibling=as_sibling)
-        self.note_tree.index_nodes()
-        self.note_tree.has_unsaved_operations = True
+        self.note_tree.paste_node(source, destination, as_sibling=as_sibling)
         if source in self.note_tree.copied_nodes:
             self.note_tree.copied_nodes.remove(source)
         self.note_tree.remove_bookmark_for(source)
@@ -707,46 +1080,64 @@ class NoteTreeWidget(ScrollView):
         self._fix_cursor_position(new_node)
 
     def on_mount(self) -> None:
-        # Keep the inline time-left readout / expired styling current without a
-        # full rebuild (repaints only viewport rows). See _tick_expiry.
-        # A single tick walks the tree via iter_timer_nodes(); it's cheap
-        # enough (tens of ms even on a 50k-node tree) to run on-demand rather
-        # than maintaining a registry. 30s is ample given minute-granular
-        # countdown labels.
-        self.set_interval(30, self._tick_expiry)
+        self._schedule_expiry_wakeup()
 
-    def _tick_expiry(self) -> None:
-        # Walks the tree for timer nodes each tick, fires notifications for any
-        # that crossed expiry (all timer nodes, not just visible ones), and
-        # keeps the readout / sidebar current.
+    def _schedule_expiry_wakeup(self) -> None:
+        """Arm the one wake-up for the next timer expiry, or — while any timer
+        exists — the next readout refresh, whichever is sooner. Only ever
+        moves it earlier; each wake-up re-arms for whatever is next. Called
+        after every render, so new or edited timers are picked up."""
         nt = self.note_tree
-        timer_nodes = nt.iter_timer_nodes()
-        if not timer_nodes:
+        if not len(nt.timers):
             return
-        expired_nodes = nt.check_expirations(timer_nodes)
+        # Keep the inline time-left readout / expired styling current without
+        # a full rebuild; 30s is ample given minute-granular countdown labels.
+        delay = self._READOUT_INTERVAL
+        expiry = nt.next_timer_expiry()
+        if expiry is not None:
+            until = (expiry - datetime.now()).total_seconds()
+            # Expiry is "now > expiry": wake just after it, not on it.
+            delay = min(delay, max(0.0, until) + self._EXPIRY_SLACK)
+        due = time.monotonic() + delay
+        if self._expiry_wakeup is not None:
+            if due >= self._expiry_wakeup_due:
+                return
+            self._expiry_wakeup.stop()
+        self._expiry_wakeup_due = due
+        self._expiry_wakeup = self.set_timer(delay, self._tick_expiry)
+
+    @traced("_tick_expiry")
+    def _tick_expiry(self) -> None:
+        # Fires notifications for any timer that crossed expiry (all timer
+        # nodes, not just visible ones), keeps the readout / sidebar current
+        # and re-arms for the next expiry.
+        self._expiry_wakeup = None
+        nt = self.note_tree
+        expired_nodes = nt.check_expirations()
         if expired_nodes:
             play_sound_effect("timer")  # same cue as the :timer command
         for node in expired_nodes:
             text = node.get_text()  # timer token already stripped
             loop = " ↺" if node.expiry_recurring else ""
             if text.startswith("!"):
-                node.run_command()
+                self.app.run_note_command(node)
                 self.app.notify(f"▶ Ran: {text[1:].strip()[:50]}{loop}")
             else:
                 self.app.notify(f"⌛ Expired: {text[:50]}{loop}", severity="warning")
-        node = self.cursor_node
+        node = self.cursor_node  # (flushes any pending render)
         self.app.status_bar.show_renew_hint = bool(node and node.is_expired())
         # Repaint only when a timer note is actually on screen.
+        # (The readout is part of the strip key, so changed rows re-render.)
         if any(r.node.expiry_datetime is not None for r in self.rows):
-            self._line_cache.clear()
             self.refresh()
+        self._schedule_expiry_wakeup()
 
     def on_resize(self, event) -> None:
+        # Resizes arrive in bursts while dragging; they coalesce in render().
         self.render()
         if not self._initial_render_done:
             self._initial_render_done = True
-            if self.rows:
-                self.move_cursor_to_line(0)
+            self.move_cursor_to_line(0)
 
     def action_zoom_in(self):
         node = self.cursor_node
@@ -811,6 +1202,7 @@ class NoteTreeWidget(ScrollView):
         self.action_cursor_up()
 
     def action_cursor_down(self):
+        self._ensure_rendered()
         n = len(self.rows)
         if n == 0:
             return
@@ -821,6 +1213,7 @@ class NoteTreeWidget(ScrollView):
                 return
 
     def action_cursor_up(self):
+        self._ensure_rendered()
         n = len(self.rows)
         if n == 0:
             return
@@ -896,6 +1289,7 @@ class NoteTreeWidget(ScrollView):
         self.note_tree.context_node = new_node.parent
         self.render()
         self.move_cursor_to_line(0)
+        self._schedule_expiry_wakeup()
 
     def visit_bookmark(self, bookmark_index: int):
         context = self.note_tree.bookmark_context(bookmark_index)
@@ -903,23 +1297,26 @@ class NoteTreeWidget(ScrollView):
             self.update_location(context)
 
     def jump_to_random(self, global_scope=False):
-        if global_scope:
-            nodes = self.note_tree.root.get_node_list(
-                only_visible=False, hide_archive=self.note_tree.hide_archive
-            )
-        else:
-            nodes = self.note_tree.context_node.get_node_list(
-                only_visible=False, hide_archive=self.note_tree.hide_archive
-            )
-        nodes = [
-            n
-            for n in nodes
-            if n.parent is not None and n is not self.note_tree.context_node
-        ]
-        if not nodes:
+        # Candidates are the scope's get_node_list(hide_archive=...) minus the
+        # scope itself and the context node; pick one by list index so the
+        # list is never built.
+        nt = self.note_tree
+        scope = nt.root if global_scope else nt.context_node
+        count = scope.descendant_count(hide_archive=nt.hide_archive)
+        excluded = None
+        if (
+            scope is not nt.context_node
+            and not (nt.hide_archive and nt.context_node.is_archived())
+        ):
+            excluded = nt.context_node  # listed under the root; skip it
+        if count - (excluded is not None) <= 0:
             self.app.notify("No notes to jump to")
             return
-        target = random.choice(nodes)
+        target = excluded
+        while target is excluded:
+            target = scope.nth_descendant(
+                random.randint(1, count), hide_archive=nt.hide_archive
+            )
         if global_scope:
             if target.parent:
                 self.update_location(target.parent, target)
@@ -962,13 +1359,14 @@ class NoteTreeWidget(ScrollView):
         if not node:
             self.app.status_bar.progress = (0, 0)
             return
-        try:
-            self.app.status_bar.progress = (
-                self.note_tree.visible_node_list.index(node),
-                len(self.note_tree.visible_node_list) - 1,
-            )
-        except ValueError:
+        position = self.note_tree.visible_position(node)
+        if position is None:
             logging.error(f"Node not in list: {node.text}")
+            return
+        self.app.status_bar.progress = (
+            position,
+            len(self.note_tree.visible_node_list) - 1,
+        )
 
     def _scroll_cursor_into_margin(self) -> None:
         line = self.cursor_row
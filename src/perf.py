@@ -0,0 +1,156 @@
+"""Opt-in tracing of the hot paths.
+
+Functions decorated with ``traced(name)`` (and blocks run under
+``span(name)``) record ``(name, start, end, thread)`` into a ring buffer
+while tracing is on. While it is off, which is the default, a traced call
+costs one extra function call and a global flag test.
+
+``summary()`` turns the buffer into per-span p50/p95/max; ``cache_stats()``
+reports hit rates of the LRU caches registered with ``watch_cache``, counted
+from the moment tracing was last switched on or reset. ``dump_chrome_trace``
+writes the buffer in the Trace Event format chrome://tracing and Perfetto
+load. See the ``:perf`` command.
+"""
+
+import functools
+import json
+import os
+import threading
+import weakref
+from collections import deque
+from time import perf_counter_ns
+
+RING_SIZE = 50_000
+
+_enabled = False
+_ring: deque = deque(maxlen=RING_SIZE)
+# name -> spans recorded since the last reset (the ring only keeps the newest)
+_counts: dict[str, int] = {}
+_caches = weakref.WeakValueDictionary()
+# cache name -> (hits, misses) when counting started
+_cache_base: dict[str, tuple[int, int]] = {}
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(on: bool = True) -> None:
+    global _enabled
+    if on and not _enabled:
+        reset()
+    _enabled = on
+
+
+def reset() -> None:
+    _ring.clear()
+    _counts.clear()
+    _cache_base.clear()
+    for name, cache in _caches.items():
+        _cache_base[name] = (cache.hits, cache.misses)
+
+
+def _record(name: str, start: int, end: int) -> None:
+    _ring.append((name, start, end, threading.get_ident()))
+    _counts[name] = _counts.get(name, 0) + 1
+
+
+def traced(name: str):
+    """Decorator recording each call of the function as span `name`."""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(name, start, perf_counter_ns())
+
+        return wrapper
+
+    return decorate
+
+
+class span:
+    """``with span(name):`` records the block, for code that isn't a whole
+    function."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        if _enabled:
+            self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        if _enabled and self.start:
+            _record(self.name, self.start, perf_counter_ns())
+        return False
+
+
+def watch_cache(name: str, cache) -> None:
+    """Report `cache` (anything with `hits`/`misses` counters, e.g. an
+    LRUCache) in cache_stats(). Held weakly; a later cache registered under
+    the same name replaces it."""
+    _caches[name] = cache
+    _cache_base[name] = (cache.hits, cache.misses)
+
+
+def summary() -> list[tuple[str, int, float, float, float]]:
+    """``(name, count, p50_ms, p95_ms, max_ms)`` per span, slowest p95
+    first. Percentiles cover the spans still in the ring; count covers all
+    since the last reset."""
+    durations: dict[str, list[int]] = {}
+    for name, start, end, _tid in _ring:
+        durations.setdefault(name, []).append(end - start)
+    rows = []
+    for name, values in durations.items():
+        values.sort()
+        last = len(values) - 1
+        rows.append(
+            (
+                name,
+                _counts.get(name, len(values)),
+                values[last // 2] / 1e6,
+                values[last * 95 // 100] / 1e6,
+                values[last] / 1e6,
+            )
+        )
+    rows.sort(key=lambda row: -row[3])
+    return rows
+
+
+def cache_stats() -> list[tuple[str, int, int]]:
+    """``(name, hits, misses)`` per watched cache since counting started."""
+    rows = []
+    for name, cache in sorted(_caches.items()):
+        base_hits, base_misses = _cache_base.get(name, (0, 0))
+        rows.append((name, cache.hits - base_hits, cache.misses - base_misses))
+    return rows
+
+
+def dump_chrome_trace(path: str) -> int:
+    """Write the ring to `path` as Trace Event JSON; returns the number of
+    events written."""
+    pid = os.getpid()
+    events = [
+        {
+            "name": name,
+            "ph": "X",
+            "ts": start / 1000,
+            "dur": (end - start) / 1000,
+            "pid": pid,
+            "tid": tid,
+        }
+        for name, start, end, tid in _ring
+    ]
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events)
@@ -0,0 +1,269 @@
+import bisect
+import heapq
+import re
+
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.containers import Vertical
+from textual.screen import ModalScreen
+from textual.widgets import Input, OptionList, Static
+from textual.widgets.option_list import Option
+
+PATH_SEPARATOR = " › "
+
+# Above this share of the index, re-checking the previous keystroke's
+# survivors one by one costs more than rescanning the joined buffer in C.
+_SURVIVOR_RESCAN_FRACTION = 0.25
+
+
+def _fuzzy_pattern(query: str):
+    """Subsequence matcher for `query`: each character may be followed by any
+    run of other characters on the same path line. Each gap excludes the
+    character that ends it (a[^b\\n]*b[^c\\n]*c), so it stops at that
+    character's next occurrence and the match span stays as short as the
+    score wants. Lazy [^\\n]*? gaps instead retried every split of the gaps
+    on a miss, in exponential time.
+
+    A match is real only if group 1 took part (``m.lastindex``). If the rest
+    of the subsequence isn't found after the line's first query[0], it isn't
+    found after any later one either, so the second branch takes the rest of
+    the line and the scan moves on instead of retrying from each later
+    start."""
+    gaps = []
+    for ch in query[1:]:
+        ch = re.escape(ch)
+        gaps.append(f"[^{ch}\\n]*{ch}")
+    # query[0] leads both branches, so the regex engine can still skip ahead
+    # to its occurrences.
+    return re.compile(f"{re.escape(query[0])}(?:({''.join(gaps)})|[^\\n]*)")
+
+
+class PathIndex:
+    """Lowercased full node paths (the untruncated form of
+    Node.get_path_string), sorted by length and joined into one
+    newline-separated buffer so a fuzzy query is a single C-level regex
+    scan. Length order makes len(path) a lower bound on a line's score,
+    which lets `query` stop as soon as its top-k can no longer change."""
+
+    def __init__(self, root, hide_done=False, hide_archive=False):
+        lines = []
+        nodes = []
+        # Iterative walk carrying each parent's (lowercased) path, so a path
+        # is built once per node rather than re-walking the ancestors.
+        stack = [(child, "") for child in reversed(root.children)]
+        while stack:
+            node, parent_path = stack.pop()
+            text = node.text
+            if hide_done and node.is_done():
+                continue
+            if hide_archive and "#ARCHIVE" in text:
+                continue
+            path = (
+                parent_path + PATH_SEPARATOR + text.lower()
+                if parent_path
+                else text.lower()
+            )
+            lines.append(path)
+            nodes.append(node)
+            for child in reversed(node.children):
+                stack.append((child, path))
+
+        order = sorted(range(len(lines)), key=lambda i: len(lines[i]))
+        self.lines = [lines[i] for i in order]
+        self.nodes = [nodes[i] for i in order]
+        self.buffer = "\n".join(self.lines)
+        self.starts = []
+        offset = 0
+        for line in self.lines:
+            self.starts.append(offset)
+            offset += len(line) + 1
+
+        # Incremental state from the previous query: `_survivors` are line
+        # indices (ascending) that may still match an extension of
+        # `_prev_query`; lines from `_tail` onwards were never scanned.
+        self._prev_query = None
+        self._survivors = []
+        self._tail = 0
+
+    def __len__(self):
+        return len(self.lines)
+
+    def query(self, query: str, k: int = 50) -> list:
+        """Return up to `k` nodes whose path contains `query` as a
+        case-insensitive subsequence, best first."""
+        query = query.lower()
+        if not query:
+            self._prev_query = None
+            return []
+
+        pattern = _fuzzy_pattern(query)
+        if (
+            self._prev_query is not None
+            and query.startswith(self._prev_query)
+            and len(self._survivors) <= _SURVIVOR_RESCAN_FRACTION * len(self.lines)
+        ):
+            # Narrowing: anything that missed the shorter query misses this one.
+            survivors, tail = self._survivors, self._tail
+        else:
+            survivors, tail = [], 0
+
+        # Score (lower is better) is path length plus a penalty per character
+        # the match skips over, so it is never below len(path). `heap` keeps
+        # the k best as a max-heap via negation: (-score, -idx, idx).
+        heap = []
+        matched = []
+
+        def offer(idx, m):
+            score = len(self.lines[idx]) + 2 * (m.end() - m.start() - len(query))
+            item = (-score, -idx, idx)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+        def bound_reached(idx):
+            return len(heap) >= k and len(self.lines[idx]) >= -heap[0][0]
+
+        stopped = False
+        for pos, idx in enumerate(survivors):
+            if bound_reached(idx):
+                # Unchecked survivors stay candidates for the next keystroke.
+                matched.extend(survivors[pos:])
+                stopped = True
+                break
+            m = pattern.search(self.lines[idx])
+            if m is not None and m.lastindex:
+                matched.append(idx)
+                offer(idx, m)
+
+        if not stopped and tail < len(self.lines):
+            search = pattern.search
+            buf = self.buffer
+            pos = self.starts[tail]
+            while True:
+                m = search(buf, pos)
+                if m is None:
+                    tail = len(self.lines)
+                    break
+                idx = bisect.bisect_right(self.starts, m.start()) - 1
+                if not m.lastindex:
+                    pass  # no match on this line
+                elif bound_reached(idx):
+                    tail = idx
+                    break
+                else:
+                    matched.append(idx)
+                    offer(idx, m)
+                # One match per line: resume at the next line.
+                if idx + 1 >= len(self.lines):
+                    tail = len(self.lines)
+                    break
+                pos = self.starts[idx + 1]
+
+        self._prev_query = query
+        self._survivors = matched
+        self._tail = tail
+
+        ranked = sorted(heap, reverse=True)
+        return [self.nodes[idx] for _s, _i, idx in ranked]
+
+
+class QuickOpenScreen(ModalScreen):
+    """Ctrl-P palette: fuzzy-match node paths as you type and jump to the
+    highlighted one. Dismisses with the chosen node, or None."""
+
+    BINDINGS = [
+        Binding("escape", "dismiss_screen", "Close"),
+        Binding("down", "move(1)", show=False),
+        Binding("up", "move(-1)", show=False),
+    ]
+
+    CSS = """
+    QuickOpenScreen {
+        align: center top;
+        background: $background 60%;
+    }
+
+    #qo-box {
+        width: 80%;
+        max-width: 100;
+        height: auto;
+        max-height: 80%;
+        margin-top: 2;
+        background: $surface;
+        border: $HL1 75%;
+    }
+
+    #qo-input {
+        border: none;
+        height: 1;
+        padding: 0 1;
+    }
+
+    #qo-results {
+        border: none;
+        height: auto;
+        max-height: 20;
+        scrollbar-size: 0 0;
+    }
+
+    #qo-status {
+        height: 1;
+        padding: 0 1;
+        color: $foreground 40%;
+    }
+    """
+
+    MAX_RESULTS = 50
+
+    def __init__(self, index: PathIndex, **kwargs):
+        super().__init__(**kwargs)
+        self.index = index
+        self._results = []
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="qo-box"):
+            yield Input(placeholder="Jump to note…", id="qo-input")
+            yield OptionList(id="qo-results")
+            yield Static(f"{len(self.index)} notes", id="qo-status")
+
+    def on_mount(self):
+        self.query_one("#qo-input", Input).focus()
+
+    def on_input_changed(self, event: Input.Changed):
+        self._results = self.index.query(event.value, k=self.MAX_RESULTS)
+        option_list = self.query_one("#qo-results", OptionList)
+        width = max(10, option_list.size.width - 2 or 60)
+        option_list.clear_options()
+        option_list.add_options(
+            [Option(n.get_path_string(width=width)) for n in self._results]
+        )
+        if self._results:
+            option_list.highlighted = 0
+        status = self.query_one("#qo-status", Static)
+        if event.value:
+            shown = len(self._results)
+            status.update(f"{shown}{'+' if shown == self.MAX_RESULTS else ''} matches")
+        else:
+            status.update(f"{len(self.index)} notes")
+
+    def on_input_submitted(self, event: Input.Submitted):
+        self.action_choose()
+
+    def on_option_list_option_selected(self, event: OptionList.OptionSelected):
+        self.dismiss(self._results[event.option_index])
+
+    def action_move(self, delta: int):
+        option_list = self.query_one("#qo-results", OptionList)
+        if not self._results:
+            return
+        cur = option_list.highlighted or 0
+        option_list.highlighted = max(0, min(len(self._results) - 1, cur + delta))
+
+    def action_choose(self):
+        option_list = self.query_one("#qo-results", OptionList)
+        if option_list.highlighted is not None and self._results:
+            self.dismiss(self._results[option_list.highlighted])
+
+    def action_dismiss_screen(self):
+        self.dismiss(None)
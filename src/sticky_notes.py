@@ -1,12 +1,22 @@
 import re
 import textwrap
+import weakref
 
+from rich.cells import set_cell_size
+from rich.segment import Segment
+from rich.style import Style
 from textual.app import ComposeResult
 from textual.binding import Binding
-from textual.containers import Grid, VerticalScroll
+from textual.color import Color
+from textual.geometry import Region, Size
 from textual.screen import ModalScreen
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
 from textual.widgets import Static
 
+from perf import watch_cache
+from utils import LRUCache
+
 _DEFAULT_STICKY_COLORS = [
     "#00b0ff",
     "#ff5722",
@@ -23,6 +33,27 @@ NOTE_WIDTH = 20
 NOTE_HEIGHT = 10
 CELL_WIDTH = NOTE_WIDTH + 4  # padding + gutter
 
+# Board layout, in cells: outer padding, gaps between cards, and each card's
+# inner padding.
+_PAD_X, _PAD_Y = 2, 1
+_GUTTER_X, _GUTTER_Y = 2, 1
+_CARD_PAD_X, _CARD_PAD_Y = 2, 1
+_ROW_PITCH = NOTE_HEIGHT + _GUTTER_Y
+
+
+class _FlashcardCache(weakref.WeakKeyDictionary):
+    """node -> (subtree_revision, _parse_flashcard result). The parse reads
+    the note's text and its first child's, which the subtree revision covers.
+    Keyed weakly, so a tree replaced by a reload isn't kept alive through
+    its nodes; counts hits and misses for :perf."""
+
+    hits = 0
+    misses = 0
+
+
+_flashcard_cache = _FlashcardCache()
+watch_cache("flashcards", _flashcard_cache)
+
 
 def _parse_flashcard(node):
     """Parse :: flashcard syntax.
@@ -30,17 +61,28 @@ def _parse_flashcard(node):
     Returns (front, back, is_child_answer) or None if not a flashcard.
     - Inline: "Q :: A" → ("Q", "A", False)
     - Child-answer: "Q ::" or "Q :: #HL1" with children → ("Q", child_text, True)
+
+    Memoised per node revision, since boards re-parse the same notes when
+    they are filtered, opened and recovered.
     """
     if "::" not in node.text:
         return None
+    cached = _flashcard_cache.get(node)
+    if cached is not None and cached[0] == node.subtree_revision:
+        _flashcard_cache.hits += 1
+        return cached[1]
+    _flashcard_cache.misses += 1
     front, _, back_raw = node.text.partition("::")
     front = front.strip()
     back_clean = _STRIP_TAGS_RE.sub("", back_raw).strip()
     if back_clean:  # inline answer
-        return (front, back_clean, False)
+        result = (front, back_clean, False)
     elif node.children:  # child answer
-        return (front, _display_text(node.children[0].text), True)
-    return None
+        result = (front, _display_text(node.children[0].text), True)
+    else:
+        result = None
+    _flashcard_cache[node] = (node.subtree_revision, result)
+    return result
 
 
 def _color_for_text(text: str, sticky_colors):
@@ -76,17 +118,15 @@ def _ancestor_list(node):
     return ancestors[::-1]
 
 
-def _global_common_ancestor(nodes):
-    """Find the deepest ancestor shared by all nodes."""
-    if not nodes:
-        return None
-    paths = [_ancestor_list(n) for n in nodes]
-    shortest = min(len(p) for p in paths)
-    shared = None
-    for depth in range(shortest):
-        if len(set(id(p[depth]) for p in paths)) == 1:
-            shared = paths[0][depth]
-        else:
+def _common_prefix_length(paths) -> int:
+    """Length of the ancestor-list prefix shared by all `paths`. The bound
+    only shrinks, so each path is compared at most up to it."""
+    shared = min(len(p) for p in paths)
+    first = paths[0]
+    for path in paths:
+        while shared and path[shared - 1] is not first[shared - 1]:
+            shared -= 1
+        if not shared:
             break
     return shared
 
@@ -96,18 +136,19 @@ def _group_nodes_by_branch(nodes):
 
     Returns list of (branch_root_node_or_None, [nodes]).
     branch_root is the child of the global common ancestor that roots each group.
+    Each node's ancestor list is built once and shared by both steps.
     """
     if len(nodes) <= 1:
         return [(None, nodes)]
 
-    global_ancestor = _global_common_ancestor(nodes)
-    global_depth = (len(_ancestor_list(global_ancestor)) + 1) if global_ancestor else 0
+    paths = [_ancestor_list(n) for n in nodes]
+    # Depth of the deepest ancestor shared by all nodes (0: none but the root)
+    global_depth = _common_prefix_length(paths)
 
     # Bucket each node by the ancestor just below the global common ancestor
     buckets = {}  # branch_root_node_id -> (branch_root_node, [nodes])
     ungrouped = []
-    for node in nodes:
-        ancestors = _ancestor_list(node)
+    for node, ancestors in zip(nodes, paths):
         if len(ancestors) > global_depth:
             branch_root = ancestors[global_depth]
             key = id(branch_root)
@@ -118,8 +159,8 @@ def _group_nodes_by_branch(nodes):
             ungrouped.append(node)
 
     # Remove from ungrouped any node that is already a branch root
-    # (those nodes will appear as BranchRootWidget, not StickyNoteWidget)
-    branch_root_ids = {id(br) for br, _ in buckets.values()}
+    # (those nodes appear as branch header cards, not note cards)
+    branch_root_ids = set(buckets)
     ungrouped = [n for n in ungrouped if id(n) not in branch_root_ids]
 
     # If everything lands in one bucket, no grouping needed
@@ -132,104 +173,247 @@ def _group_nodes_by_branch(nodes):
     return groups
 
 
-class StickyNoteWidget(Static):
-    can_focus = True
+class _Card:
+    """One card on the board: a matched note, or the header card of a branch
+    group (`is_branch`). Flashcards remember which side is up."""
 
-    def __init__(self, node, hl_colors=None, sticky_colors=None, **kwargs):
-        super().__init__(**kwargs)
-        self.node = node
-        self._flipped = False
-        fc = _parse_flashcard(node)
-        self.is_flashcard = fc is not None
-        if fc:
-            self._front_text = fc[0]
-            self._back_text = fc[1]
-        if hl_colors and node.highlight_index is not None:
-            bg = hl_colors[node.highlight_index]
-            fg = "#000000"
-
-            self.styles.background = bg
-            self.styles.color = f"{fg} 90%"
-        else:
-            fg, bg = _color_for_text(node.text, sticky_colors or _DEFAULT_STICKY_COLORS)
-
-            self.styles.background = f"{bg} 90%"
-            self.styles.color = f"{fg} 90%"
+    __slots__ = ("node", "is_branch", "flipped", "_flashcard")
 
-        # self.styles.background = bg
-        # self.styles.color = f"{fg} 80%"
-        self.styles.height = NOTE_HEIGHT
-        self.styles.padding = (1, 2)
-        self.styles.text_wrap = "wrap"
-        if hl_colors and node.highlight_index is not None:
-            self.styles.text_style = "bold"
+    _UNPARSED = object()
 
-    def compose(self) -> ComposeResult:
-        return []
-
-    def _render_display(self):
-        """Return the formatted display text for the current state."""
-        if self.is_flashcard and self._flipped:
-            display = self._back_text
-        elif self.is_flashcard:
-            display = self._front_text
+    def __init__(self, node, is_branch=False):
+        self.node = node
+        self.is_branch = is_branch
+        self.flipped = False
+        self._flashcard = self._UNPARSED
+
+    @property
+    def flashcard(self):
+        """_parse_flashcard(node), parsed on first use (only painted cards
+        need it)."""
+        if self._flashcard is self._UNPARSED:
+            self._flashcard = None if self.is_branch else _parse_flashcard(self.node)
+        return self._flashcard
+
+    def display_text(self, content_width: int, content_height: int) -> str:
+        node = self.node
+        if self.is_branch:
+            path_str = node.get_path_string(width=content_width * content_height)
+            if not path_str:
+                path_str = _display_text(node.text)
+            return _wrap_and_truncate(path_str, content_width, content_height)
+        fc = self.flashcard
+        if fc is not None:
+            display = ("🅐 " if self.flipped else "🅠 ") + fc[1 if self.flipped else 0]
+        elif node.highlight_index is not None:
+            display = "★ " + _display_text(node.text)
         else:
-            display = _display_text(self.node.text)
-        if self.is_flashcard:
-            display = (
-                # "Ⓐ "
-                "🅐 "
-                # "❈ " #
-                if self._flipped
-                else "🅠 "
-            ) + display
-        elif self.node.highlight_index is not None:
-            display = "★ " + display
-        cw = self.content_size.width
-        ch = self.content_size.height
-        content_width = max(8, cw if cw > 0 else NOTE_WIDTH - 4)
-        content_height = max(2, ch if ch > 0 else NOTE_HEIGHT - 2)
+            display = _display_text(node.text)
         return _wrap_and_truncate(display, content_width, content_height)
 
-    def on_resize(self, event):
-        self.update(self._render_display())
-
-    def flip(self):
-        """Toggle between question and answer for flashcard notes."""
-        if not self.is_flashcard:
-            return
-        self._flipped = not self._flipped
-        self.update(self._render_display())
 
-    def on_click(self):
-        self.screen.dismiss(self.node)
+class StickyBoard(ScrollView):
+    """The board as a virtual grid painted through the Line API: cards are
+    laid out arithmetically and only those on screen are ever rendered, so
+    opening or resizing a board of thousands of notes costs about as much
+    as a small one. Rendered cards are kept in an LRU and reused while
+    scrolling."""
 
+    BINDINGS = [
+        Binding("left", "move(-1, 0)", "Left", show=False),
+        Binding("right", "move(1, 0)", "Right", show=False),
+        Binding("up", "move(0, -1)", "Up", show=False),
+        Binding("down", "move(0, 1)", "Down", show=False),
+        Binding("space", "flip", "Flip", show=False),
+        Binding("enter", "open", "Open", show=False),
+    ]
 
-class BranchRootWidget(StickyNoteWidget):
-    """A sticky note representing a branch's common ancestor."""
+    can_focus = True
 
-    def __init__(self, node, **kwargs):
-        super().__init__(node, **kwargs)
-        self.styles.height = NOTE_HEIGHT
-        self.styles.text_style = "bold"
+    # Rendered cards kept; a few screens' worth.
+    _CARD_CACHE_SIZE = 512
 
-    def _render_branch_display(self):
-        cw = self.content_size.width
-        ch = self.content_size.height
-        content_width = max(8, cw if cw > 0 else NOTE_WIDTH - 6)
-        content_height = max(2, ch if ch > 0 else NOTE_HEIGHT - 4)
-        path_str = self.node.get_path_string(width=content_width * content_height)
-        if not path_str:
-            path_str = _display_text(self.node.text)
-        return _wrap_and_truncate(path_str, content_width, content_height)
+    def __init__(self, cards, hl_colors=None, on_cursor=None, **kwargs):
+        super().__init__(**kwargs)
+        self.cards = cards
+        self.hl_colors = hl_colors or {}
+        self.on_cursor = on_cursor
+        self.cursor = 0
+        self.cols = 1
+        self._col_x: list[int] = [_PAD_X]  # left edge of each column
+        self._col_width: list[int] = [NOTE_WIDTH]
+        self._card_cache = LRUCache(self._CARD_CACHE_SIZE)
+        watch_cache("sticky_cards", self._card_cache)
+        self._palette = None  # per-paint colors, see render_lines
+
+    # --------------------------------------------------------------- layout
+
+    def on_resize(self, event) -> None:
+        self._layout()
+
+    def _layout(self) -> None:
+        width = self.size.width
+        self.cols = cols = max(1, width // CELL_WIDTH)
+        avail = max(cols, width - 2 * _PAD_X - (cols - 1) * _GUTTER_X)
+        base, extra = divmod(avail, cols)
+        self._col_width = [base + (c < extra) for c in range(cols)]
+        self._col_x = []
+        x = _PAD_X
+        for w in self._col_width:
+            self._col_x.append(x)
+            x += w + _GUTTER_X
+        rows = -(-len(self.cards) // cols)
+        height = 2 * _PAD_Y + rows * _ROW_PITCH - (_GUTTER_Y if rows else 0)
+        self.virtual_size = Size(width, height)
+        self.refresh()
+
+    def _card_region(self, index: int) -> Region:
+        row, col = divmod(index, self.cols)
+        return Region(
+            self._col_x[col], _PAD_Y + row * _ROW_PITCH, self._col_width[col], NOTE_HEIGHT
+        )
+
+    def _card_at(self, x: int, y: int):
+        if y < _PAD_Y:
+            return None
+        row, within = divmod(y - _PAD_Y, _ROW_PITCH)
+        if within >= NOTE_HEIGHT:
+            return None
+        for col, left in enumerate(self._col_x):
+            if left <= x < left + self._col_width[col]:
+                index = row * self.cols + col
+                return index if index < len(self.cards) else None
+        return None
 
-    def on_mount(self):
-        bg = self.app.theme_variables.get("SNBGR", "#333333")
-        self.styles.background = bg
-        self.styles.color = "#ffffff 70%"
+    # --------------------------------------------------------------- painting
 
-    def on_resize(self, event):
-        self.update(self._render_branch_display())
+    def render_lines(self, crop):
+        # Resolve theme colors once per paint rather than once per card line.
+        tv = self.app.theme_variables
+        sticky = [tv.get(f"SNBG{i}") for i in range(6)]
+        if any(c is None for c in sticky):
+            sticky = _DEFAULT_STICKY_COLORS
+        base = self.background_colors[1]
+        self._palette = (
+            self.app.theme,
+            base,
+            Style(bgcolor=base.rich_color),
+            sticky,
+            tv.get("SNBGR", "#333333"),
+        )
+        return super().render_lines(crop)
+
+    def _card_colors(self, card: _Card, focused: bool):
+        """(foreground, background) of `card`, as painted over the board."""
+        _theme, base, _style, sticky, branch_bg = self._palette
+        node = card.node
+        if card.is_branch:
+            bg = base + Color.parse(branch_bg)
+            fg = bg + Color.parse("#ffffff").with_alpha(0.7)
+            opacity = 0.9 if focused else 0.85
+        else:
+            if node.highlight_index is not None and node.highlight_index in self.hl_colors:
+                bg = base + Color.parse(self.hl_colors[node.highlight_index])
+            else:
+                _fg, color = _color_for_text(node.text, sticky)
+                bg = base + Color.parse(color).with_alpha(0.9)
+            fg = bg + Color.parse("#000000").with_alpha(0.9)
+            opacity = 1.0 if focused else 0.85
+        return base.blend(fg, opacity), base.blend(bg, opacity)
+
+    def _card_lines(self, index: int, width: int) -> list[Segment]:
+        """The NOTE_HEIGHT screen lines of card `index` at `width` cells, one
+        Segment each."""
+        card = self.cards[index]
+        focused = index == self.cursor and self.has_focus
+        key = (index, card.flipped, width, focused, self._palette[0])
+        lines = self._card_cache.get(key)
+        if lines is None:
+            fg, bg = self._card_colors(card, focused)
+            bold = card.is_branch or card.node.highlight_index is not None
+            style = Style(color=fg.rich_color, bgcolor=bg.rich_color, bold=bold)
+            content_width = max(1, width - 2 * _CARD_PAD_X)
+            content_height = NOTE_HEIGHT - 2 * _CARD_PAD_Y
+            text = card.display_text(max(8, content_width), max(2, content_height))
+            body = text.split("\n") if text else []
+            margin = " " * _CARD_PAD_X
+            blank = Segment(" " * width, style)
+            lines = [blank] * _CARD_PAD_Y
+            for i in range(content_height):
+                content = body[i] if i < len(body) else ""
+                lines.append(
+                    Segment(margin + set_cell_size(content, content_width) + margin, style)
+                )
+            lines += [blank] * (NOTE_HEIGHT - len(lines))
+            self._card_cache.put(key, lines)
+        return lines
+
+    def render_line(self, y: int) -> Strip:
+        width = self.size.width
+        blank_style = self._palette[2] if self._palette else self.rich_style
+        line = y + int(self.scroll_offset.y)
+        if line < _PAD_Y:
+            return Strip.blank(width, blank_style)
+        row, within = divmod(line - _PAD_Y, _ROW_PITCH)
+        first = row * self.cols
+        if within >= NOTE_HEIGHT or first >= len(self.cards):
+            return Strip.blank(width, blank_style)
+        segments = []
+        x = 0
+        for col in range(min(self.cols, len(self.cards) - first)):
+            left = self._col_x[col]
+            segments.append(Segment(" " * (left - x), blank_style))
+            segments.append(self._card_lines(first + col, self._col_width[col])[within])
+            x = left + self._col_width[col]
+        return Strip(segments).extend_cell_length(width, blank_style).crop(0, width)
+
+    # ---------------------------------------------------------------- cursor
+
+    def on_focus(self) -> None:
+        self.refresh()
+
+    def on_blur(self) -> None:
+        self.refresh()
+
+    def _refresh_card(self, index: int) -> None:
+        if index < len(self.cards):
+            self.refresh_lines(self._card_region(index).y, NOTE_HEIGHT)
+
+    def set_cursor(self, index: int, animate=True) -> None:
+        if not self.cards:
+            return
+        index = max(0, min(len(self.cards) - 1, index))
+        old, self.cursor = self.cursor, index
+        if self.is_mounted and self.size.width:
+            self._refresh_card(old)
+            self._refresh_card(index)
+            self.scroll_to_region(self._card_region(index), animate=animate)
+        if self.on_cursor is not None:
+            self.on_cursor()
+
+    def action_move(self, dx: int, dy: int) -> None:
+        self.set_cursor(self.cursor + dx + dy * self.cols)
+
+    def action_flip(self) -> None:
+        """Toggle between question and answer for flashcard notes."""
+        if not self.cards:
+            return
+        card = self.cards[self.cursor]
+        if card.flashcard is not None:
+            card.flipped = not card.flipped
+            self._refresh_card(self.cursor)
+
+    def action_open(self) -> None:
+        if self.cards:
+            self.screen.dismiss(self.cards[self.cursor].node)
+
+    def on_click(self, event) -> None:
+        offset = event.get_content_offset(self)
+        if offset is None:
+            return
+        index = self._card_at(offset.x, offset.y + int(self.scroll_offset.y))
+        if index is not None:
+            self.screen.dismiss(self.cards[index].node)
 
 
 class StickyNotesScreen(ModalScreen):
@@ -253,32 +437,9 @@ class StickyNotesScreen(ModalScreen):
         color: $foreground;
     }
 
-    VerticalScroll {
+    StickyBoard {
         height: 1fr;
     }
-
-    #sn-grid {
-        grid-gutter: 1 2;
-        grid-rows: 10;
-        padding: 1 2;
-        height: auto;
-    }
-
-    StickyNoteWidget {
-        opacity: 0.85;
-    }
-
-    StickyNoteWidget:focus {
-        opacity: 1.0;
-    }
-
-    BranchRootWidget {
-        opacity: 0.85;
-    }
-
-    BranchRootWidget:focus {
-        opacity: 0.9;
-    }
     """
 
     def __init__(self, nodes, title_text="Sticky Notes", hl_colors=None, **kwargs):
@@ -286,39 +447,34 @@ class StickyNotesScreen(ModalScreen):
         self.nodes = nodes
         self.title_text = title_text
         self.hl_colors = hl_colors or {}
-        self._cols = 1
-        self._cursor_index = 0
-        self._sticky_widgets = []
-
-    def _get_sticky_colors(self):
-        """Build sticky color list from theme variables, falling back to defaults."""
-        tv = self.app.theme_variables
-        colors = [tv.get(f"SNBG{i}") for i in range(6)]
-        if all(c is not None for c in colors):
-            return colors
-        return _DEFAULT_STICKY_COLORS
+        cards = []
+        for ancestor, group_nodes in _group_nodes_by_branch(nodes):
+            if ancestor is not None:
+                cards.append(_Card(ancestor, is_branch=True))
+            cards.extend(_Card(node) for node in group_nodes)
+        self._board = StickyBoard(
+            cards, hl_colors=self.hl_colors, on_cursor=self._update_title
+        )
+
+    @property
+    def _cursor_index(self) -> int:
+        return self._board.cursor
+
+    @_cursor_index.setter
+    def _cursor_index(self, index: int) -> None:
+        self._board.cursor = index
 
     def compose(self) -> ComposeResult:
-        sticky_colors = self._get_sticky_colors()
         yield Static(self.title_text, id="sn-title")
-        with VerticalScroll():
-            with Grid(id="sn-grid"):
-                groups = _group_nodes_by_branch(self.nodes)
-                for ancestor, group_nodes in groups:
-                    if ancestor is not None:
-                        yield BranchRootWidget(ancestor)
-                    for node in group_nodes:
-                        yield StickyNoteWidget(
-                            node, hl_colors=self.hl_colors, sticky_colors=sticky_colors
-                        )
+        yield self._board
 
     def _update_title(self):
         """Update title bar with filter, focused note path, and index."""
         from rich.text import Text
 
         hl1 = self.app.theme_variables.get("HL1", "#039ad7")
-        widgets = self._sticky_widgets
-        total = len(widgets)
+        cards = self._board.cards
+        total = len(cards)
 
         # Build: 🌲 <filter in accent> — <path of focused note>  [idx/total]
         filter_part = Text.from_markup(f"🌲 [{hl1}]{self.title_text}[/{hl1}]")
@@ -326,8 +482,8 @@ class StickyNotesScreen(ModalScreen):
 
         # Get path of currently focused note
         path_text = Text("")
-        if widgets and 0 <= self._cursor_index < len(widgets):
-            node = widgets[self._cursor_index].node
+        if cards and 0 <= self._cursor_index < len(cards):
+            node = cards[self._cursor_index].node
             path_node = (
                 node.parent if node.parent and node.parent.parent is not None else node
             )
@@ -344,69 +500,14 @@ class StickyNotesScreen(ModalScreen):
         self.query_one("#sn-title", Static).update(padded)
 
     def on_mount(self):
-        self._sticky_widgets = list(self.query("StickyNoteWidget, BranchRootWidget"))
-        self._update_columns()
+        board = self._board
+        board.focus()
+        if board.cards:
+            self.call_after_refresh(board.set_cursor, board.cursor, animate=False)
         self._update_title()
-        if self._sticky_widgets:
-            idx = min(self._cursor_index, len(self._sticky_widgets) - 1)
-            self._cursor_index = idx
-            self._sticky_widgets[idx].focus()
 
     def on_resize(self, event):
-        self._update_columns()
         self._update_title()
 
-    def _update_columns(self):
-        grid = self.query_one("#sn-grid", Grid)
-        self._cols = max(1, self.size.width // CELL_WIDTH)
-        grid.styles.grid_size_columns = self._cols
-
-    def on_key(self, event):
-        widgets = self._sticky_widgets
-        if not widgets:
-            return
-
-        delta = None
-        if event.key == "left":
-            delta = -1
-        elif event.key == "right":
-            delta = 1
-        elif event.key == "up":
-            delta = -self._cols
-        elif event.key == "down":
-            delta = self._cols
-        elif event.key == "space":
-            w = widgets[self._cursor_index]
-            if isinstance(w, StickyNoteWidget) and w.is_flashcard:
-                w.flip()
-            event.prevent_default()
-            event.stop()
-            return
-        elif event.key == "enter":
-            self.dismiss(widgets[self._cursor_index].node)
-            event.prevent_default()
-            event.stop()
-            return
-
-        if delta is not None:
-            new_index = max(0, min(len(widgets) - 1, self._cursor_index + delta))
-            self._cursor_index = new_index
-            widget = widgets[self._cursor_index]
-            widget.focus()
-            self._update_title()
-            vs = self.query_one(VerticalScroll)
-            row = self._cursor_index // self._cols
-            row_height = NOTE_HEIGHT + 1  # note height + grid gutter
-            row_top = row * row_height + 1  # +1 for grid padding top
-            row_bottom = row_top + NOTE_HEIGHT
-            if row_top < vs.scroll_y:
-                vs.scroll_to(y=row_top, animate=True)
-            elif row_bottom > vs.scroll_y + vs.scrollable_content_region.height:
-                vs.scroll_to(
-                    y=row_bottom - vs.scrollable_content_region.height, animate=True
-                )
-            event.prevent_default()
-            event.stop()
-
     def action_dismiss_screen(self):
         self.dismiss(None)
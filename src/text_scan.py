@@ -0,0 +1,86 @@
+"""Single-pass regex scanning over many notes at once.
+
+Instead of calling ``re.search`` once per node, the texts of a node list are
+joined into one newline-separated buffer and scanned with a single compiled
+pattern, so nodes without a match cost nothing at the Python level. Match
+offsets are mapped back to nodes through the sorted start offsets of each
+text (``bisect``).
+"""
+
+import re
+from bisect import bisect_right
+
+# String anchors (\A, \Z) refer to a single note's text, which the joined
+# buffer can't express; such patterns are scanned node by node instead.
+_STRING_ANCHOR_RE = re.compile(r"(?<!\\)(?:\\\\)*\\[AZ]")
+
+
+def compile_scan_pattern(regex, flags: int = 0) -> re.Pattern:
+    """Compile `regex` (a string or an already-compiled pattern) for buffer
+    scanning. MULTILINE makes ^/$ match at each note boundary, which matches
+    per-text semantics since note texts never contain newlines."""
+    if isinstance(regex, re.Pattern):
+        return re.compile(regex.pattern, regex.flags | re.MULTILINE)
+    return re.compile(regex, flags | re.MULTILINE)
+
+
+class TextBuffer:
+    """Newline-joined texts of `nodes` with an offset -> node mapping. A
+    snapshot: rebuild it whenever the nodes' texts may have changed."""
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.texts = [n.text for n in nodes]
+        self.starts = []
+        pos = 0
+        for text in self.texts:
+            self.starts.append(pos)
+            pos += len(text) + 1
+        self.text = "\n".join(self.texts)
+
+    def index_at(self, offset: int) -> int:
+        """Index of the node whose text contains buffer `offset` (a separator
+        offset belongs to the text before it)."""
+        return bisect_right(self.starts, offset) - 1
+
+    def search(self, pattern: re.Pattern) -> list:
+        """Return ``[(node, match)]`` holding the first match of `pattern` in
+        each node's text, in buffer order -- the same result as running
+        ``pattern.search(node.text)`` over every node."""
+        if not self.nodes:
+            return []
+        if _STRING_ANCHOR_RE.search(pattern.pattern):
+            return self._search_per_node(pattern)
+
+        buf = self.text
+        starts = self.starts
+        texts = self.texts
+        nodes = self.nodes
+        n = len(nodes)
+        out = []
+        pos = 0
+        while pos <= len(buf):
+            m = pattern.search(buf, pos)
+            if m is None:
+                break
+            i = bisect_right(starts, m.start()) - 1
+            if m.end() <= starts[i] + len(texts[i]):
+                out.append((nodes[i], m))
+            else:
+                # The leftmost match ran across a separator into the next
+                # note; re-run on this note alone for per-text semantics.
+                own = pattern.search(texts[i])
+                if own is not None:
+                    out.append((nodes[i], own))
+            if i + 1 >= n:
+                break
+            pos = starts[i + 1]
+        return out
+
+    def _search_per_node(self, pattern: re.Pattern) -> list:
+        out = []
+        for node, text in zip(self.nodes, self.texts):
+            m = pattern.search(text)
+            if m is not None:
+                out.append((node, m))
+        return out
@@ -1,9 +1,13 @@
+import bisect
 import difflib
+import heapq
+import itertools
 import logging
 import os
 import random
 import re
 import urllib.request
+from collections import OrderedDict
 from datetime import datetime
 
 try:
@@ -20,6 +24,308 @@ _SOUNDS = {
 }
 
 
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry. Callers fold
+    whatever makes an entry stale (e.g. a tree revision) into the key, so
+    outdated entries simply stop being hit and age out."""
+
+    _MISSING = object()
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        value = self._data.get(key, self._MISSING)
+        if value is self._MISSING:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ShiftIndex:
+    """key -> position in a list that is edited by splicing, e.g.
+    NoteTreeWidget.node_first_row (id(node) -> first row) or
+    NoteTree's visible-list positions.
+
+    Splicing shifts every later position, and rewriting all those entries
+    would make a local edit cost O(list length). Instead each shift is logged
+    as (first shifted position, delta) and an entry replays the shifts logged
+    since it was written the next time it is read. Owners rebuild the index
+    from scratch once the log gets long."""
+
+    def __init__(self):
+        self._entries: dict = {}  # key -> [position, log position]
+        self._shifts: list[tuple[int, int]] = []
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def __getitem__(self, key) -> int:
+        pos = self.get(key)
+        if pos is None:
+            raise KeyError(key)
+        return pos
+
+    def __setitem__(self, key, pos: int) -> None:
+        self._entries[key] = [pos, len(self._shifts)]
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        pos, seen = entry
+        if seen < len(self._shifts):
+            for at, delta in self._shifts[seen:]:
+                if pos >= at:
+                    pos += delta
+            entry[0] = pos
+            entry[1] = len(self._shifts)
+        return pos
+
+    def pop(self, key, default=None):
+        pos = self.get(key, default)
+        self._entries.pop(key, None)
+        return pos
+
+    def shift(self, at: int, delta: int) -> None:
+        """Move every position >= `at` by `delta`."""
+        if delta:
+            self._shifts.append((at, delta))
+
+    @property
+    def log_length(self) -> int:
+        return len(self._shifts)
+
+
+# Versions of SlotMap / OrderedSet come from one clock, so a rebuilt instance
+# never repeats a version a cache saw on the one it replaced.
+_version_clock = itertools.count(1)
+
+
+class SlotMap:
+    """slot -> value with the reverse value -> slot lookup kept alongside, so
+    asking which slot holds a value is a dict hit rather than a scan. A value
+    holds at most one slot: assigning it to another moves it, and a slot's
+    previous holder is dropped. `version` changes on every edit."""
+
+    def __init__(self, items=()):
+        self._by_slot: dict = {}
+        self._slot_of: dict = {}
+        self.version = next(_version_clock)
+        for slot, value in items:
+            self[slot] = value
+
+    def __len__(self) -> int:
+        return len(self._by_slot)
+
+    def __iter__(self):
+        return iter(self._by_slot)
+
+    def __contains__(self, slot) -> bool:
+        return slot in self._by_slot
+
+    def __getitem__(self, slot):
+        return self._by_slot[slot]
+
+    def __setitem__(self, slot, value) -> None:
+        if self._by_slot.get(slot) is value:
+            return
+        self.pop(slot)
+        self.pop(self._slot_of.get(value))
+        self._by_slot[slot] = value
+        self._slot_of[value] = slot
+        self.version = next(_version_clock)
+
+    def __delitem__(self, slot) -> None:
+        self._slot_of.pop(self._by_slot.pop(slot))
+        self.version = next(_version_clock)
+
+    def get(self, slot, default=None):
+        return self._by_slot.get(slot, default)
+
+    def pop(self, slot, default=None):
+        if slot not in self._by_slot:
+            return default
+        value = self._by_slot[slot]
+        del self[slot]
+        return value
+
+    def slot_of(self, value):
+        """The slot holding `value`, or None."""
+        return self._slot_of.get(value)
+
+    def holds(self, value) -> bool:
+        return value in self._slot_of
+
+    def items(self):
+        return self._by_slot.items()
+
+    def values(self):
+        return self._by_slot.values()
+
+
+class OrderedSet:
+    """A list of distinct items with set-speed membership. Supports the list
+    operations its users need (indexing, slicing, index, remove, append); a
+    slice or copy is a plain list. `version` changes on every edit."""
+
+    def __init__(self, items=()):
+        self._items: list = []
+        self._members: set = set()
+        self.version = next(_version_clock)
+        for item in items:
+            self.append(item)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __reversed__(self):
+        return reversed(self._items)
+
+    def __contains__(self, item) -> bool:
+        return item in self._members
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def append(self, item) -> None:
+        """Add `item` at the end (no-op if already present)."""
+        if item in self._members:
+            return
+        self._items.append(item)
+        self._members.add(item)
+        self.version = next(_version_clock)
+
+    def remove(self, item) -> None:
+        """Remove `item`; ValueError if absent, like list.remove."""
+        if item not in self._members:
+            raise ValueError(f"{item!r} not in OrderedSet")
+        self._items.remove(item)
+        self._members.discard(item)
+        self.version = next(_version_clock)
+
+    def discard(self, item) -> None:
+        if item in self._members:
+            self.remove(item)
+
+    def index(self, item) -> int:
+        if item not in self._members:
+            raise ValueError(f"{item!r} not in OrderedSet")
+        return self._items.index(item)
+
+    def swap(self, i: int, j: int) -> None:
+        items = self._items
+        items[i], items[j] = items[j], items[i]
+        self.version = next(_version_clock)
+
+    def reorder(self, items) -> None:
+        """Replace the order with `items`, a permutation of the contents."""
+        items = list(items)
+        assert len(items) == len(self._items) and set(items) == self._members
+        self._items = items
+        self.version = next(_version_clock)
+
+
+class ExpiryQueue:
+    """Keys with an expiry datetime, kept in two orders: `keys()` lists them
+    soonest first, and a min-heap of pending wake-ups yields each expiry once
+    (`pop_due`) so an owner can sleep until `next_expiry()`.
+
+    Re-registering a key with a new expiry leaves its old heap entry behind;
+    entries are checked against the current registration when they reach
+    the top, so updates never search the heap."""
+
+    def __init__(self):
+        self._entries: dict = {}  # key -> (expiry, seq)
+        self._order: list = []  # sorted (expiry, seq, key)
+        self._heap: list = []  # pending (expiry, seq, key)
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def update(self, key, expiry) -> bool:
+        """Register `key` to expire at `expiry` (None unregisters it).
+        Returns True if anything changed."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] == expiry:
+                return False
+            self.discard(key)
+        if expiry is None:
+            return entry is not None
+        item = (expiry, next(self._seq), key)
+        self._entries[key] = item[:2]
+        bisect.insort(self._order, item)
+        heapq.heappush(self._heap, item)
+        return True
+
+    def discard(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            # (expiry, seq) sorts just before its (expiry, seq, key) item.
+            del self._order[bisect.bisect_left(self._order, entry)]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._order.clear()
+        self._heap.clear()
+
+    def keys(self) -> list:
+        """Registered keys, soonest expiry first."""
+        return [key for _expiry, _seq, key in self._order]
+
+    def _drop_stale(self) -> None:
+        heap = self._heap
+        while heap and self._entries.get(heap[0][2]) != heap[0][:2]:
+            heapq.heappop(heap)
+
+    def next_expiry(self):
+        """The earliest expiry not yet returned by `pop_due`, or None."""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now) -> list:
+        """Keys whose expiry is before `now` and that haven't been returned
+        yet. They stay registered (and listed by `keys()`)."""
+        due = []
+        heap = self._heap
+        self._drop_stale()
+        while heap and heap[0][0] < now:
+            due.append(heapq.heappop(heap)[2])
+            self._drop_stale()
+        return due
+
+
 def is_wsl() -> bool:
     if os.environ.get("WSL_DISTRO_NAME") or os.environ.get("WSL_INTEROP"):
         return True
@@ -30,13 +30,10 @@ class CommandInfoPanel(Static):
 
     can_focus = False
 
-    def _last_edit_part(self) -> Text | None:
-        ctx = self.app.note_tree.context_node
-        nodes = ctx.get_node_list(only_visible=False, hide_archive=False)
-        times = [n.creation_time for n in nodes if n.creation_time is not None]
-        if not times:
+    def _last_edit_part(self, stats) -> Text | None:
+        newest = stats.newest_creation
+        if newest is None:
             return None
-        newest = max(times)
         days = (datetime.now() - newest).days
         rel = "today" if days <= 0 else ("1d ago" if days == 1 else f"{days}d ago")
         t = Text()
@@ -44,46 +41,34 @@ class CommandInfoPanel(Static):
         t.append(f"Branch last edited {rel}")
         return t
 
-    def _leaf_q_part(self) -> Text | None:
+    def _leaf_q_part(self, stats) -> Text | None:
         """Open-question leaves in the current context: leaf notes containing a
         `?`, excluding #DONE/#ARCHIVE. (Moved here from the bookmark rows.)"""
-        ctx = self.app.note_tree.context_node
-        questions = sum(
-            1
-            for n in ctx.get_node_list()
-            if not n.children
-            and "?" in n.text
-            and not n.is_done()
-            and not n.is_archived()
-        )
+        questions = stats.open_questions
         if not questions:
             return None
         return Text(f"{questions} leaf questions")
 
-    def _archived_part(self) -> Text | None:
-        ctx = self.app.note_tree.context_node
-        nodes = ctx.get_node_list(only_visible=False, hide_archive=False)
-        roots = [
-            n
-            for n in nodes
-            if "#ARCHIVE" in n.text
-            and n.parent is not None
-            and "#ARCHIVE" not in n.parent.text
-        ]
-        if not roots:
+    def _archived_part(self, stats) -> Text | None:
+        n = stats.archived_branches
+        if not n:
             return None
-        n = len(roots)
         return Text(f"{n} archived branch{'es' if n != 1 else ''}")
 
     def refresh_content(self) -> bool:
         """Rebuild the line from the current tree state. Returns True if there is
         anything to show (the caller only un-hides the panel when so)."""
+        # Figures come from the tree's subtree aggregates (one cached pass,
+        # then only the chain above an edit), so opening command mode doesn't
+        # walk the context.
+        nt = self.app.note_tree
+        stats = nt.branch_stats(nt.context_node)
         parts = [
             p
             for p in (
-                self._last_edit_part(),
-                self._leaf_q_part(),
-                self._archived_part(),
+                self._last_edit_part(stats),
+                self._leaf_q_part(stats),
+                self._archived_part(stats),
             )
             if p
         ]
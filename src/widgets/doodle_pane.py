@@ -1,12 +1,24 @@
+from itertools import groupby
+
+from rich.segment import Segment
 from rich.style import Style
-from rich.text import Text
 from textual.color import Color
-from textual.widgets import Static
+from textual.geometry import Region
+from textual.strip import Strip
+from textual.widget import Widget
+
+from doodle_canvas import DoodleCanvas, composite, overlay_row
+from perf import watch_cache
+from utils import LRUCache
 
 DOT_GLYPH = "╱"  # "￭"  # "●"
 
+# Marks ancestor cells in a merged row (own cells keep their plain value).
+_ANCESTOR = 0x80
+_AS_ANCESTOR = bytes([0] + [i | _ANCESTOR for i in range(1, 256)])
+
 
-class DoodlePane(Static):
+class DoodlePane(Widget):
     DEFAULT_CSS = """
     DoodlePane {
         height: 100%;
@@ -29,9 +41,12 @@ class DoodlePane(Static):
     ERASE_RADIUS_Y = 1  # cells erased up/down from the cursor
 
     def __init__(self, **kwargs):
-        super().__init__("", **kwargs)
-        # canvas[doodle_id] = {"cells": {(cell_dx_from_right, cell_y): color_idx}}
-        self._canvases: dict[int, dict] = {}
+        super().__init__(**kwargs)
+        # canvas per doodle_id; cells are addressed (dx from the right edge, y)
+        self._canvases: dict[int, DoodleCanvas] = {}
+        # Sidecar records of canvases not shown yet; decoded on first use
+        # (see _canvas) and handed back as-is when saving.
+        self._records: dict[int, bytes] = {}
         self._current_key: int | None = None
         self._current_node = None
         self._width: int = 30
@@ -39,12 +54,22 @@ class DoodlePane(Static):
         self._last_cell: tuple[int, int] | None = None
         self._stroke_cells: set[tuple[int, int]] = set()
         self._color_idx: int = 0
-        self._ancestor_cells: dict[tuple[int, int], int] = {}
+        # Rows of the ancestors' doodles layered root-first (see composite),
+        # cached per chain of (doodle_id, version).
+        self._ancestor_rows: list[bytes] = []
+        self._composites = LRUCache(maxsize=16)
+        watch_cache("doodle_composites", self._composites)
         self.pane_visible: bool = False  # revealed together with the info panel
         self.can_focus = True
-        self._dirty: bool = False
+        # Screen lines painted into since the last flush, and the rendered
+        # lines still valid (all of them share _strip_key).
+        self._dirty_lines: set[int] = set()
+        self._strips: dict[int, Strip] = {}
+        self._strip_key = None
+        self._styles = None
+        self._base_style = Style()
         # Snapshot of the current canvas cells at mouse-down, to detect no-op strokes.
-        self._stroke_snapshot: dict[tuple[int, int], int] | None = None
+        self._stroke_snapshot: tuple | None = None
         self._stroke_allocated_id: bool = False
         self._swallow_next_mousedown: bool = False
 
@@ -53,9 +78,17 @@ class DoodlePane(Static):
         self.set_interval(1 / 10, self._flush_if_dirty)
 
     def _flush_if_dirty(self):
-        if self._dirty:
-            self._dirty = False
-            self._refresh_render()
+        # Only the lines a stroke touched are re-rendered and repainted.
+        dirty = self._dirty_lines
+        if dirty:
+            self._dirty_lines = set()
+            width = self.outer_size.width
+            for y in dirty:
+                self._strips.pop(y, None)
+                self.refresh(Region(0, y, width, 1))
+
+    def _mark_row_dirty(self, cell_y: int) -> None:
+        self._dirty_lines.add(cell_y + 1)  # line 0 is the mode indicator
 
     # Layout / lifecycle --------------------------------------------------
 
@@ -103,30 +136,29 @@ class DoodlePane(Static):
         self._refresh_render()
 
     def _rebuild_ancestor_composite(self, node):
-        self._ancestor_cells = {}
+        self._ancestor_rows = []
         if node is None or node.parent is None:
             return
         chain = []
         cur = node.parent
         while cur is not None:
-            chain.append(cur)
+            canvas = self._canvas(cur.doodle_id)
+            if canvas is not None:
+                chain.append((cur.doodle_id, canvas))
             cur = cur.parent
         chain.reverse()  # root-first, so closer ancestors overwrite
-        for anc in chain:
-            if anc.doodle_id is None:
-                continue
-            canvas = self._canvases.get(anc.doodle_id)
-            if not canvas:
-                continue
-            for key, color_idx in canvas["cells"].items():
-                self._ancestor_cells[key] = color_idx
+        key = tuple((doodle_id, canvas.version) for doodle_id, canvas in chain)
+        rows = self._composites.get(key)
+        if rows is None:
+            rows = composite([canvas for _, canvas in chain], self.CANVAS_HEIGHT - 1)
+            self._composites.put(key, rows)
+        self._ancestor_rows = rows
 
     def clear_current(self):
         node = self._current_node
         if node is None or node.doodle_id is None:
             return
-        self._canvases.pop(node.doodle_id, None)
-        node.doodle_id = None
+        self._drop_canvas(node)
         self._current_key = None
         self._painting = False
         self._last_cell = None
@@ -138,26 +170,15 @@ class DoodlePane(Static):
             pass
         self._refresh_render()
 
-    def load_from_sidecar(self, canvases_by_id: dict[int, dict]):
+    def load_from_sidecar(self, records: dict[int, bytes]):
         self._canvases = {}
-        for cid, payload in canvases_by_id.items():
-            cell_list = payload.get("cells", [])
-            self._canvases[cid] = {
-                "cells": {(int(cdx), int(cy)): int(ci) for cdx, cy, ci in cell_list},
-            }
+        self._records = dict(records)
+        self._composites.clear()  # new canvases restart their versions
         self._rebuild_ancestor_composite(self._current_node)
         self._refresh_render()
 
-    def to_sidecar_payload(self) -> dict[int, dict]:
-        out: dict[int, dict] = {}
-        for cid, canvas in self._canvases.items():
-            cells = canvas.get("cells") or {}
-            if not cells:
-                continue
-            out[cid] = {
-                "cells": [(cdx, cy, ci) for (cdx, cy), ci in cells.items()],
-            }
-        return out
+    def to_sidecar_payload(self) -> dict[int, DoodleCanvas | bytes]:
+        return {**self._records, **self._canvases}
 
     def cycle_color(self):
         self._color_idx = (self._color_idx + 1) % len(self.COLOR_KEYS)
@@ -165,12 +186,27 @@ class DoodlePane(Static):
 
     # Coord helpers -------------------------------------------------------
 
-    def _current_canvas(self) -> dict:
+    def _canvas(self, doodle_id: int | None) -> DoodleCanvas | None:
+        canvas = self._canvases.get(doodle_id)
+        if canvas is None and doodle_id in self._records:
+            canvas = DoodleCanvas.from_record(
+                self.CANVAS_HEIGHT - 1, self._records.pop(doodle_id)
+            )
+            self._canvases[doodle_id] = canvas
+        return canvas
+
+    def _drop_canvas(self, node) -> None:
+        """Forget `node`'s doodle and unlink it from the node."""
+        self._canvases.pop(node.doodle_id, None)
+        self._records.pop(node.doodle_id, None)
+        self.app.note_tree.set_doodle_id(node, None)
+
+    def _current_canvas(self) -> DoodleCanvas | None:
         if self._current_key is None:
-            return {"cells": {}}
-        canvas = self._canvases.get(self._current_key)
+            return None
+        canvas = self._canvas(self._current_key)
         if canvas is None:
-            canvas = {"cells": {}}
+            canvas = DoodleCanvas(self.CANVAS_HEIGHT - 1)
             self._canvases[self._current_key] = canvas
         return canvas
 
@@ -203,7 +239,7 @@ class DoodlePane(Static):
             new_id = self.app._allocate_doodle_id()
         except AttributeError:
             return False
-        node.doodle_id = new_id
+        self.app.note_tree.set_doodle_id(node, new_id)
         self._current_key = new_id
         self._stroke_allocated_id = True
         return True
@@ -218,10 +254,11 @@ class DoodlePane(Static):
             return
         if self._current_key is None:
             return
-        canvas = self._canvases.get(self._current_key)
-        if not canvas:
+        canvas = self._canvas(self._current_key)
+        if canvas is None:
             return
-        canvas["cells"].pop(self._cell_to_storage(cell_x, cell_y), None)
+        if canvas.clear(*self._cell_to_storage(cell_x, cell_y)):
+            self._mark_row_dirty(cell_y)
 
     def _paint_dot(self, cell_x: int, cell_y: int):
         if cell_x < 0 or cell_x >= self._width:
@@ -242,7 +279,8 @@ class DoodlePane(Static):
         if not self._ensure_doodle_id():
             return
         canvas = self._current_canvas()
-        canvas["cells"][key] = self._color_idx
+        if canvas.set(*key, self._color_idx):
+            self._mark_row_dirty(cell_y)
 
     def _paint_line(self, x0: int, y0: int, x1: int, y1: int):
         dx = abs(x1 - x0)
@@ -283,79 +321,81 @@ class DoodlePane(Static):
         )
 
     def _refresh_render(self):
-        canvas = self._current_canvas()
-        own_cells: dict[tuple[int, int], int] = canvas["cells"]
-        width = self._width
-        draw_rows = self.CANVAS_HEIGHT - 1
+        """Repaint every line (context, layout, palette or canvas changes)."""
+        self._dirty_lines = set()
+        self._strips.clear()
+        self.refresh()
 
+    def _resolve_styles(self):
         tv = self.app.theme_variables
-        fg_hex = self._low_opacity_hex(Color.parse(tv.get("foreground", "#ffffff")))
-        # Cache palette hex per color_idx so we don't re-parse/blend per cell.
-        palette_hex: dict[int, str | None] = {}
-        ancestor_hex: dict[int, str | None] = {}
+        fg_style = Style(color=self._low_opacity_hex(Color.parse(tv.get("foreground", "#ffffff"))))
+        # Style per stored cell value: own cells by color_idx + 1, ancestor
+        # cells with _ANCESTOR set. Blended once per paint, not per cell.
+        cell_styles: dict[int, Style] = {}
         for idx, name in enumerate(self.COLOR_KEYS):
             if name is None:
-                palette_hex[idx] = None
-                ancestor_hex[idx] = None
+                continue
+            base = Color.parse(tv.get(name, "#ffffff"))
+            cell_styles[idx + 1] = Style(color=self._low_opacity_hex(base))
+            cell_styles[(idx + 1) | _ANCESTOR] = Style(
+                color=self._low_opacity_hex(base, self.ANCESTOR_OPACITY)
+            )
+        return fg_style, cell_styles
+
+    def render_lines(self, crop):
+        # Resolving the CSS style walks the DOM; do it once per paint.
+        self._base_style = self.rich_style
+        return super().render_lines(crop)
+
+    def render_line(self, y: int) -> Strip:
+        key = (self._width, self.app.theme, self._color_idx, self._base_style)
+        if key != self._strip_key:
+            self._strip_key = key
+            self._strips.clear()
+            self._styles = self._resolve_styles()
+        strip = self._strips.get(y)
+        if strip is None:
+            strip = self._render_row(y).apply_style(self._base_style)
+            self._strips[y] = strip
+        return strip
+
+    def _render_row(self, y: int) -> Strip:
+        fg_style, cell_styles = self._styles
+        width = self._width
+        if y == 0:
+            if self._is_eraser():
+                segments = [Segment("[M]ode: erase", fg_style)]
             else:
-                base = Color.parse(tv.get(name, "#ffffff"))
-                palette_hex[idx] = self._low_opacity_hex(base)
-                ancestor_hex[idx] = self._low_opacity_hex(base, self.ANCESTOR_OPACITY)
-        fg_style = Style(color=fg_hex)
-        dot_styles: dict[int, Style] = {
-            idx: Style(color=hex_)
-            for idx, hex_ in palette_hex.items()
-            if hex_ is not None
-        }
-        ancestor_styles: dict[int, Style] = {
-            idx: Style(color=hex_)
-            for idx, hex_ in ancestor_hex.items()
-            if hex_ is not None
-        }
-
-        text = Text()
-        text.append("[M]ode: ", style=fg_style)
-        cur_hex = palette_hex.get(self._color_idx)
-        if cur_hex is None:
-            text.append("erase", style=fg_style)
-        else:
-            text.append(DOT_GLYPH, style=dot_styles[self._color_idx])
-        text.append("\n")
-
-        # Bucket painted cells by row so empty rows/segments emit as bulk whitespace.
-        rows: list[dict[int, tuple[int, bool]]] = [{} for _ in range(draw_rows)]
-        w_minus_1 = width - 1
-        for (cdx, cy), ci in own_cells.items():
-            if 0 <= cy < draw_rows:
-                cx = w_minus_1 - cdx
-                if 0 <= cx < width:
-                    rows[cy][cx] = (ci, False)
-        for (cdx, cy), ci in self._ancestor_cells.items():
-            if 0 <= cy < draw_rows:
-                cx = w_minus_1 - cdx
-                if 0 <= cx < width and cx not in rows[cy]:
-                    rows[cy][cx] = (ci, True)
-
-        for draw_y in range(draw_rows):
-            painted = rows[draw_y]
-            if painted:
-                prev_x = 0
-                for cx in sorted(painted):
-                    ci, is_ancestor = painted[cx]
-                    style = (ancestor_styles if is_ancestor else dot_styles).get(ci)
-                    if style is None:
-                        continue
-                    if cx > prev_x:
-                        text.append(" " * (cx - prev_x))
-                    text.append(DOT_GLYPH, style=style)
-                    prev_x = cx + 1
-                if prev_x < width:
-                    text.append(" " * (width - prev_x))
+                segments = [
+                    Segment("[M]ode: ", fg_style),
+                    Segment(DOT_GLYPH, cell_styles[self._color_idx + 1]),
+                ]
+            return Strip(segments).extend_cell_length(width)
+        cell_y = y - 1
+        if cell_y >= self.CANVAS_HEIGHT - 1 or width <= 0:
+            return Strip.blank(width)
+
+        canvas = self._canvas(self._current_key)
+        own = bytes(canvas.rows[cell_y][:width]) if canvas is not None else b""
+        ancestors = (
+            self._ancestor_rows[cell_y][:width].translate(_AS_ANCESTOR)
+            if self._ancestor_rows
+            else b""
+        )
+        merged = overlay_row(ancestors, own)
+        if not merged:
+            return Strip.blank(width)
+        # Storage x counts from the right edge; flip it into screen order.
+        cells = bytes(width - len(merged)) + merged[::-1]
+        segments = []
+        for value, run in groupby(cells):
+            count = len(list(run))
+            style = cell_styles.get(value)
+            if style is None:
+                segments.append(Segment(" " * count))
             else:
-                text.append(" " * width)
-            if draw_y < draw_rows - 1:
-                text.append("\n")
-        self.update(text)
+                segments.append(Segment(DOT_GLYPH * count, style))
+        return Strip(segments, width)
 
     # Mouse handlers ------------------------------------------------------
 
@@ -364,8 +404,10 @@ class DoodlePane(Static):
         self._stroke_cells = set()
         self._stroke_allocated_id = False
         if self._current_key is not None:
-            existing = self._canvases.get(self._current_key)
-            self._stroke_snapshot = dict(existing["cells"]) if existing else {}
+            existing = self._canvas(self._current_key)
+            self._stroke_snapshot = (
+                existing.snapshot() if existing is not None else ()
+            )
         else:
             self._stroke_snapshot = None
 
@@ -378,29 +420,30 @@ class DoodlePane(Static):
 
         node = self._current_node
         key = self._current_key
-        canvas = self._canvases.get(key) if key is not None else None
-        cur_cells = canvas["cells"] if canvas is not None else {}
+        canvas = self._canvas(key)
+        is_empty = canvas is None or canvas.is_empty()
 
         # If we allocated a new doodle_id during this stroke but ended with no
         # cells (e.g. drew then erased), roll it back so we don't pollute state.
-        if self._stroke_allocated_id and not cur_cells:
+        if self._stroke_allocated_id and is_empty:
             if key is not None:
                 self._canvases.pop(key, None)
             if node is not None:
-                node.doodle_id = None
+                self.app.note_tree.set_doodle_id(node, None)
             self._current_key = None
             changed = False
         else:
             snapshot = self._stroke_snapshot
             if snapshot is None:
-                changed = bool(cur_cells)
+                changed = not is_empty
+            elif canvas is None:
+                changed = any(snapshot)
             else:
-                changed = snapshot != cur_cells
+                changed = snapshot != canvas.snapshot()
             # If a pre-existing canvas was fully erased, drop it so the node
             # no longer references an empty canvas.
-            if changed and not cur_cells and key is not None and node is not None:
-                self._canvases.pop(key, None)
-                node.doodle_id = None
+            if changed and is_empty and key is not None and node is not None:
+                self._drop_canvas(node)
                 self._current_key = None
 
         self._stroke_snapshot = None
@@ -430,7 +473,6 @@ class DoodlePane(Static):
         if cell is not None:
             self._paint_dot(*cell)
         self._last_cell = cell
-        self._dirty = True
 
     def on_mouse_move(self, event):
         if not self._painting:
@@ -444,7 +486,6 @@ class DoodlePane(Static):
         else:
             self._paint_line(self._last_cell[0], self._last_cell[1], cell[0], cell[1])
         self._last_cell = cell
-        self._dirty = True
 
     def on_mouse_up(self, event):
         self._end_stroke()
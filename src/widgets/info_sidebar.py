@@ -1,32 +1,85 @@
+import bisect
 import logging
 import re
 import textwrap
+from dataclasses import dataclass
+from datetime import date
 
 from rich.text import Text
+from textual.binding import Binding
 from textual.color import Color
-from textual.widgets import OptionList
-from textual.widgets.option_list import Option
+from textual.geometry import Region, Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
 
+from perf import traced, watch_cache
+from utils import LRUCache
 
-class InfoSidebar(OptionList):
+
+@dataclass(eq=False)
+class SidebarEntry:
+    """One sidebar entry: its screen lines (already fitted to the panel
+    width) and the node it jumps to. Disabled entries (headers, blanks,
+    hints) are skipped by the cursor. Entries are memoized by content (see
+    InfoSidebar._cached), so a rebuild that changes nothing yields the very
+    same objects and their rendered `strips` survive it."""
+
+    lines: list
+    node: object = None
+    disabled: bool = False
+    strips: tuple = (None, None)  # (render key, [Strip] per line)
+
+
+class InfoSidebar(ScrollView):
     DEFAULT_CSS = """
     InfoSidebar {
         height: 100%;
         color: $foreground 50%;
+        background: $surface;
         background-tint: $panel 10%;
         width: 0;
         visibility: hidden;
         layer: overlay;
         offset: 0 1;
+        overflow-x: hidden;
         scrollbar-size: 0 0;
         padding: 0 1;
         border: none;
     }
     InfoSidebar:focus {
         border: none;
+        background-tint: $foreground 5%;
+    }
+    InfoSidebar > .info-sidebar--option-highlighted {
+        color: $foreground;
+        background: $block-cursor-blurred-background;
+    }
+    InfoSidebar:focus > .info-sidebar--option-highlighted {
+        color: $block-cursor-foreground;
+        background: $block-cursor-background;
+        text-style: $block-cursor-text-style;
+    }
+    InfoSidebar > .info-sidebar--option-disabled {
+        color: $text-disabled;
     }
     """
 
+    COMPONENT_CLASSES = {
+        "info-sidebar--option-highlighted",
+        "info-sidebar--option-disabled",
+    }
+
+    BINDINGS = [
+        Binding("up", "cursor_up", "Up", show=False),
+        Binding("down", "cursor_down", "Down", show=False),
+        Binding("home", "first", "First", show=False),
+        Binding("end", "last", "Last", show=False),
+        Binding("pageup", "page_up", "Page Up", show=False),
+        Binding("pagedown", "page_down", "Page Down", show=False),
+    ]
+
+    can_focus = True
+
     _panel_width = None
 
     mode_index = 0
@@ -36,16 +89,29 @@ class InfoSidebar(OptionList):
     # on every frame, so its overlay region always exists and revealing it
     # composites on the first frame — unlike a display:none -> block transition,
     # whose overlay region is only created during the ensuing layout (missing the
-    # first frame), and unlike a 0 -> N width change, which forces the OptionList
-    # to rebuild its lines from a zero-width state.
+    # first frame), and unlike a 0 -> N width change, which forces the panel to
+    # rebuild its lines from a zero-width state.
     _open = False
     _search_results = []  # list of match nodes when search panel is shown
     _pre_search_mode_index = 0  # panel mode to restore after search exits
 
-    def on_mount(self):
-        self._option_nodes = {}  # option id -> Node (selectable entries only)
-        self._opt_counter = 0
-        self._search_entry_ids = []  # option ids of search results, in order
+    # Memoized entries (see _cached): room for a journal view spanning years
+    # plus the other panels.
+    _ENTRY_CACHE_SIZE = 4096
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # Line-API model: the entries shown, the first screen line of each
+        # (ascending, for bisect) and the total line count.
+        self._entries: list[SidebarEntry] = []
+        self._tops: list[int] = []
+        self._line_count = 0
+        self._highlighted = None
+        self._entry_cache = LRUCache(self._ENTRY_CACHE_SIZE)
+        watch_cache("sidebar_entries", self._entry_cache)
+        self._search_entry_rows = []  # entry indices of search results, in order
+        self._strip_styles = None  # (plain, disabled, highlighted), per paint
+        self._bookmark_rows = (None, [])  # (key, entries) of the last build
 
     # --------------------------------------------------------------- layout
 
@@ -86,8 +152,7 @@ class InfoSidebar(OptionList):
     def _apply_border(self, focused: bool | None = None):
         # Draw only the divider edge (the side facing the center of the screen),
         # in HL1 while focused and the panel color otherwise. Set all four edges
-        # inline (inline styles beat the OptionList :focus rule that would
-        # otherwise re-add a full `tall` border on focus).
+        # inline so no stylesheet rule re-adds a full border on focus.
         if focused is None:
             focused = self.has_focus
         tv = self.app.theme_variables
@@ -118,30 +183,56 @@ class InfoSidebar(OptionList):
             w = self.content_size.width or 30
         return max(w, 16)
 
-    # ------------------------------------------------------- option helpers
+    # -------------------------------------------------------- entry helpers
+
+    def _cached(self, key, build) -> SidebarEntry:
+        """The entry for content `key`, made by `build()` on a miss. A key
+        names everything its entry shows (node, text, markers, width), so a
+        hit is exactly what rebuilding it would produce."""
+        entry = self._entry_cache.get(key)
+        if entry is None:
+            entry = build()
+            self._entry_cache.put(key, entry)
+        return entry
+
+    def _make_entry(self, prompt: Text, node=None, disabled=False) -> SidebarEntry:
+        """Split `prompt` into screen lines, wrapping any line wider than the
+        panel (prompts from _line/_wrapped already fit)."""
+        width = self._content_width()
+        lines = []
+        for line in prompt.split("\n", allow_blank=True):
+            if line.cell_len > width:
+                lines.extend(line.wrap(self.app.console, width))
+            else:
+                lines.append(line)
+        return SidebarEntry(lines or [Text()], node, disabled)
 
-    def _register(self, prompt, node) -> Option:
+    def _register(self, prompt, node) -> SidebarEntry:
         """Selectable entry carrying a node (resolved on select/highlight)."""
-        tok = f"opt{self._opt_counter}"
-        self._opt_counter += 1
-        self._option_nodes[tok] = node
-        return Option(prompt, id=tok)
+        return self._make_entry(prompt, node)
+
+    def _header(self, markup: str) -> SidebarEntry:
+        return self._note(f"[b]{markup}[/b]")
 
-    def _header(self, markup: str) -> Option:
-        return Option(Text.from_markup(f"[b]{markup}[/b]"), disabled=True)
+    def _note(self, markup: str) -> SidebarEntry:
+        """Disabled line(s) of markup: headers, hints, path previews."""
+        return self._cached(
+            ("note", markup, self._content_width()),
+            lambda: self._make_entry(Text.from_markup(markup), disabled=True),
+        )
 
-    def _blank(self) -> Option:
-        return Option("", disabled=True)
+    def _blank(self) -> SidebarEntry:
+        return self._cached(("blank",), lambda: SidebarEntry([Text()], disabled=True))
 
     def _ellipsize(self, s: str, width: int) -> str:
         if len(s) > width:
             return s[: max(width - 1, 0)].rstrip() + "…"
         return s
 
-    def _line(self, marker: Text, body: str, width: int, body_style=None) -> Text:
-        """Single-line prompt: `marker` inline + `body` collapsed to one line and
-        truncated with an ellipsis. (OptionList soft-wraps and ignores Rich's
-        overflow, so the one-line cap has to be applied here.)"""
+    def _line(self, marker: str, body: str, width: int, body_style=None) -> Text:
+        """Single-line prompt: `marker` (markup) inline + `body` collapsed to
+        one line and truncated with an ellipsis."""
+        marker = Text.from_markup(marker)
         marker_len = marker.cell_len
         avail = max(width - marker_len - 1, 6)
         line = self._ellipsize(" ".join(body.split()), avail)
@@ -153,11 +244,13 @@ class InfoSidebar(OptionList):
         return t
 
     def _wrapped(
-        self, marker: Text, body: str, width: int, max_lines: int, body_style=None
+        self, marker: str, body: str, width: int, max_lines: int, body_style=None
     ) -> Text:
-        """`marker` inline on line 1, `body` wrapped to at most `max_lines`
-        (over-long text ellipsised). Short bodies use fewer lines. Wrapped lines
-        carry a small hanging indent, not a marker-width column."""
+        """`marker` (markup) inline on line 1, `body` wrapped to at most
+        `max_lines` (over-long text ellipsised). Short bodies use fewer lines.
+        Wrapped lines carry a small hanging indent, not a marker-width
+        column."""
+        marker = Text.from_markup(marker)
         marker_len = marker.cell_len
         init = " " * (marker_len + 1)
         sub = "  "
@@ -181,39 +274,182 @@ class InfoSidebar(OptionList):
         return t
 
     def _entry(
-        self, marker: Text, body: str, node, width, body_style=None, max_lines=1
-    ) -> Option:
+        self, marker: str, body: str, node, width, body_style=None, max_lines=1
+    ) -> SidebarEntry:
         """Selectable bookmark/journal/search entry carrying `node`. Renders on
         one line by default; `max_lines` > 1 wraps up to that many lines."""
-        if max_lines <= 1:
-            prompt = self._line(marker, body, width, body_style)
-        else:
-            prompt = self._wrapped(marker, body, width, max_lines, body_style)
-        return self._register(prompt, node)
+
+        def build():
+            if max_lines <= 1:
+                prompt = self._line(marker, body, width, body_style)
+            else:
+                prompt = self._wrapped(marker, body, width, max_lines, body_style)
+            return self._register(prompt, node)
+
+        key = ("entry", node, marker, body, width, body_style, max_lines)
+        return self._cached(key, build)
 
     # --------------------------------------------------------------- render
 
-    def _render_options(self, options, highlight=None):
-        self.clear_options()
-        self.add_options(options)
-        if highlight is not None and 0 <= highlight < self.option_count:
-            try:
-                self.highlighted = highlight
-            except Exception:
-                pass
+    def _render_options(self, entries, highlight=None):
+        """Show `entries`. They are compared by identity with what is on
+        screen: layout is redone only from the first entry that changed, and
+        unchanged entries repaint from their cached strips."""
+        old = self._entries
+        first = 0
+        limit = min(len(old), len(entries))
+        while first < limit and old[first] is entries[first]:
+            first += 1
+        if first < len(old) or first < len(entries):
+            self._entries = entries
+            tops = self._tops
+            del tops[first:]
+            line = tops[-1] + len(entries[first - 1].lines) if first else 0
+            for entry in entries[first:]:
+                tops.append(line)
+                line += len(entry.lines)
+            self._line_count = line
+            self._highlighted = None
+            self.virtual_size = Size(self._content_width(), line)
+            if first == 0:
+                # A different panel altogether: start from the top.
+                self.scroll_to(y=0, animate=False, force=True, immediate=True)
+            self.refresh()
+        self.highlighted = highlight
         # Outside search, only show the cursor when the panel has focus — a
         # lingering blurred highlight (e.g. after a rebuild while the cursor is
         # on the tree) is just visual noise.
         if not self._search_results and not self.has_focus:
             self.highlighted = None
-        self.refresh()
 
-    def _first_entry_index(self, options):
-        for i, opt in enumerate(options):
-            if not opt.disabled:
+    def _first_entry_index(self, entries):
+        for i, entry in enumerate(entries):
+            if not entry.disabled:
                 return i
         return None
 
+    def _entry_at_line(self, line: int):
+        if not 0 <= line < self._line_count:
+            return None
+        return bisect.bisect_right(self._tops, line) - 1
+
+    def render_lines(self, crop):
+        # Resolving the CSS styles walks the DOM; do it once per paint rather
+        # than once per line.
+        base = self.rich_style
+        self._strip_styles = (
+            base,
+            base + self.get_component_rich_style("info-sidebar--option-disabled"),
+            base + self.get_component_rich_style("info-sidebar--option-highlighted"),
+        )
+        return super().render_lines(crop)
+
+    def render_line(self, y: int) -> Strip:
+        width = self.size.width
+        styles = self._strip_styles or (self.rich_style,) * 3
+        line = y + int(self.scroll_offset.y)
+        index = self._entry_at_line(line)
+        if index is None:
+            return Strip.blank(width, styles[0])
+        entry = self._entries[index]
+        if index == self._highlighted:
+            style = styles[2]
+        else:
+            style = styles[1] if entry.disabled else styles[0]
+        # Base style goes underneath the prompt's own styles (apply_style
+        # layers it below), like NoteTreeWidget's rows.
+        key = (width, style)
+        if entry.strips[0] != key:
+            console = self.app.console
+            entry.strips = (
+                key,
+                [
+                    Strip(text.render(console))
+                    .apply_style(style)
+                    .adjust_cell_length(width, style)
+                    for text in entry.lines
+                ],
+            )
+        return entry.strips[1][line - self._tops[index]]
+
+    # ------------------------------------------------------------ highlight
+
+    @property
+    def highlighted(self):
+        """Index of the entry under the cursor, or None."""
+        return self._highlighted
+
+    @highlighted.setter
+    def highlighted(self, index) -> None:
+        if index is not None and not 0 <= index < len(self._entries):
+            index = None
+        if index == self._highlighted:
+            return
+        self._highlighted = index
+        self.refresh()
+        if index is not None:
+            self._scroll_to_entry(index)
+            # Reacting may move the tree (search preview): do it after the
+            # current handler returns, as a posted message would be.
+            self.call_later(self._on_highlighted, index)
+
+    def _scroll_to_entry(self, index: int) -> None:
+        region = Region(0, self._tops[index], 1, len(self._entries[index].lines))
+        self.scroll_to_region(region, animate=False, force=True, immediate=True)
+
+    def _move_highlight(self, start: int, step: int) -> None:
+        """Highlight the first enabled entry from `start` on, in direction
+        `step`. Stays put if there is none."""
+        i = start
+        while 0 <= i < len(self._entries):
+            if not self._entries[i].disabled:
+                self.highlighted = i
+                return
+            i += step
+
+    def action_cursor_down(self):
+        current = self._highlighted
+        self._move_highlight(0 if current is None else current + 1, 1)
+
+    def action_cursor_up(self):
+        current = self._highlighted
+        start = len(self._entries) - 1 if current is None else current - 1
+        self._move_highlight(start, -1)
+
+    def action_first(self):
+        self._move_highlight(0, 1)
+        self.scroll_home(animate=False)
+
+    def action_last(self):
+        self._move_highlight(len(self._entries) - 1, -1)
+
+    def _page(self, direction: int) -> None:
+        current = self._highlighted
+        line = self._tops[current] if current is not None else 0
+        line += direction * max(self.size.height, 1)
+        index = self._entry_at_line(max(0, min(line, self._line_count - 1)))
+        if index is None:
+            return
+        self._move_highlight(index, direction)
+        if self._highlighted == current:
+            self._move_highlight(index, -direction)
+
+    def action_page_down(self):
+        self._page(1)
+
+    def action_page_up(self):
+        self._page(-1)
+
+    def on_click(self, event) -> None:
+        offset = event.get_content_offset(self)
+        if offset is None:
+            return
+        index = self._entry_at_line(offset.y + int(self.scroll_offset.y))
+        if index is None or self._entries[index].disabled:
+            return
+        self.highlighted = index
+        self._select(index)
+
     # ---------------------------------------------------------------- modes
 
     def is_showing_bookmarks(self) -> bool:
@@ -237,19 +473,33 @@ class InfoSidebar(OptionList):
         days = node.get_days_old(recurse=True)
         return "today" if days <= 0 else f"{days}d ago"
 
-    def _bookmark_entry(self, marker, node, width) -> Option:
+    def _bookmark_entry(self, marker, node, width) -> SidebarEntry:
         """Two-line bookmark entry: note text on line 1, dim branch stats on
         line 2 (aligned under the text)."""
-        first = self._line(marker, node.text, width - 1)
-        indent = " " * (marker.cell_len + 1)
-        stats = self._ellipsize(indent + self._branch_stats(node), width)
-        t = Text()
-        t.append_text(first)
-        t.append("\n")
-        t.append(stats, style="dim")
-        return self._register(t, node)
+        stats = self._branch_stats(node)
+
+        def build():
+            first = self._line(marker, node.text, width - 1)
+            indent = " " * (Text.from_markup(marker).cell_len + 1)
+            t = Text()
+            t.append_text(first)
+            t.append("\n")
+            t.append(self._ellipsize(indent + stats, width), style="dim")
+            return self._register(t, node)
+
+        return self._cached(("bookmark", node, marker, node.text, stats, width), build)
 
     def _build_bookmark_rows(self, width):
+        # The rows follow from the links, the notes (texts and branch ages)
+        # and the day the ages are counted from; while none of those changed,
+        # reuse the last build instead of walking a long copied stack again.
+        nt = self.app.note_tree
+        key = (nt.links_version, nt.revision, date.today(), width)
+        if self._bookmark_rows[0] != key:
+            self._bookmark_rows = (key, self._bookmark_options(width))
+        return list(self._bookmark_rows[1])
+
+    def _bookmark_options(self, width):
         options = [self._header("Bookmarks"), self._blank()]
         copied_nodes = self.app.note_tree.copied_nodes
         if copied_nodes:
@@ -265,26 +515,15 @@ class InfoSidebar(OptionList):
                         added_first_slot = True
                 else:
                     marker_inner = "•"
-                marker = Text.from_markup(f"[dim]{marker_inner}[/dim]")
+                marker = f"[dim]{marker_inner}[/dim]"
                 options.append(self._bookmark_entry(marker, node, width))
 
             options.extend(
                 [
                     self._blank(),
-                    Option(
-                        Text.from_markup("[dim]\\[c]opy \\[v]paste \\[l]ink[/dim]"),
-                        disabled=True,
-                    ),
-                    Option(
-                        Text.from_markup(
-                            "[dim]\\[u/d]move \\[#]jump \\[S-#]bookmark[/dim]"
-                        ),
-                        disabled=True,
-                    ),
-                    Option(
-                        Text.from_markup("[dim]\\[Del]remove from list[/dim]"),
-                        disabled=True,
-                    ),
+                    self._note("[dim]\\[c]opy \\[v]paste \\[l]ink[/dim]"),
+                    self._note("[dim]\\[u/d]move \\[#]jump \\[S-#]bookmark[/dim]"),
+                    self._note("[dim]\\[Del]remove from list[/dim]"),
                 ]
             )
 
@@ -293,9 +532,7 @@ class InfoSidebar(OptionList):
     def _build_expiring_rows(self, width):
         """Expiring (#T-) notes, soonest first. Selectable so a highlighted
         entry jumps to the note. Shown at the top of the journal view."""
-        nodes = sorted(
-            self.app.note_tree.iter_timer_nodes(), key=lambda n: n.expiry_datetime
-        )
+        nodes = self.app.note_tree.iter_timer_nodes()
         if not nodes:
             return []
         red = self.app.theme_variables.get("HL3", "red")
@@ -304,12 +541,12 @@ class InfoSidebar(OptionList):
             expired, label = node.expiry_status()
             loop = "↺" if node.expiry_recurring else ""
             if expired:
-                marker = Text.from_markup(f"[dim {red}]+{label}{loop}[/dim {red}]")
+                marker = f"[dim {red}]+{label}{loop}[/dim {red}]"
                 options.append(
                     self._entry(marker, node.get_text(), node, width, body_style=f"dim {red}")
                 )
             else:
-                marker = Text.from_markup(f"[dim]{label}{loop}[/dim]")
+                marker = f"[dim]{label}{loop}[/dim]"
                 options.append(self._entry(marker, node.get_text(), node, width))
         return options
 
@@ -335,9 +572,7 @@ class InfoSidebar(OptionList):
         today_row_added = False
 
         def today_marker_option():
-            return Option(
-                Text.from_markup(f"[{hl1}]{today_ymd} Today[/{hl1}]"), disabled=True
-            )
+            return self._note(f"[{hl1}]{today_ymd} Today[/{hl1}]")
 
         for node, match_str in node_matches:
             entry_md = match_str[5:]  # MM-DD from YYYY-MM-DD
@@ -350,7 +585,7 @@ class InfoSidebar(OptionList):
             date_style = hl1 if is_today else "dim"
             # Full YYYY-MM-DD, inline (not a column); its styling marks the
             # entry boundary. Journal entries are prose — allow up to 3 lines.
-            marker = Text.from_markup(f"[{date_style}]{match_str}[/{date_style}]")
+            marker = f"[{date_style}]{match_str}[/{date_style}]"
             options.append(self._entry(marker, text, node, width, max_lines=3))
             options.append(self._blank())
 
@@ -363,19 +598,18 @@ class InfoSidebar(OptionList):
         "perpetual_journal": _build_perpetual_journal_rows,
     }
 
+    @traced("sidebar.update_data")
     def update_data(self):
         # Remember which node the cursor is on so an in-place refresh keeps the
         # cursor put rather than snapping back to the top. On a genuine mode
-        # change the node won't exist in the new options and we fall back to the
-        # first entry.
+        # change the node won't exist in the new entries and we fall back to
+        # the first entry.
         prev_node = self._current_node()
         self._search_results = []
-        self._search_entry_ids = []
-        self._option_nodes = {}
-        self._opt_counter = 0
+        self._search_entry_rows = []
         mode = self.mode_options[self.mode_index]
         if mode is None:
-            self.clear_options()
+            self._render_options([])
             self.close_panel()
             self.refresh()
             return
@@ -390,11 +624,11 @@ class InfoSidebar(OptionList):
             hi = self._first_entry_index(options)
         self._render_options(options, highlight=hi)
 
-    def _index_of_node(self, options, node):
+    def _index_of_node(self, entries, node):
         if node is None:
             return None
-        for i, opt in enumerate(options):
-            if opt.id and self._option_nodes.get(opt.id) is node:
+        for i, entry in enumerate(entries):
+            if not entry.disabled and entry.node is node:
                 return i
         return None
 
@@ -403,9 +637,7 @@ class InfoSidebar(OptionList):
     def show_help(self):
         logging.info("show_help called")
         self._search_results = []
-        self._search_entry_ids = []
-        self._option_nodes = {}
-        self._opt_counter = 0
+        self._search_entry_rows = []
         # Set mode_index to last position so next cycle wraps to 0 (None/hidden)
         self.mode_index = len(self.mode_options) - 1
         self.open_panel()
@@ -414,14 +646,17 @@ class InfoSidebar(OptionList):
         # selecting one is a no-op. `right` is rendered as plain text (never
         # markup) so bracketed help like [[PATH]] or [c]opy doesn't misparse.
         def line(left, right=""):
-            if right:
-                text = Text()
-                text.append(left, style="dim")
-                text.append("  ")
-                text.append(right)
-            else:
-                text = Text.from_markup(left)
-            return self._register(text, None)
+            def build():
+                if right:
+                    text = Text()
+                    text.append(left, style="dim")
+                    text.append("  ")
+                    text.append(right)
+                else:
+                    text = Text.from_markup(left)
+                return self._register(text, None)
+
+            return self._cached(("help", left, right, self._content_width()), build)
 
         options = []
         # remember to keep ForestApp.on_key up-to-date
@@ -434,6 +669,7 @@ class InfoSidebar(OptionList):
                 line("←/→", "Zoom out/in"),
                 line("space", "Toggle collapse"),
                 line("0-9", "Jump to bookmarked copy"),
+                line("C-p", "Quick open (fuzzy jump by path)"),
                 line("S-0..9", "Assign bookmark # to copied note"),
                 self._blank(),
                 line("[b]Editing[/b]"),
@@ -466,9 +702,12 @@ class InfoSidebar(OptionList):
                 line(":random*", "Jump to random note (global)"),
                 line(":insert <name>", "Insert template"),
                 line(":run [<idx>]", "Run ! cmd or follow [[PATH]]"),
+                line(":run cancel", "Stop running ! commands"),
                 line(":archive set/unset", "Mark/unmark cursor as #ARCHIVE"),
                 line(":archive show/hide", "Reveal/hide archived nodes"),
                 line(":reload", "Reload file from disk (merge external edits)"),
+                line(":perf [off/reset]", "Trace hot paths, show timings"),
+                line(":perf dump [path]", "Write traced spans as Chrome trace"),
                 line(":help", "Show this help"),
                 self._blank(),
                 line("[b]Other[/b]"),
@@ -478,6 +717,39 @@ class InfoSidebar(OptionList):
         )
         self._render_options(options, highlight=self._first_entry_index(options))
 
+    # ----------------------------------------------------------------- perf
+
+    def show_perf(self, spans, caches):
+        """Tracing numbers for :perf: `spans` and `caches` as returned by
+        perf.summary() and perf.cache_stats()."""
+        self._search_results = []
+        self._search_entry_rows = []
+        # Like help: the next cycle wraps to hidden.
+        self.mode_index = len(self.mode_options) - 1
+        self.open_panel()
+
+        def line(left, right):
+            text = Text()
+            text.append(left, style="dim")
+            text.append("\n  ")
+            text.append(right)
+            return self._register(text, None)
+
+        options = [
+            self._header("Spans"),
+            self._note("[dim]p50 / p95 / max ms (calls)[/dim]"),
+        ]
+        if not spans:
+            options.append(self._note("[dim]Nothing recorded yet[/dim]"))
+        for name, count, p50, p95, worst in spans:
+            options.append(line(name, f"{p50:.2f} / {p95:.2f} / {worst:.2f} ({count})"))
+        options += [self._blank(), self._header("Cache hit rates")]
+        for name, hits, misses in caches:
+            total = hits + misses
+            rate = f"{100 * hits / total:.0f}%" if total else "-"
+            options.append(line(name, f"{rate} of {total}"))
+        self._render_options(options, highlight=self._first_entry_index(options))
+
     # --------------------------------------------------------------- search
 
     def show_search_results(self, matches, query="", current_index=0):
@@ -491,9 +763,7 @@ class InfoSidebar(OptionList):
 
     def _render_search_rows(self, query="", highlight_match=0):
         self._last_search_query = query
-        self._option_nodes = {}
-        self._opt_counter = 0
-        self._search_entry_ids = []
+        self._search_entry_rows = []
         matches = self._search_results
         width = self._content_width()
 
@@ -521,44 +791,39 @@ class InfoSidebar(OptionList):
                 path_preview = self._ellipsize(
                     " › ".join(path_parts[:3]), max(width - 6, 10)
                 )
-                options.append(
-                    Option(
-                        Text.from_markup(f"[dim]{path_preview}[/dim]"), disabled=True
-                    )
-                )
+                options.append(self._note(f"[dim]{path_preview}[/dim]"))
 
             if is_copied:
-                marker = Text.from_markup(f"[{hl1}]•[/{hl1}]")
+                marker = f"[{hl1}]•[/{hl1}]"
             else:
-                marker = Text.from_markup("[dim]›[/dim]")
+                marker = "[dim]›[/dim]"
 
-            opt = self._register(self._line(marker, match_node.text, width), match_node)
-            self._search_entry_ids.append(opt.id)
+            self._search_entry_rows.append(len(options))
             if idx == highlight_match:
                 highlight_index = len(options)
-            options.append(opt)
+            options.append(self._entry(marker, match_node.text, match_node, width))
             options.append(self._blank())
 
         if not matches:
-            options.append(Option(Text("No results found"), disabled=True))
+            options.append(self._note("No results found"))
 
         self._render_options(options, highlight=highlight_index)
 
     def hide_search_results(self):
         self._search_results = []
-        self._search_entry_ids = []
+        self._search_entry_rows = []
         self.mode_index = self._pre_search_mode_index
         self.update_data()
 
     # ------------------------------------------------------- messages / keys
 
-    def _node_for_option(self, option) -> object:
-        if option is None or option.id is None:
+    def _node_at(self, index) -> object:
+        if index is None or not 0 <= index < len(self._entries):
             return None
-        return self._option_nodes.get(option.id)
+        return self._entries[index].node
 
-    def on_option_list_option_selected(self, event: OptionList.OptionSelected):
-        node = self._option_nodes.get(event.option_id)
+    def _select(self, index):
+        node = self._node_at(index)
         if node is None:
             return
         if self._search_results:
@@ -566,12 +831,14 @@ class InfoSidebar(OptionList):
         else:
             self.app.jump_to_node(node)
 
-    def on_option_list_option_highlighted(self, event: OptionList.OptionHighlighted):
+    def _on_highlighted(self, index):
+        if index != self._highlighted:
+            return  # superseded before it ran
         # Search: live-preview the highlighted match + update status bar.
         if self._search_results:
-            node = self._option_nodes.get(event.option_id)
-            if node is not None and event.option_id in self._search_entry_ids:
-                order = self._search_entry_ids.index(event.option_id)
+            node = self._node_at(index)
+            if node is not None and index in self._search_entry_rows:
+                order = self._search_entry_rows.index(index)
                 self.app.status_bar.search_progress = (order, len(self._search_results))
                 if getattr(self.app, "_search", None) is not None:
                     self.app._search.index = order
@@ -584,30 +851,27 @@ class InfoSidebar(OptionList):
         # / link source (guarded by focus so background rebuilds don't clobber
         # it). v/l then act on this last-focused note. See _resolve_paste_source.
         if self.is_showing_bookmarks() and self.has_focus:
-            node = self._option_nodes.get(event.option_id)
+            node = self._node_at(index)
             if node is not None:
                 self.app._paste_source_node = node
 
     def _current_node(self):
-        if self.highlighted is None:
-            return None
-        return self._node_for_option(self.get_option_at_index(self.highlighted))
+        return self._node_at(self._highlighted)
 
     def on_focus(self):
         if self._open:
             self._apply_border(focused=True)
+        self.refresh()
 
     def on_blur(self):
         if self._open:
             self._apply_border(focused=False)
+        self.refresh()
 
     def on_key(self, event):
         if event.key == "enter":
             # Handle the jump here and swallow the key so it never bubbles to
             # ForestApp.on_key (which would also fire action_add_note).
-            # prevent_default stops OptionList's own `select` binding, so no
-            # duplicate OptionSelected fires; mouse clicks still route through
-            # on_option_list_option_selected.
             event.stop()
             event.prevent_default()
             node = self._current_node()
@@ -663,7 +927,7 @@ class InfoSidebar(OptionList):
             return
 
     def _search_entry_ids_order(self, node):
-        for order, oid in enumerate(self._search_entry_ids):
-            if self._option_nodes.get(oid) is node:
+        for order, index in enumerate(self._search_entry_rows):
+            if self._node_at(index) is node:
                 return order
         return 0
@@ -12,7 +12,7 @@ class MultiPurposeSuggester(Suggester):
             self.placeholder = (
                 "help | run | timer <duration> | insert <name> | "
                 "j+ <text> | collapse | ?/?* <query> | random/random* | sn/sn* [filter] | snr | "
-                "archive set|unset|show|hide | doodle clear | reload"
+                "archive set|unset|show|hide | doodle clear | reload | perf"
             )
         else:
             self.placeholder = ""
@@ -50,9 +50,15 @@ class MultiPurposeSuggester(Suggester):
         if "run".startswith(value_lower):
             return "run"
 
+        if "run cancel".startswith(value_lower):
+            return "run cancel"
+
         if "reload".startswith(value_lower):
             return "reload"
 
+        if "perf ".startswith(value_lower):
+            return "perf | off | reset | dump [path]"
+
         if "j+".startswith(value_lower):
             return "j+ <journal entry text>"
 
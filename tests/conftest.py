@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from note_tree import NoteTree  # noqa: E402
+
+
+@pytest.fixture
+def make_tree(tmp_path):
+    """Build a NoteTree from outline `lines` ("\\t"-indented, "+" for a
+    collapsed branch) saved to a scratch file."""
+
+    def make(lines):
+        path = tmp_path / "tree.txt"
+        path.write_text("".join(line + "\n" for line in lines))
+        return NoteTree(str(path))
+
+    return make
@@ -0,0 +1,145 @@
+import random
+import re
+from datetime import date, timedelta
+
+import date_index
+import note_tree
+import pytest
+
+_DATE_RE = re.compile(r"\[(\d{4}-(\d{2}-\d{2})).*?\]")
+
+
+def scan_day_radius(tree, before, after, today):
+    """The day-radius query as a full scan of get_node_list()."""
+    start_md = (today - timedelta(days=before)).strftime("%m-%d")
+    end_md = (today + timedelta(days=after)).strftime("%m-%d")
+    matching = []
+    for n in tree.get_node_list():
+        m = _DATE_RE.search(n.text)
+        if not m:
+            continue
+        md = m.group(2)
+        if start_md <= end_md:
+            in_range = start_md <= md <= end_md
+        else:
+            in_range = md >= start_md or md <= end_md
+        if in_range:
+            matching.append((n, m.group(1)))
+    matching.sort(key=lambda x: (x[1][5:], x[1][:4]))
+    return matching
+
+
+def journal(rnd, today, years=3, per_month=6):
+    lines = ["- Journal"]
+    for y in range(today.year - years + 1, today.year + 1):
+        lines.append(f"\t- {y}")
+        for m in range(1, 13):
+            lines.append(f"\t\t- {date(2000, m, 1):%B}")
+            for k in range(per_month):
+                d = date(y, m, rnd.randint(1, 28))
+                tag = " #DONE" if rnd.random() < 0.1 else ""
+                lines.append(f"\t\t\t- [{d:%Y-%m-%d} 09:{k:02d}] entry{tag}")
+    lines += ["- Other", f"\t- x [{today:%Y-%m-%d}] dated", "\t- old #ARCHIVE"]
+    lines.append(f"\t\t- [{today:%Y-%m-%d} 10:00] archived")
+    return lines
+
+
+@pytest.fixture
+def fixed_today(monkeypatch):
+    """Pin note_tree's idea of today."""
+
+    def pin(day):
+        class FixedDate(date):
+            @classmethod
+            def today(cls):
+                return day
+
+        monkeypatch.setattr(note_tree, "date", FixedDate)
+        return day
+
+    return pin
+
+
+def all_filters(tree):
+    for hide_done in (False, True):
+        for hide_archive in (False, True):
+            tree.hide_done, tree.hide_archive = hide_done, hide_archive
+            yield
+
+
+@pytest.mark.parametrize("today", [date(2026, 6, 15), date(2026, 12, 29)])
+def test_day_radius_matches_scan_through_edits(make_tree, fixed_today, today):
+    fixed_today(today)
+    rnd = random.Random(today.toordinal())
+    tree = make_tree(journal(rnd, today))
+    for step in range(120):
+        for _ in all_filters(tree):
+            for before, after in ((7, 7), (0, 0), (40, 3)):
+                assert tree.get_journal_entries_in_day_radius(before, after) == (
+                    scan_day_radius(tree, before, after, today)
+                )
+        nodes = tree.root.get_node_list()[1:]
+        node = rnd.choice(nodes)
+        op = rnd.random()
+        shifted = today + timedelta(days=rnd.randint(-5, 5))
+        if op < 0.3:
+            tree.push_undo(node)
+            tree.set_node_text(node, f"[{shifted:%Y-%m-%d}] edit {step}")
+        elif op < 0.45 and node.parent is not None:
+            tree.push_undo(node.parent)
+            tree.delete_focus_node(node)
+        elif op < 0.6:
+            tree.pop_undo()
+        elif op < 0.7:
+            tree.pop_redo()
+        elif op < 0.8:
+            tree.add_journal_entry(f"{shifted:%Y-%m-%d} j{step}")
+        else:
+            tree.toggle_done(node)
+
+
+def test_journal_entry_reuses_the_year_and_month(make_tree):
+    tree = make_tree(["- Journal", "\t- 2024", "\t\t- March", "- 2024 elsewhere"])
+    entry = tree.add_journal_entry("2024-03-05 hello")
+    assert entry.text.startswith("[2024-03-05 00:00] hello")
+    assert entry.parent is tree.journal.children[0].children[0]
+    entry = tree.add_journal_entry("2025-01-02 new year")
+    assert [c.text for c in tree.journal.children] == ["2024", "2025"]
+    assert entry.parent.text == "January"
+
+
+def test_sync_after_load_only_files_the_edit(make_tree, monkeypatch):
+    rnd = random.Random(1)
+    tree = make_tree(journal(rnd, date(2026, 6, 15)))
+    tree.get_journal_entries_in_day_radius(3, 3)
+    filed = []
+    original = date_index.DateIndex._file
+
+    def counting(self, node):
+        filed.append(node)
+        return original(self, node)
+
+    monkeypatch.setattr(date_index.DateIndex, "_file", counting)
+    node = tree.root.children[0].children[0].children[0].children[0]
+    tree.set_node_text(node, "[2026-06-15 08:00] changed")
+    tree.get_journal_entries_in_day_radius(3, 3)
+    assert filed == [node]
+
+
+def test_compacts_once_replaced_nodes_pile_up(make_tree):
+    lines = ["- Journal", "\t- 2026"]
+    lines += [f"\t\t- [2026-01-0{i}] e{i}" for i in range(1, 10)]
+    tree = make_tree(lines)
+    index = tree.date_index
+    for _ in range(60):
+        # Each undo swaps in a fresh copy of the year branch (11 nodes).
+        year = tree.root.children[0].children[0]
+        tree.push_undo(year)
+        tree.set_node_text(year.children[0], year.children[0].text + " x")
+        tree.pop_undo()
+        index.sync(tree.root)
+    assert len(index._known) < 120
+    entries = [n for n, _ in index.entries(lambda md: True) if tree.is_live(n)]
+    assert sorted(n.text for n in entries) == [
+        f"[2026-01-0{i}] e{i}" for i in range(1, 10)
+    ]
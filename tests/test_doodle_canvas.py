@@ -0,0 +1,82 @@
+import random
+
+import pytest
+from doodle_canvas import DoodleCanvas, composite, overlay_row
+
+HEIGHT = 6
+WIDTH = 40
+
+
+def draw(rnd, canvas, model, steps):
+    """Random strokes on `canvas`, mirrored into `model` ({(x, y): color})."""
+    for _ in range(steps):
+        x, y = rnd.randrange(WIDTH), rnd.randrange(len(canvas.rows))
+        version = canvas.version
+        if rnd.random() < 0.7:
+            color = rnd.randrange(8)
+            changed = model.get((x, y)) != color
+            assert canvas.set(x, y, color) == changed
+            model[(x, y)] = color
+        else:
+            changed = (x, y) in model
+            assert canvas.clear(x, y) == changed
+            model.pop((x, y), None)
+        assert (canvas.version != version) == changed
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_edits_match_a_cell_dict(seed):
+    rnd = random.Random(seed)
+    canvas = DoodleCanvas(HEIGHT)
+    model = {}
+    draw(rnd, canvas, model, 600)
+    assert {(x, y): c for x, y, c in canvas.cells()} == model
+    assert canvas.is_empty() == (not model)
+    # Rows stay trimmed, so the same drawing always snapshots the same.
+    assert all(not row or row[-1] for row in canvas.rows)
+    assert DoodleCanvas.from_cells(HEIGHT, canvas.cells()).snapshot() == (
+        canvas.snapshot()
+    )
+
+
+def test_from_cells_drops_cells_off_the_canvas():
+    canvas = DoodleCanvas.from_cells(2, [(0, 0, 1), (3, 2, 1), (-1, 1, 1), (2, 1, 0)])
+    assert sorted(canvas.cells()) == [(0, 0, 1), (2, 1, 0)]
+
+
+def test_clearing_every_cell_empties_the_canvas():
+    canvas = DoodleCanvas(HEIGHT)
+    canvas.set(5, 1, 2)
+    canvas.set(9, 1, 3)
+    canvas.clear(9, 1)
+    canvas.clear(5, 1)
+    assert canvas.is_empty()
+    assert canvas.snapshot() == DoodleCanvas(HEIGHT).snapshot()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_composite_matches_per_cell_layering(seed):
+    rnd = random.Random(seed)
+    canvases, models = [], []
+    for _ in range(4):
+        canvas, model = DoodleCanvas(HEIGHT + rnd.randrange(-2, 3)), {}
+        draw(rnd, canvas, model, 200)
+        canvases.append(canvas)
+        models.append(model)
+    rows = composite(canvases, HEIGHT)
+    assert len(rows) == HEIGHT
+    for y in range(HEIGHT):
+        expected = bytearray(WIDTH)
+        for model in models:
+            for (x, cy), color in model.items():
+                if cy == y:
+                    expected[x] = color + 1
+        assert rows[y] == bytes(expected).rstrip(b"\0")
+
+
+def test_overlay_row_keeps_cells_the_top_leaves_empty():
+    below = bytes([1, 2, 3, 4])
+    assert overlay_row(below, bytes([0, 9, 0])) == bytes([1, 9, 3, 4])
+    assert overlay_row(b"", bytes([5, 0, 0])) == bytes([5])
+    assert overlay_row(bytes([0, 0, 7]), b"") == bytes([0, 0, 7])
+    assert overlay_row(bytes([1]), bytes([0, 0, 0, 2])) == bytes([1, 0, 0, 2])
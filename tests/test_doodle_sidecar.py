@@ -0,0 +1,147 @@
+import json
+import os
+import random
+
+import pytest
+from doodle_canvas import DoodleCanvas
+from doodle_sidecar import _SLACK, DoodleSidecar
+
+HEIGHT = 8
+
+
+def random_canvas(rnd, strokes=30):
+    canvas = DoodleCanvas(HEIGHT)
+    for _ in range(strokes):
+        canvas.set(rnd.randrange(60), rnd.randrange(HEIGHT), rnd.randrange(8))
+    return canvas
+
+
+def loaded(sidecar):
+    """What a fresh reader of `sidecar`'s file sees, as snapshots."""
+    next_id, records = DoodleSidecar(sidecar.path).load()
+    return next_id, {
+        cid: DoodleCanvas.from_record(HEIGHT, record).snapshot()
+        for cid, record in records.items()
+    }
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_record_round_trip(seed):
+    rnd = random.Random(seed)
+    canvas = random_canvas(rnd, strokes=rnd.randrange(200))
+    decoded = DoodleCanvas.from_record(HEIGHT, canvas.to_record())
+    assert decoded.snapshot() == canvas.snapshot()
+    assert decoded.saved_version == decoded.version
+
+
+def test_save_then_load(tmp_path):
+    rnd = random.Random(1)
+    sidecar = DoodleSidecar(str(tmp_path / "tree.doodles"))
+    canvases = {i: random_canvas(rnd) for i in range(1, 6)}
+    canvases[6] = DoodleCanvas(HEIGHT)  # empty ones aren't stored
+    sidecar.save(7, canvases)
+    assert all(c.saved_version == c.version for c in canvases.values() if not c.is_empty())
+    next_id, snapshots = loaded(sidecar)
+    assert next_id == 7
+    assert snapshots == {i: canvases[i].snapshot() for i in range(1, 6)}
+
+
+def test_unchanged_save_leaves_the_file_alone(tmp_path):
+    rnd = random.Random(2)
+    sidecar = DoodleSidecar(str(tmp_path / "tree.doodles"))
+    canvases = {i: random_canvas(rnd) for i in range(1, 4)}
+    sidecar.save(4, canvases)
+    before = os.stat(sidecar.path).st_mtime_ns, os.path.getsize(sidecar.path)
+    sidecar.save(4, canvases)
+    # Records as loaded (still encoded) count as unchanged too.
+    _, records = DoodleSidecar(sidecar.path).load()
+    sidecar.save(4, records)
+    assert (os.stat(sidecar.path).st_mtime_ns, os.path.getsize(sidecar.path)) == before
+
+
+def test_saves_append_only_changed_canvases(tmp_path):
+    rnd = random.Random(3)
+    sidecar = DoodleSidecar(str(tmp_path / "tree.doodles"))
+    canvases = {i: random_canvas(rnd, strokes=100) for i in range(1, 6)}
+    sidecar.save(6, canvases)
+    positions = dict(sidecar._index)
+    size = os.path.getsize(sidecar.path)
+
+    canvases[2].set(0, 0, 5)
+    canvases[2].set(1, 0, 4)
+    sidecar.save(6, canvases)
+    assert os.path.getsize(sidecar.path) > size
+    assert {cid: pos for cid, pos in sidecar._index.items() if cid != 2} == {
+        cid: pos for cid, pos in positions.items() if cid != 2
+    }
+    assert sidecar._index[2][0] >= size
+
+    del canvases[4]
+    sidecar.save(6, canvases)
+    assert loaded(sidecar) == (6, {i: c.snapshot() for i, c in canvases.items()})
+
+
+def test_compacts_once_stale_records_outweigh_live_ones(tmp_path):
+    rnd = random.Random(4)
+    sidecar = DoodleSidecar(str(tmp_path / "tree.doodles"))
+    canvases = {1: random_canvas(rnd, strokes=300), 2: random_canvas(rnd)}
+    sizes = []
+    for _ in range(60):
+        canvases[1].set(rnd.randrange(60), rnd.randrange(HEIGHT), rnd.randrange(8))
+        sidecar.save(3, canvases)
+        sizes.append(os.path.getsize(sidecar.path))
+    assert any(b < a for a, b in zip(sizes, sizes[1:]))
+    live = sum(length for _, length in sidecar._index.values())
+    assert max(sizes) < 2 * live + _SLACK + 1024
+    assert not os.path.exists(sidecar.path + ".tmp")
+    assert loaded(sidecar) == (3, {i: c.snapshot() for i, c in canvases.items()})
+
+
+def test_torn_save_falls_back_to_the_previous_index(tmp_path):
+    rnd = random.Random(5)
+    sidecar = DoodleSidecar(str(tmp_path / "tree.doodles"))
+    canvases = {1: random_canvas(rnd), 2: random_canvas(rnd)}
+    sidecar.save(3, canvases)
+    saved = {i: c.snapshot() for i, c in canvases.items()}
+    size = os.path.getsize(sidecar.path)
+
+    canvases[3] = random_canvas(rnd)
+    sidecar.save(4, canvases)
+    with open(sidecar.path, "r+b") as f:
+        f.truncate(os.path.getsize(sidecar.path) - 3)
+    assert loaded(sidecar) == (3, saved)
+
+    # The next save appends after the last intact index.
+    reader = DoodleSidecar(sidecar.path)
+    reader.load()
+    assert reader._end == size
+    reader.save(4, canvases)
+    assert loaded(sidecar) == (4, {i: c.snapshot() for i, c in canvases.items()})
+
+
+def test_legacy_json_is_migrated(tmp_path):
+    legacy = tmp_path / "tree.doodles.json"
+    legacy.write_text(
+        json.dumps(
+            {
+                "next_id": 5,
+                "canvases": {
+                    "2": {"cells": [[0, 0, 1], [3, 2, 4]]},
+                    "4": {"cells": [[7, 1, 0]]},
+                },
+            }
+        )
+    )
+    sidecar = DoodleSidecar(str(tmp_path / "tree.doodles"), str(legacy))
+    next_id, records = sidecar.load()
+    assert next_id == 5
+    cells = {
+        cid: sorted(DoodleCanvas.from_record(HEIGHT, r).cells())
+        for cid, r in records.items()
+    }
+    assert cells == {2: [(0, 0, 1), (3, 2, 4)], 4: [(7, 1, 0)]}
+
+    sidecar.save(next_id, records)
+    assert not legacy.exists()
+    _, reloaded = DoodleSidecar(sidecar.path).load()
+    assert reloaded == records
@@ -0,0 +1,68 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from utils import ExpiryQueue
+
+T0 = datetime(2026, 1, 1)
+
+
+def at(minutes):
+    return T0 + timedelta(minutes=minutes)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_a_plain_dict(seed):
+    rnd = random.Random(seed)
+    queue = ExpiryQueue()
+    registered = {}  # key -> expiry
+    pending = {}  # key -> expiry not yet returned by pop_due
+    now = 0
+    for _ in range(500):
+        key = rnd.randrange(30)
+        op = rnd.random()
+        if op < 0.5:
+            expiry = at(now + rnd.randrange(-5, 60))
+            changed = queue.update(key, expiry)
+            assert changed == (registered.get(key) != expiry)
+            if changed:
+                registered[key] = pending[key] = expiry
+        elif op < 0.65:
+            assert queue.update(key, None) == (key in registered)
+            registered.pop(key, None)
+            pending.pop(key, None)
+        elif op < 0.75:
+            queue.discard(key)
+            registered.pop(key, None)
+            pending.pop(key, None)
+        else:
+            now += rnd.randrange(10)
+            due = queue.pop_due(at(now))
+            expected = {k for k, e in pending.items() if e < at(now)}
+            assert sorted(due) == sorted(expected)
+            assert [pending[k] for k in due] == sorted(pending[k] for k in due)
+            for k in due:
+                del pending[k]
+        assert len(queue) == len(registered)
+        assert [registered[k] for k in queue.keys()] == sorted(registered.values())
+        assert set(queue.keys()) == set(registered)
+        assert queue.next_expiry() == min(pending.values(), default=None)
+
+
+def test_due_keys_stay_registered():
+    queue = ExpiryQueue()
+    queue.update("a", at(1))
+    assert queue.pop_due(at(2)) == ["a"]
+    assert queue.pop_due(at(3)) == []
+    assert "a" in queue and queue.keys() == ["a"]
+    assert queue.next_expiry() is None
+    # Moving it re-arms the wake-up.
+    queue.update("a", at(5))
+    assert queue.next_expiry() == at(5)
+
+
+def test_clear():
+    queue = ExpiryQueue()
+    queue.update("a", at(1))
+    queue.clear()
+    assert len(queue) == 0 and queue.next_expiry() is None and queue.keys() == []
@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+
+def outline(rnd, count):
+    lines = []
+    depth = 0
+    for i in range(count):
+        depth = rnd.randint(0, depth + 1) if lines else 0
+        text = f"n{i}" + (" #ARCHIVE" if rnd.random() < 0.1 else "")
+        lines.append("\t" * depth + "- " + text)
+    return lines
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_indexes_the_node_list_by_subtree_size(make_tree, seed):
+    rnd = random.Random(seed)
+    tree = make_tree(outline(rnd, 300))
+    for step in range(40):
+        for node in rnd.sample(tree.root.get_node_list(), 20):
+            for hide_archive in (False, True):
+                listed = node.get_node_list(hide_archive=hide_archive)
+                if not listed:
+                    assert node.descendant_count(hide_archive=True) == -1
+                    continue
+                assert node.descendant_count(hide_archive=hide_archive) == (
+                    len(listed) - 1
+                )
+                for n in rnd.sample(range(len(listed)), min(10, len(listed))):
+                    assert node.nth_descendant(n, hide_archive=hide_archive) is (
+                        listed[n]
+                    )
+                with pytest.raises(IndexError):
+                    node.nth_descendant(len(listed), hide_archive=hide_archive)
+        # Edit between rounds so the cached sizes have to follow.
+        nodes = tree.root.get_node_list()[1:]
+        node = rnd.choice(nodes)
+        if step % 3 == 0:
+            tree.contextual_add_new_note(node)
+        elif step % 3 == 1:
+            tree.delete_focus_node(node)
+        else:
+            tree.set_node_text(node, node.text + " #ARCHIVE")
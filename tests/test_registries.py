@@ -0,0 +1,123 @@
+import random
+
+import pytest
+from utils import OrderedSet, SlotMap
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_slot_map_keeps_both_directions(seed):
+    rnd = random.Random(seed)
+    slots = SlotMap()
+    model = {}  # slot -> value
+    for _ in range(400):
+        slot = rnd.randrange(10)
+        value = rnd.choice("abcdefghijkl")
+        version = slots.version
+        if rnd.random() < 0.7:
+            changed = model.get(slot) != value
+            slots[slot] = value
+            for s, v in list(model.items()):
+                if v == value:
+                    del model[s]
+            model[slot] = value
+        else:
+            changed = slot in model
+            assert slots.pop(slot) == model.pop(slot, None)
+        assert (slots.version != version) == changed
+        assert dict(slots.items()) == model
+        assert len(slots) == len(model)
+        for v in "abcdefghijkl":
+            held = [s for s, x in model.items() if x == v]
+            assert slots.slot_of(v) == (held[0] if held else None)
+            assert slots.holds(v) == bool(held)
+
+
+def test_slot_map_del_and_init():
+    slots = SlotMap([(1, "a"), (2, "b"), (3, "a")])
+    assert dict(slots.items()) == {2: "b", 3: "a"}
+    del slots[2]
+    assert 2 not in slots and not slots.holds("b")
+    with pytest.raises(KeyError):
+        del slots[2]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_ordered_set_matches_a_list(seed):
+    rnd = random.Random(seed)
+    items = OrderedSet()
+    model = []
+    for _ in range(400):
+        item = rnd.randrange(20)
+        op = rnd.random()
+        version = items.version
+        if op < 0.4:
+            items.append(item)
+            changed = item not in model
+            if changed:
+                model.append(item)
+        elif op < 0.6:
+            changed = item in model
+            items.discard(item)
+            if changed:
+                model.remove(item)
+        elif op < 0.75 and len(model) > 1:
+            i, j = rnd.randrange(len(model)), rnd.randrange(len(model))
+            items.swap(i, j)
+            model[i], model[j] = model[j], model[i]
+            changed = True
+        elif op < 0.85:
+            rnd.shuffle(model)
+            items.reorder(model)
+            changed = True
+        else:
+            changed = False
+        assert (items.version != version) == changed
+        assert list(items) == model and list(reversed(items)) == model[::-1]
+        assert items[:] == model
+        for x in range(20):
+            assert (x in items) == (x in model)
+            if x in model:
+                assert items.index(x) == model.index(x)
+
+
+def test_ordered_set_missing_items():
+    items = OrderedSet([1, 2, 2, 3])
+    assert list(items) == [1, 2, 3]
+    with pytest.raises(ValueError):
+        items.remove(4)
+    with pytest.raises(ValueError):
+        items.index(4)
+
+
+def test_bookmarks_and_copied_notes(make_tree):
+    tree = make_tree(["- a", "- b", "- c"])
+    a, b, c = tree.root.children
+    tree.copied_nodes.append(c)
+    tree.assign_bookmark(a, 1)
+    tree.assign_bookmark(b, 2)
+    assert tree.get_bookmark_slot(a) == 1 and tree.bookmark_context(2) is tree.root
+    # Bookmarked notes lead the copied list, highest slot first.
+    assert list(tree.copied_nodes) == [b, a, c]
+    assert tree.bookmark_split_index() == 2
+
+    version = tree.links_version
+    tree.assign_bookmark(a, 2)  # a moves into b's slot; b leaves the list
+    assert tree.links_version != version
+    assert tree.get_bookmark_slot(a) == 2 and tree.get_bookmark_slot(b) is None
+    assert list(tree.copied_nodes) == [a, c]
+
+    tree.assign_bookmark(a, 2)  # same slot again: released, still copied
+    assert not tree.determine_if_bookmarked(a)
+    assert list(tree.copied_nodes) == [a, c]
+
+
+def test_bookmarks_survive_a_save_and_reload(make_tree):
+    tree = make_tree(["- a", "\t- a1", "- b"])
+    a, b = tree.root.children
+    tree.copied_nodes.append(b)
+    tree.assign_bookmark(a.children[0], 3)
+    tree.apply_lines(tree.serialize_lines())
+    a, b = tree.root.children
+    assert tree.bookmarks.get(3) is a.children[0]
+    assert tree.bookmark_context(3) is a
+    assert list(tree.copied_nodes) == [a.children[0], b]
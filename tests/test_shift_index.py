@@ -0,0 +1,46 @@
+import random
+
+import pytest
+from utils import ShiftIndex
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_positions_follow_splices(seed):
+    rnd = random.Random(seed)
+    items = list(range(50))
+    index = ShiftIndex()
+    for i, item in enumerate(items):
+        index[item] = i
+    next_item = len(items)
+    for _ in range(400):
+        start = rnd.randrange(len(items) + 1)
+        end = min(len(items), start + rnd.randrange(4))
+        new = list(range(next_item, next_item + rnd.randrange(4)))
+        next_item += len(new)
+        for item in items[start:end]:
+            index.pop(item)
+        index.shift(end, len(new) - (end - start))
+        items[start:end] = new
+        for i, item in enumerate(new, start):
+            index[item] = i
+        # Read a few entries at a time, so most replay several shifts at once.
+        for item in rnd.sample(items, min(5, len(items))):
+            assert index[item] == items.index(item)
+    for i, item in enumerate(items):
+        assert index.get(item) == i
+
+
+def test_missing_keys():
+    index = ShiftIndex()
+    index["a"] = 0
+    assert index.pop("a") == 0
+    assert "a" not in index
+    assert index.get("a", -1) == -1
+    with pytest.raises(KeyError):
+        index["a"]
+
+
+def test_shift_by_zero_is_not_logged():
+    index = ShiftIndex()
+    index.shift(3, 0)
+    assert index.log_length == 0
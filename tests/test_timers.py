@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+
+def past(minutes=5):
+    when = datetime.now() - timedelta(minutes=minutes)
+    return when.strftime("#T-1h@%Y-%m-%dT%H:%M:%S")
+
+
+def future(minutes=30):
+    when = datetime.now() + timedelta(minutes=minutes)
+    return when.strftime("#T-1h@%Y-%m-%dT%H:%M:%S")
+
+
+def test_load_registers_timers_soonest_first(make_tree):
+    tree = make_tree([f"- late {future(60)}", "- plain", f"\t- soon {future(5)}"])
+    assert [n.get_text() for n in tree.iter_timer_nodes()] == ["soon", "late"]
+    assert tree.next_timer_expiry() is not None
+
+
+def test_timers_expired_before_load_do_not_fire(make_tree):
+    tree = make_tree([f"- stale {past()}"])
+    assert tree.check_expirations() == []
+
+
+def test_journal_entry_timer_is_registered(make_tree):
+    tree = make_tree(["- a"])
+    node = tree.add_journal_entry("call bob #T-1s")
+    assert tree.iter_timer_nodes() == [node]
+    assert tree.next_timer_expiry() == node.expiry_datetime
+
+
+def test_edits_register_and_unregister(make_tree):
+    tree = make_tree(["- a", "- b"])
+    a = tree.root.children[0]
+    tree.set_node_text(a, f"a {past()}")
+    assert tree.iter_timer_nodes() == [a]
+    assert tree.check_expirations() == [a]
+    assert tree.check_expirations() == []  # fires once
+    tree.set_node_text(a, "a")
+    assert tree.iter_timer_nodes() == []
+    assert tree.next_timer_expiry() is None
+
+
+def test_detached_timers_are_dropped(make_tree):
+    tree = make_tree([f"- a {future()}", f"- b {future(10)}"])
+    a, b = tree.root.children
+    tree.push_undo(tree.root)
+    tree.delete_focus_node(a)
+    assert tree.iter_timer_nodes() == [b]
+    tree.pop_undo()
+    # Undo restores copies; those are what's registered now.
+    assert [n.get_text() for n in tree.iter_timer_nodes()] == ["b", "a"]
+    assert all(tree.is_live(n) for n in tree.iter_timer_nodes())
+
+
+def test_pasted_branch_keeps_its_timer(make_tree):
+    tree = make_tree(["- a", f"\t- t {future()}", "- b"])
+    a, b = tree.root.children
+    t = a.children[0]
+    tree.paste_node(t, b, as_sibling=False)
+    assert tree.iter_timer_nodes() == [t]
@@ -0,0 +1,126 @@
+import random
+
+import pytest
+
+
+def outline(rnd, count):
+    lines = []
+    depth = 0
+    for i in range(count):
+        depth = rnd.randint(0, depth + 1) if lines else 0
+        text = f"n{i}"
+        if rnd.random() < 0.15:
+            text += " #DONE"
+        if rnd.random() < 0.05:
+            text += " #ARCHIVE"
+        lines.append("\t" * depth + ("+ " if rnd.random() < 0.1 else "- ") + text)
+    return lines
+
+
+def expected_visible(tree):
+    """The context's visible list, built from scratch."""
+    ctx = tree.context_node
+    if (tree.hide_done and ctx.is_done()) or (
+        tree.hide_archive and "#ARCHIVE" in ctx.text
+    ):
+        return []
+    out = [ctx]
+    for child in ctx.children:
+        out.extend(
+            child.get_node_list(
+                only_visible=True,
+                hide_done=tree.hide_done,
+                hide_archive=tree.hide_archive,
+            )
+        )
+    return out
+
+
+def replay(nodes, changes):
+    nodes = list(nodes)
+    for change in changes:
+        end = change.start + len(change.old_nodes)
+        assert nodes[change.start : end] == change.old_nodes
+        assert (nodes[end] if end < len(nodes) else None) is change.next_node
+        nodes[change.start : end] = change.new_nodes
+    return nodes
+
+
+def mutate(tree, rnd, step):
+    visible = tree.visible_node_list
+    if len(visible) < 2:
+        tree.contextual_add_new_note(tree.context_node)
+        return
+    node = rnd.choice(visible[1:])
+    op = rnd.randrange(9)
+    if op == 0:
+        tree.contextual_add_new_note(node)
+    elif op == 1:
+        tree.delete_focus_node(node)
+    elif op == 2:
+        tree.indent(node)
+    elif op == 3 and node.parent is not tree.context_node:
+        tree.deindent(node)
+    elif op == 4:
+        tree.move_line(node, rnd.choice(["up", "down"]))
+    elif op == 5:
+        tree.toggle_collapse(node)
+    elif op == 6:
+        tree.toggle_done(node)
+    elif op == 7:
+        tree.set_node_text(node, f"edited {step}")
+    else:
+        destination = rnd.choice(visible)
+        if destination is not node and not any(
+            a is node for a in _ancestors(destination)
+        ):
+            tree.paste_node(node, destination, as_sibling=rnd.random() < 0.5)
+
+
+def _ancestors(node):
+    while node is not None:
+        yield node
+        node = node.parent
+
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("hide_done", [False, True])
+def test_spliced_list_matches_rebuild_and_log_replays(make_tree, seed, hide_done):
+    rnd = random.Random(seed)
+    tree = make_tree(outline(rnd, 80))
+    tree.hide_done = hide_done
+    tree.update_visible_node_list()
+    for step in range(150):
+        epoch = tree.visible_epoch
+        before = list(tree.visible_node_list)
+        logged = len(tree.visible_changes)
+        mutate(tree, rnd, step)
+        if not tree.visible_list_is_current():
+            tree.update_visible_node_list()
+        assert tree.visible_node_list == expected_visible(tree)
+        if tree.visible_epoch == epoch:
+            # Patched in place: the new log entries turn the old list into
+            # the new one, and positions follow the splices.
+            assert replay(before, tree.visible_changes[logged:]) == (
+                tree.visible_node_list
+            )
+            for i, n in enumerate(tree.visible_node_list):
+                assert tree.visible_position(n) == i
+        if rnd.random() < 0.1 and len(tree.visible_node_list) > 1:
+            branch = rnd.choice(tree.visible_node_list[1:])
+            if branch.children:
+                tree.update_context(branch)
+        elif rnd.random() < 0.05 and tree.context_node.parent is not None:
+            tree.update_context(tree.context_node.parent)
+
+
+def test_log_restarts_on_full_rebuild(make_tree):
+    tree = make_tree(["- a", "\t- b", "- c"])
+    a = tree.root.children[0]
+    tree.toggle_collapse(a)
+    assert tree.visible_changes
+    epoch = tree.visible_epoch
+    tree.hide_done = True
+    tree.update_visible_node_list()
+    assert tree.visible_epoch != epoch
+    assert tree.visible_changes == []